@@ -0,0 +1,467 @@
+"""
+Vectorized accessibility computation engine for Lagos Accessibility Dashboard
+"""
+import hashlib
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Peak working memory per skim row inside a block: time mask, destination and
+# origin positions, gathered attribute weight and the intermediate index copies.
+BLOCK_BYTES_PER_ROW = 32
+
+# Content fingerprints of live skim DataFrames, keyed by object id
+_SKIM_FINGERPRINTS: Dict[int, str] = {}
+
+def skim_fingerprint(skim_df: pd.DataFrame) -> str:
+    """Return a content digest of a skim, computed once per DataFrame object."""
+    key = id(skim_df)
+    cached = _SKIM_FINGERPRINTS.get(key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.blake2b(digest_size=16)
+    for col in ("origin_zone", "destination_zone", "travel_time"):
+        values = np.ascontiguousarray(skim_df[col].to_numpy())
+        digest.update(str(values.dtype).encode())
+        digest.update(values)
+    fingerprint = digest.hexdigest()
+
+    _SKIM_FINGERPRINTS[key] = fingerprint
+    weakref.finalize(skim_df, _SKIM_FINGERPRINTS.pop, key, None)
+    return fingerprint
+
+def ensure_origin_sorted(skim_df: pd.DataFrame) -> pd.DataFrame:
+    """Return the skim sorted by origin zone (no copy if it already is)."""
+    if skim_df["origin_zone"].is_monotonic_increasing:
+        return skim_df
+    logger.info("Skim is not origin-sorted, sorting once before blocked processing")
+    return skim_df.sort_values("origin_zone", kind="stable").reset_index(drop=True)
+
+def plan_origin_blocks(origins: np.ndarray, zone_ids: np.ndarray, chunk_size: int) -> List[Tuple[int, int, int, int]]:
+    """Split origin zones into blocks of at most chunk_size zones.
+
+    Returns (first_zone, zone_count, row_start, row_end) tuples; rows are
+    located with binary search on the origin-sorted skim column.
+    """
+    chunk_size = max(1, int(chunk_size))
+    blocks = []
+    for first in range(0, len(zone_ids), chunk_size):
+        count = min(chunk_size, len(zone_ids) - first)
+        row_start = int(np.searchsorted(origins, zone_ids[first], side="left"))
+        row_end = int(np.searchsorted(origins, zone_ids[first + count - 1], side="right"))
+        if row_end > row_start:
+            blocks.append((first, count, row_start, row_end))
+    return blocks
+
+def _accumulate_block(origins: np.ndarray, destinations: np.ndarray, travel_times: np.ndarray,
+                      zone_ids: np.ndarray, zone_values: np.ndarray, time_limit: float,
+                      block: Tuple[int, int, int, int], max_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum destination values reachable within time_limit for one origin block."""
+    first, count, row_start, row_end = block
+    block_ids = zone_ids[first:first + count]
+    sums = np.zeros(count, dtype=np.float64)
+    hits = np.zeros(count, dtype=np.int64)
+
+    for start in range(row_start, row_end, max_rows):
+        end = min(start + max_rows, row_end)
+        reachable = travel_times[start:end] <= time_limit
+        dest = destinations[start:end][reachable]
+        orig = origins[start:end][reachable]
+
+        # Inner join on destination zone (unknown destinations are dropped)
+        dest_pos = np.minimum(np.searchsorted(zone_ids, dest), len(zone_ids) - 1)
+        matched = zone_ids[dest_pos] == dest
+        orig_pos = np.minimum(np.searchsorted(block_ids, orig), count - 1)
+        matched &= block_ids[orig_pos] == orig
+
+        orig_pos = orig_pos[matched]
+        sums += np.bincount(orig_pos, weights=zone_values[dest_pos[matched]], minlength=count)
+        hits += np.bincount(orig_pos, minlength=count)
+
+    return sums, hits
+
+def compute_accessibility_blocked(skim_df: pd.DataFrame, zone_df: pd.DataFrame, time_limit: float,
+                                  attribute: str, chunk_size: int = 5000,
+                                  memory_limit_mb: float = 512, max_workers: int = 4) -> pd.DataFrame:
+    """Compute accessibility origin block by origin block with bounded memory.
+
+    Origins are processed in chunks of chunk_size zones spread over a thread
+    pool. Each worker slices its block into row windows so that the
+    temporary arrays of all workers together stay under memory_limit_mb.
+    Output matches calculate_accessibility: ZONE_ID, accessible_value for
+    every origin that reaches at least one known destination.
+    """
+    skim_df = ensure_origin_sorted(skim_df)
+    origins = skim_df["origin_zone"].to_numpy()
+    destinations = skim_df["destination_zone"].to_numpy()
+    travel_times = skim_df["travel_time"].to_numpy()
+
+    zones = zone_df[["ZONE_ID", attribute]].drop_duplicates("ZONE_ID").sort_values("ZONE_ID")
+    zone_ids = zones["ZONE_ID"].to_numpy()
+    zone_values = np.nan_to_num(zones[attribute].to_numpy(dtype=np.float64))
+    if len(zone_ids) == 0 or len(origins) == 0:
+        return pd.DataFrame({"ZONE_ID": pd.Series(dtype=zone_ids.dtype),
+                             "accessible_value": pd.Series(dtype="float64")})
+
+    max_workers = max(1, int(max_workers))
+    memory_bytes = max(1.0, float(memory_limit_mb)) * 1024 * 1024
+    max_rows = max(1024, int(memory_bytes / (max_workers * BLOCK_BYTES_PER_ROW)))
+
+    blocks = plan_origin_blocks(origins, zone_ids, chunk_size)
+    sums = np.zeros(len(zone_ids), dtype=np.float64)
+    hits = np.zeros(len(zone_ids), dtype=np.int64)
+
+    def run(block):
+        return block, _accumulate_block(origins, destinations, travel_times, zone_ids,
+                                        zone_values, time_limit, block, max_rows)
+
+    if max_workers == 1 or len(blocks) <= 1:
+        results = map(run, blocks)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(run, blocks))
+
+    for (first, count, _, _), (block_sums, block_hits) in results:
+        sums[first:first + count] = block_sums
+        hits[first:first + count] = block_hits
+
+    logger.debug(f"Blocked accessibility: {len(blocks)} blocks, {max_rows:,} rows per window, "
+                 f"{max_workers} workers")
+
+    reached = hits > 0
+    access = pd.DataFrame({"ZONE_ID": zone_ids[reached], "accessible_value": sums[reached]})
+    if pd.api.types.is_integer_dtype(zones[attribute].dtype):
+        access["accessible_value"] = access["accessible_value"].round().astype("int64")
+    return access
+
+class TravelTimeIndex:
+    """OD pairs of a skim sorted by travel time.
+
+    Any travel-time band (lower, upper] maps to one contiguous slice found by
+    binary search, so work done for a band is proportional to its size.
+    """
+
+    def __init__(self, skim_df: pd.DataFrame):
+        travel_times = skim_df["travel_time"].to_numpy()
+        order = np.argsort(travel_times, kind="stable")
+        self.travel_times = travel_times[order]
+
+        origins = skim_df["origin_zone"].to_numpy()
+        destinations = skim_df["destination_zone"].to_numpy()
+        self.zone_ids = np.unique(np.concatenate([origins, destinations]))
+        self.origin_pos = np.searchsorted(self.zone_ids, origins[order]).astype(np.int32)
+        self.destination_pos = np.searchsorted(self.zone_ids, destinations[order]).astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.travel_times)
+
+    @property
+    def nbytes(self) -> int:
+        return self.travel_times.nbytes + self.zone_ids.nbytes + self.origin_pos.nbytes + self.destination_pos.nbytes
+
+    def band(self, lower: float, upper: float) -> slice:
+        """Return the slice of pairs with lower < travel_time <= upper."""
+        start = 0 if lower == -np.inf else int(np.searchsorted(self.travel_times, lower, side="right"))
+        end = int(np.searchsorted(self.travel_times, upper, side="right"))
+        return slice(start, max(start, end))
+
+    def zone_values(self, zone_df: pd.DataFrame, attribute: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Align a zone attribute to the index zones (values, known-zone mask)."""
+        zones = zone_df[["ZONE_ID", attribute]].drop_duplicates("ZONE_ID")
+        zone_ids = zones["ZONE_ID"].to_numpy()
+        pos = np.minimum(np.searchsorted(self.zone_ids, zone_ids), len(self.zone_ids) - 1)
+        found = self.zone_ids[pos] == zone_ids
+
+        values = np.zeros(len(self.zone_ids), dtype=np.float64)
+        known = np.zeros(len(self.zone_ids), dtype=bool)
+        values[pos[found]] = np.nan_to_num(zones[attribute].to_numpy(dtype=np.float64)[found])
+        known[pos[found]] = True
+        return values, known
+
+class IncrementalAccessibility:
+    """Accessibility that follows a moving time threshold incrementally.
+
+    Keeps the last per-origin result and, when the threshold moves, only
+    adds the pairs in (old, new] or subtracts the pairs in (new, old].
+    """
+
+    def __init__(self, index: TravelTimeIndex, zone_df: pd.DataFrame, attribute: str):
+        self.index = index
+        self.attribute = attribute
+        self.values, self.known = index.zone_values(zone_df, attribute)
+        self.integer_valued = pd.api.types.is_integer_dtype(zone_df[attribute].dtype)
+        self.threshold: Optional[float] = None
+        self.sums = np.zeros(len(index.zone_ids), dtype=np.float64)
+        self.hits = np.zeros(len(index.zone_ids), dtype=np.int64)
+
+    def _apply(self, band: slice, sign: int):
+        origin_pos = self.index.origin_pos[band]
+        destination_pos = self.index.destination_pos[band]
+        minlength = len(self.sums)
+        self.sums += sign * np.bincount(origin_pos, weights=self.values[destination_pos], minlength=minlength)
+        self.hits += sign * np.bincount(origin_pos[self.known[destination_pos]], minlength=minlength)
+
+    def update(self, threshold: float) -> np.ndarray:
+        """Move to a new threshold and return per-origin accessible values."""
+        threshold = float(threshold)
+        if threshold == self.threshold:
+            return self.sums
+
+        full = self.index.band(-np.inf, threshold)
+        if self.threshold is None:
+            delta, sign = None, 1
+        elif threshold > self.threshold:
+            delta, sign = self.index.band(self.threshold, threshold), 1
+        else:
+            delta, sign = self.index.band(threshold, self.threshold), -1
+
+        # Recompute from scratch when the band is larger than the new prefix
+        if delta is None or (delta.stop - delta.start) > (full.stop - full.start):
+            self.sums[:] = 0
+            self.hits[:] = 0
+            self._apply(full, 1)
+        else:
+            self._apply(delta, sign)
+            self.sums[self.hits == 0] = 0
+
+        logger.debug(f"Incremental accessibility ({self.attribute}): "
+                     f"{self.threshold} -> {threshold} min")
+        self.threshold = threshold
+        return self.sums
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the current result in calculate_accessibility format."""
+        reached = self.hits > 0
+        access = pd.DataFrame({"ZONE_ID": self.index.zone_ids[reached],
+                               "accessible_value": self.sums[reached]})
+        if self.integer_valued:
+            access["accessible_value"] = access["accessible_value"].round().astype("int64")
+        return access
+
+class ZoneSliceIndex:
+    """Travel times grouped by one end of the OD pair.
+
+    Pairs are sorted by origin (by="origin_zone") or destination zone, so
+    all travel times from or to one zone are a contiguous slice found by
+    binary search instead of a mask over the whole skim.
+    """
+
+    def __init__(self, skim_df: pd.DataFrame, by: str = "origin_zone"):
+        if by not in ("origin_zone", "destination_zone"):
+            raise ValueError(f"Cannot index skim by '{by}'")
+        other = "destination_zone" if by == "origin_zone" else "origin_zone"
+
+        keys = skim_df[by].to_numpy()
+        order = np.argsort(keys, kind="stable")
+        self.by = by
+        self.keys = keys[order]
+        self.other_zones = skim_df[other].to_numpy()[order]
+        self.travel_times = skim_df["travel_time"].to_numpy()[order]
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.other_zones.nbytes + self.travel_times.nbytes
+
+    def travel_times_for(self, zone_id: int) -> pd.DataFrame:
+        """Travel times of one zone's row (or column) as ZONE_ID of the other end, travel_time."""
+        start = int(np.searchsorted(self.keys, zone_id, side="left"))
+        end = int(np.searchsorted(self.keys, zone_id, side="right"))
+        return pd.DataFrame({
+            "ZONE_ID": self.other_zones[start:end],
+            "travel_time": self.travel_times[start:end]
+        })
+
+class PeriodSkimStack:
+    """Time-of-day period skims stacked on one shared zone index.
+
+    times has shape (periods, zones, zones) in float32 with NaN where a
+    period has no path, so accessibility for every period is one masked
+    matrix-vector product. Period weights (e.g. shares of daily trips)
+    are normalized to sum to one.
+    """
+
+    def __init__(self, period_skims: Dict[str, pd.DataFrame], weights: Optional[Dict[str, float]] = None):
+        if not period_skims:
+            raise ValueError("At least one period skim is required")
+        self.periods = list(period_skims)
+        self.zone_ids = np.unique(np.concatenate([
+            np.concatenate([skim["origin_zone"].to_numpy(), skim["destination_zone"].to_numpy()])
+            for skim in period_skims.values()
+        ]))
+
+        n = len(self.zone_ids)
+        self.times = np.full((len(self.periods), n, n), np.nan, dtype=np.float32)
+        for p, skim in enumerate(period_skims.values()):
+            origin_pos = np.searchsorted(self.zone_ids, skim["origin_zone"].to_numpy())
+            destination_pos = np.searchsorted(self.zone_ids, skim["destination_zone"].to_numpy())
+            self.times[p, origin_pos, destination_pos] = skim["travel_time"].to_numpy(dtype=np.float32)
+
+        weights = weights or {}
+        raw = np.array([float(weights.get(period, 1.0)) for period in self.periods])
+        self.weights = raw / raw.sum() if raw.sum() > 0 else np.full(len(self.periods), 1.0 / len(self.periods))
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(self.periods).encode())
+        for array in (self.zone_ids, self.times, self.weights):
+            digest.update(np.ascontiguousarray(array))
+        self.fingerprint = digest.hexdigest()
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes
+
+    def zone_values(self, zone_df: pd.DataFrame, attribute: str) -> np.ndarray:
+        """Align a zone attribute to the stack zones (0 for unknown zones)."""
+        zones = zone_df[["ZONE_ID", attribute]].drop_duplicates("ZONE_ID")
+        zone_ids = zones["ZONE_ID"].to_numpy()
+        pos = np.minimum(np.searchsorted(self.zone_ids, zone_ids), len(self.zone_ids) - 1)
+        found = self.zone_ids[pos] == zone_ids
+        values = np.zeros(len(self.zone_ids), dtype=np.float64)
+        values[pos[found]] = np.nan_to_num(zones[attribute].to_numpy(dtype=np.float64)[found])
+        return values
+
+    def accessibility(self, zone_df: pd.DataFrame, time_limit: float, attribute: str,
+                      memory_limit_mb: float = 512) -> pd.DataFrame:
+        """Accessibility for every period plus the weighted daily average, in one call.
+
+        Origins are processed in row blocks through one reused reachability
+        mask and weight buffer, so temporary arrays stay under memory_limit_mb
+        instead of growing with the whole cube. Returns ZONE_ID, one column
+        per period and a 'daily' column.
+        """
+        values = self.zone_values(zone_df, attribute)
+        n_periods, n, _ = self.times.shape
+        # One bool mask byte and one float64 weight per cell of a row block
+        memory_bytes = float(memory_limit_mb) * 1024 * 1024
+        rows = int(max(1, min(n, memory_bytes // max(1, n * 9))))
+        mask = np.empty((rows, n), dtype=bool)
+        weights = np.empty((rows, n), dtype=np.float64)
+
+        per_period = np.zeros((n_periods, n), dtype=np.float64)
+        for p in range(n_periods):
+            for start in range(0, n, rows):
+                end = min(start + rows, n)
+                k = end - start
+                # NaN compares False, so missing pairs are never reachable
+                np.less_equal(self.times[p, start:end], time_limit, out=mask[:k])
+                np.copyto(weights[:k], mask[:k])
+                np.matmul(weights[:k], values, out=per_period[p, start:end])
+        access = pd.DataFrame(per_period.T, columns=self.periods)
+        access["daily"] = self.weights @ per_period
+        access.insert(0, "ZONE_ID", self.zone_ids)
+        return access
+
+    def _to_skim(self, times: np.ndarray) -> pd.DataFrame:
+        origin_pos, destination_pos = np.nonzero(~np.isnan(times))
+        return pd.DataFrame({
+            "origin_zone": self.zone_ids[origin_pos],
+            "destination_zone": self.zone_ids[destination_pos],
+            "travel_time": times[origin_pos, destination_pos]
+        })
+
+    def period_skim(self, period: str) -> pd.DataFrame:
+        """One period as a long skim (origin_zone, destination_zone, travel_time)."""
+        return self._to_skim(self.times[self.periods.index(period)])
+
+    def daily_skim(self) -> pd.DataFrame:
+        """Weighted mean travel time over the periods that have a path."""
+        available = ~np.isnan(self.times)
+        weights = self.weights[:, None, None] * available
+        with np.errstate(invalid="ignore", divide="ignore"):
+            times = np.nansum(self.times * weights, axis=0) / weights.sum(axis=0)
+        return self._to_skim(times.astype(np.float32))
+
+COMBINE_METHODS = ("min", "blend")
+
+def combine_mode_skims(mode_skims: Dict[str, pd.DataFrame], method: str = "min",
+                       shares: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """Combine mode skims into one zone skim.
+
+    method="min" keeps the fastest mode for every OD pair; method="blend"
+    averages the modes serving a pair weighted by their mode shares
+    (equal shares when not given). Pairs served by no mode are absent.
+    """
+    if method not in COMBINE_METHODS:
+        raise ValueError(f"Unknown combine method '{method}', expected one of {COMBINE_METHODS}")
+    if not mode_skims:
+        raise ValueError("At least one mode skim is required")
+
+    origins = np.concatenate([skim["origin_zone"].to_numpy() for skim in mode_skims.values()])
+    destinations = np.concatenate([skim["destination_zone"].to_numpy() for skim in mode_skims.values()])
+    travel_times = np.concatenate([skim["travel_time"].to_numpy(dtype=np.float64) for skim in mode_skims.values()])
+    zone_ids = np.unique(np.concatenate([origins, destinations]))
+
+    # One integer key per OD pair; pairs are grouped by sorting on it
+    keys = np.searchsorted(zone_ids, origins).astype(np.int64) * len(zone_ids) + np.searchsorted(zone_ids, destinations)
+    pair_keys, pair_pos = np.unique(keys, return_inverse=True)
+
+    if method == "min":
+        combined = np.full(len(pair_keys), np.inf)
+        np.minimum.at(combined, pair_pos, travel_times)
+    else:
+        shares = shares or {}
+        mode_weights = np.concatenate([
+            np.full(len(skim), float(shares.get(mode, 1.0))) for mode, skim in mode_skims.items()
+        ])
+        weight_sums = np.bincount(pair_pos, weights=mode_weights, minlength=len(pair_keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            combined = np.bincount(pair_pos, weights=mode_weights * travel_times,
+                                   minlength=len(pair_keys)) / weight_sums
+        pair_keys, combined = pair_keys[weight_sums > 0], combined[weight_sums > 0]
+
+    return pd.DataFrame({
+        "origin_zone": zone_ids[pair_keys // len(zone_ids)],
+        "destination_zone": zone_ids[pair_keys % len(zone_ids)],
+        "travel_time": combined.astype(np.float32)
+    })
+
+def band_column_names(time_band: float, n_bands: int, prefix: str = "zones") -> List[str]:
+    """Column names for bands (0, tb], (tb, 2tb], ... as used by the time mapping layer."""
+    return [f"{prefix}_{i * time_band}_{(i + 1) * time_band}" for i in range(n_bands)]
+
+def compute_time_bands(skim_df: pd.DataFrame, time_band: float, n_bands: int = 5,
+                       zone_df: Optional[pd.DataFrame] = None, attribute: Optional[str] = None,
+                       prefix: str = "zones") -> pd.DataFrame:
+    """Count (or sum an attribute over) destinations per origin for all time bands at once.
+
+    Band indices are computed once as ceil(t / time_band) - 1, so pair t falls
+    in (i * time_band, (i + 1) * time_band]; pairs with t <= 0, beyond the
+    last band, NaN or inf (unreachable) are ignored. A single 2-D bincount
+    over (origin, band) produces the wide table: origin_zone plus one
+    column per band.
+    """
+    if time_band <= 0 or n_bands <= 0:
+        raise ValueError("time_band and n_bands must be positive")
+
+    travel_times = skim_df["travel_time"].to_numpy(dtype=np.float64)
+    origin_pos, origin_ids = pd.factorize(skim_df["origin_zone"], sort=True)
+    # Only times inside the bands are cast: inf (unreachable) and NaN would turn into INT64_MIN
+    valid = (travel_times > 0) & (travel_times <= n_bands * time_band)
+    band_idx = np.ceil(np.where(valid, travel_times, time_band) / time_band).astype(np.int64) - 1
+    valid &= band_idx < n_bands
+
+    weights = None
+    if attribute is not None:
+        values = zone_df[["ZONE_ID", attribute]].drop_duplicates("ZONE_ID").sort_values("ZONE_ID")
+        zone_ids = values["ZONE_ID"].to_numpy()
+        destinations = skim_df["destination_zone"].to_numpy()
+        dest_pos = np.minimum(np.searchsorted(zone_ids, destinations), len(zone_ids) - 1)
+        valid &= zone_ids[dest_pos] == destinations
+        weights = np.nan_to_num(values[attribute].to_numpy(dtype=np.float64))[dest_pos[valid]]
+
+    flat = origin_pos[valid].astype(np.int64) * n_bands + band_idx[valid]
+    table = np.bincount(flat, weights=weights, minlength=len(origin_ids) * n_bands)
+    table = table.reshape(len(origin_ids), n_bands)
+    if weights is None:
+        table = table.astype(np.int64)
+
+    bands = pd.DataFrame(table, columns=band_column_names(time_band, n_bands, prefix))
+    bands.insert(0, "origin_zone", np.asarray(origin_ids))
+    return bands
@@ -14,9 +14,11 @@ Features:
 
 # Standard library imports
 import logging
+from dataclasses import replace
 from pathlib import Path
 
 # Third-party imports
+import folium
 import streamlit as st
 import pandas as pd
 from streamlit_folium import st_folium
@@ -31,27 +33,68 @@ st.set_page_config(
 
 # Local imports
 from models import AppConfig, AnalysisConfig, MapConfig
+from result_cache import configure_result_cache, get_result_cache
+from scenario_registry import configure_scenario_registry, get_scenario_registry
+from warmup import start_background_warmup
 from data_processing import (
     safe_load_data, 
+    collect_cache_report,
+    align_to_zones,
     calculate_accessibility, 
+    calculate_accessibility_incremental,
     calculate_time_band_accessibility,
     organize_available_attributes,
     load_uploaded_skim,
-    load_lga_gdf
+    load_lga_gdf,
+    get_period_stack,
+    get_period_skim,
+    get_combined_skim,
+    calculate_period_accessibility,
+    calculate_equity_metrics,
+    calculate_isochrones,
+    get_zone_travel_times,
+    skim_fingerprint
 )
 from map_utils import (
     create_base_map,
     create_accessibility_layer,
     create_time_mapping_layer,
+    create_isochrone_layer,
+    assign_isochrone_colors,
+    isochrone_legend,
     add_lga_layer,
     add_zone_labels,
     assign_colors_to_zones,
     assign_time_mapping_colors,
-    color_zones_by_origin_travel_time,
+    color_zones_by_travel_time,
 
     add_map_bounds,
     add_streamlit_safe_legend,
-    add_compatibility_fixes
+    add_compatibility_fixes,
+    legend_html,
+    format_minutes,
+    zone_geometry_key,
+    get_zone_geometry,
+    publish_zone_geometry,
+    zone_style_payload,
+    ZoneGeometryLayer,
+    ZoneStyleUpdate,
+    get_travel_time_matrix,
+    publish_static_file,
+    travel_time_payload,
+    TravelTimeColoring
+)
+from result_cache import array_digest
+from map_render_cache import (
+    RenderCacheError,
+    RenderedMap,
+    canonical_key,
+    configure_map_render_cache,
+    disable_map_render_cache,
+    get_map_render_cache,
+    map_render_cache_enabled,
+    render_component_args,
+    show_rendered_map
 )
 from ui_components import (
     setup_page_config,
@@ -60,12 +103,15 @@ from ui_components import (
     display_combined_header,
     display_sidebar_settings,
     display_file_upload_section,
+    display_period_selector,
+    display_multimodal_settings,
     display_map_settings,
     display_zone_info,
     display_analysis_info,
     display_time_mapping_analysis,
     display_statistics,
-    display_accessibility_table
+    display_accessibility_table,
+    display_equity_metrics
 )
 from export_utils import (
     display_export_section,
@@ -92,7 +138,7 @@ logger = logging.getLogger(__name__)
 def initialize_session_state(config: AppConfig):
     """Initialize all session state variables with proper configuration."""
     if "analysis_config" not in st.session_state:
-        st.session_state.analysis_config = AnalysisConfig()
+        st.session_state.analysis_config = AnalysisConfig(time_threshold=config.default_time_threshold)
     
     if "map_config" not in st.session_state:
         st.session_state.map_config = config.map_config
@@ -110,40 +156,53 @@ def initialize_session_state(config: AppConfig):
     if "scenario_file" not in st.session_state:
         st.session_state.scenario_file = None
 
-def process_time_mapping_data(zones, base_skim, scenario_skim, analysis_config):
+def process_time_mapping_data(zones, base_skim, scenario_skim, analysis_config, config=None):
     """Process time mapping data with proper error handling."""
     try:
-        # Calculate time bands for base scenario
-        base_time_bands = calculate_time_band_accessibility(base_skim, analysis_config.time_band)
+        n_bands = config.time_band_count if config is not None else 5
         
-        # Merge time band data with zones
-        for band_name, band_data in base_time_bands.items():
-            zones = zones.merge(band_data, left_on="ZONE_ID", right_on="origin_zone", how="left")
-            zones = zones.drop(columns=['origin_zone'])
-            zones[band_name] = zones[band_name].fillna(0)
+        # Calculate all time bands for base scenario in one pass
+        band_table = align_to_zones(zones, calculate_time_band_accessibility(base_skim, analysis_config.time_band, n_bands), "origin_zone")
         
-        # If we have a scenario file, calculate time bands for it too
+        # If we have a scenario file, calculate its time bands too and combine into one table
         if scenario_skim is not None:
-            scenario_time_bands = calculate_time_band_accessibility(scenario_skim, analysis_config.time_band)
-            for band_name, band_data in scenario_time_bands.items():
-                scenario_band_name = f"{band_name}_scenario"
-                zones = zones.merge(band_data, left_on="ZONE_ID", right_on="origin_zone", how="left")
-                zones = zones.drop(columns=['origin_zone'])
-                zones[scenario_band_name] = zones[scenario_band_name].fillna(0)
-                
-        return zones
+            scenario_table = calculate_time_band_accessibility(scenario_skim, analysis_config.time_band, n_bands)
+            scenario_table = align_to_zones(zones, scenario_table, "origin_zone").add_suffix("_scenario")
+            band_table = band_table.join(scenario_table)
+        
+        # Add the band columns to this session's view of the shared zones
+        return zones.assign(**{col: band_table[col].to_numpy() for col in band_table.columns})
         
     except Exception as e:
         logger.error(f"Error calculating time bands: {str(e)}")
         st.error(f"Error calculating time bands: {str(e)}")
         return zones
 
-def process_accessibility_data(zones, base_skim, scenario_skim, analysis_config):
+def process_accessibility_data(zones, base_skim, scenario_skim, analysis_config, config=None, period_stack=None):
     """Process accessibility data for both base and scenario."""
-    # Calculate base accessibility
-    access_a = calculate_accessibility(base_skim, zones, analysis_config.time_threshold, analysis_config.selected_attribute)
-    zones = zones.merge(access_a, on="ZONE_ID", how="left").rename(columns={"accessible_value": "access_A"})
-    zones["access_A"] = zones["access_A"].fillna(0)
+    # Blocked, bounded-memory computation settings from config.yaml
+    block_settings = {}
+    if config is not None:
+        block_settings = {
+            "chunk_size": config.chunk_size,
+            "memory_limit_mb": config.accessibility_memory_limit_mb,
+            "max_workers": config.accessibility_workers,
+        }
+
+    def compute(skim):
+        if config is not None and config.incremental_accessibility:
+            return calculate_accessibility_incremental(skim, zones, analysis_config.time_threshold, analysis_config.selected_attribute)
+        return calculate_accessibility(skim, zones, analysis_config.time_threshold, analysis_config.selected_attribute, **block_settings)
+
+    # Calculate base accessibility (all periods at once when time-of-day skims are configured)
+    if period_stack is not None and analysis_config.period:
+        access_a = calculate_period_accessibility(
+            period_stack, zones, analysis_config.time_threshold, analysis_config.selected_attribute,
+            block_settings.get("memory_limit_mb", 512)
+        )[["ZONE_ID", analysis_config.period]].rename(columns={analysis_config.period: "accessible_value"})
+    else:
+        access_a = compute(base_skim)
+    zones = zones.assign(access_A=align_to_zones(zones, access_a, "ZONE_ID")["accessible_value"].to_numpy())
 
     # Calculate percentage of total
     total_attribute = zones[analysis_config.selected_attribute].sum()
@@ -152,20 +211,50 @@ def process_accessibility_data(zones, base_skim, scenario_skim, analysis_config)
 
     # Process scenario if available
     if scenario_skim is not None:
-        access_b = calculate_accessibility(scenario_skim, zones, analysis_config.time_threshold, analysis_config.selected_attribute)
-        zones = zones.merge(access_b, on="ZONE_ID", how="left").rename(columns={"accessible_value": "access_B"})
-        zones["access_B"] = zones["access_B"].fillna(0)
+        access_b = compute(scenario_skim)
+        zones = zones.assign(access_B=align_to_zones(zones, access_b, "ZONE_ID")["accessible_value"].to_numpy())
         zones["access_B_pct"] = (zones["access_B"] / total_attribute * 100).round(0)
         zones["access_B_pct_fmt"] = zones["access_B_pct"].apply(lambda x: f"{x:.0f}%" if pd.notnull(x) else "N/A")
         zones["delta"] = zones["access_B"] - zones["access_A"]
 
     return zones
 
-def create_map_layers(zones, analysis_config, map_config, lga_gdf, base_skim=None):
-    """Create map with appropriate layers based on analysis type."""
+def compute_equity(zones, analysis_config, config):
+    """Compute equity metrics for base and scenario accessibility columns."""
+    access_columns = {"Base Scenario": "access_A"}
+    if "access_B" in zones.columns and analysis_config.scenario_name:
+        access_columns[analysis_config.scenario_name] = "access_B"
+    access = zones[list(access_columns.values())].rename(columns={v: k for k, v in access_columns.items()})
+    try:
+        return calculate_equity_metrics(
+            access.reset_index(drop=True),
+            zones["POP_2024"].reset_index(drop=True),
+            float(zones[analysis_config.selected_attribute].sum()),
+            tuple(config.equity_thresholds_pct)
+        )
+    except Exception as e:
+        logger.error(f"Error calculating equity metrics: {str(e)}")
+        return None
+
+def create_map_layers(zones, analysis_config, map_config, lga_gdf, base_skim=None, isochrones=None,
+                      style_only=False, static_dir=None, client_travel_times=False):
+    """Create map with appropriate layers based on analysis type.
+    
+    With style_only the returned map carries only zone geometry and other
+    layers that do not change between reruns; zone styles, the legend and
+    isochrones go into the returned feature group for st_folium's
+    feature_group_to_add (None otherwise). With client_travel_times as well,
+    Time Mapping sends the travel times to the browser once and the browser
+    colors the selected zone.
+    """
     # Create base map with default configuration
     # No state preservation to prevent zoom/pan reloads
     m = create_base_map(map_config)
+    style_group = folium.FeatureGroup(name="Zone styles", control=False) if style_only else None
+    overlay = style_group if style_only else m
+    border_color = "black"
+    detail_col = detail_alias = None
+    legend = None
     
     # Create zones layer based on analysis type
     if analysis_config.analysis_type == "Accessibility":
@@ -180,28 +269,37 @@ def create_map_layers(zones, analysis_config, map_config, lga_gdf, base_skim=Non
             color_column = "access_A"
         
         # Assign colors to zones
-        zones, bins, color_list = assign_colors_to_zones(zones, color_column, analysis_config.selected_attribute)
+        zones, legend = assign_colors_to_zones(zones, color_column, analysis_config.selected_attribute,
+                                               map_config.classification_scheme)
+        if analysis_config.view == "Base Scenario":
+            legend = legend.titled(f'{analysis_config.selected_attribute} Accessibility')
+        elif analysis_config.view == "Difference":
+            legend = legend.titled(f'{analysis_config.selected_attribute} Accessibility Change')
+        else:
+            legend = legend.titled(f'{analysis_config.selected_attribute} Accessibility ({analysis_config.view})')
         
         # Create accessibility layer
-        zones_layer = create_accessibility_layer(zones, analysis_config.view, map_config, analysis_config.clicked_zone_id)
+        if not style_only:
+            zones_layer = create_accessibility_layer(zones, analysis_config.view, map_config, analysis_config.clicked_zone_id)
 
     else:  # Time Mapping mode
-        # If a zone is selected, color by travel time from that origin
-        if analysis_config.clicked_zone_id and base_skim is not None:
-            logger.info(f"Applying dynamic coloring for origin zone {analysis_config.clicked_zone_id}")
-            zones = color_zones_by_origin_travel_time(
-                zones,
-                base_skim,
-                analysis_config.clicked_zone_id,
-                analysis_config.time_band,
-                st.session_state.app_config.color_schemes["time_mapping"]
-            )
-            # Debug: Check if colors were applied
-            if 'color' in zones.columns:
-                unique_colors = zones['color'].value_counts()
-                logger.info(f"Applied colors to zones: {len(unique_colors)} unique colors")
-            else:
-                logger.warning("No color column found in zones after dynamic coloring")
+        # Dissolved isochrones replace per-zone coloring; zones stay as a clear, clickable layer on top
+        if analysis_config.clicked_zone_id and isochrones is not None:
+            create_isochrone_layer(isochrones, map_config).add_to(overlay)
+            legend = isochrone_legend(isochrones)
+            map_config = replace(map_config, fill_opacity=0.0)
+        # If a zone is selected, color by travel time from (or to) that zone
+        elif analysis_config.clicked_zone_id and base_skim is not None:
+            # With client_travel_times the browser colors the zones from its copy of the travel times
+            if not (style_only and client_travel_times):
+                logger.info(f"Applying dynamic coloring for {analysis_config.time_mapping_direction} zone {analysis_config.clicked_zone_id}")
+                zones, legend = color_zones_by_travel_time(
+                    zones,
+                    get_zone_travel_times(base_skim, analysis_config.clicked_zone_id, analysis_config.time_mapping_direction),
+                    analysis_config.clicked_zone_id,
+                    analysis_config.time_band,
+                    st.session_state.app_config.color_schemes["time_mapping"]
+                )
         else:
             # Calculate total accessibility for generic coloring
             time_band_cols = [col for col in zones.columns if col.startswith("zones_") and "scenario" not in col]
@@ -210,125 +308,72 @@ def create_map_layers(zones, analysis_config, map_config, lga_gdf, base_skim=Non
                 zones[total_accessibility_col] = zones[time_band_cols].sum(axis=1)
                 zones["total_accessible"] = zones[total_accessibility_col]
                 
-                zones, bins, color_list = assign_time_mapping_colors(
+                zones, _ = assign_time_mapping_colors(
                     zones,
                     total_accessibility_col,
-                    st.session_state.app_config.color_schemes["time_mapping"]
+                    st.session_state.app_config.color_schemes["time_mapping"],
+                    map_config.classification_scheme
                 )
             else:
-                zones, bins, color_list = assign_colors_to_zones(zones, "POP_2024", "Population")
+                zones, _ = assign_colors_to_zones(zones, "POP_2024", "Population", map_config.classification_scheme)
         
         # Create time mapping layer
-        zones_layer = create_time_mapping_layer(zones, map_config, analysis_config.clicked_zone_id)
-    
-    zones_layer.add_to(m)
+        border_color = "#333333"
+        if style_only:
+            if analysis_config.clicked_zone_id and "travel_time" in zones.columns:
+                zones["travel_time_fmt"] = format_minutes(zones["travel_time"])
+                detail_col = "travel_time_fmt"
+                detail_alias = (f"Travel Time {'from' if analysis_config.time_mapping_direction == 'origin' else 'to'} "
+                                f"Zone {analysis_config.clicked_zone_id}")
+            elif "total_accessible" in zones.columns:
+                detail_col, detail_alias = "total_accessible", "Total Accessible"
+        else:
+            zones_layer = create_time_mapping_layer(zones, map_config, analysis_config.clicked_zone_id,
+                                                    analysis_config.time_mapping_direction)
+    
+    if style_only:
+        # Geometry is serialized once per process; the browser keeps the layer across reruns
+        geometry_json, digest = get_zone_geometry(zone_geometry_key(zones), zones, map_config.geometry_encoding)
+        ZoneGeometryLayer(geometry_json, publish_zone_geometry(geometry_json, digest, static_dir)).add_to(m)
+        travel_time = None
+        if client_travel_times:
+            # Added in both modes so the map script (and the browser's map) survives mode switches
+            coloring = TravelTimeColoring().add_to(m)
+            if analysis_config.analysis_type == "Time Mapping" and base_skim is not None:
+                zone_ids = zones["ZONE_ID"].to_numpy()
+                blob, skim_digest, max_minutes = get_travel_time_matrix(skim_fingerprint(base_skim), array_digest(zone_ids),
+                                                                        zone_ids, base_skim)
+                url = publish_static_file(blob, f"travel_times_{skim_digest}.bin", static_dir)
+                # Without static serving the matrix is embedded in the (then Time Mapping only) map script
+                coloring.blob, coloring.digest, coloring.embed = blob, skim_digest, url is None
+                travel_time = travel_time_payload(
+                    skim_digest, url, max_minutes, analysis_config.clicked_zone_id, analysis_config.time_band,
+                    analysis_config.time_mapping_direction, st.session_state.app_config.color_schemes["time_mapping"],
+                    map_config.fill_opacity
+                )
+    else:
+        zones_layer.add_to(m)
     
     # Add enhanced controls with streamlit-folium compatibility fixes
     # Removed recenter control as it was not working properly and causing confusion
     add_map_bounds(m, sw=[3.0, -5.0], ne=[15.0, 16.0], viscosity=0.8)
     add_compatibility_fixes(m)
     
-    # Add legends based on analysis type
-    if analysis_config.analysis_type == "Time Mapping" and analysis_config.clicked_zone_id:
-        # Create legend based on dynamic color classes for time mapping
-        legend_items = []
-        if hasattr(zones, 'label') and hasattr(zones, 'color'):
-            # Get unique label-color pairs from the zones
-            unique_labels = zones.dropna(subset=['label', 'color']).drop_duplicates(['label', 'color'])
-            
-            # Convert to list and sort by time ranges
-            legend_data_list = []
-            for _, row in unique_labels.iterrows():
-                label = row['label']
-                color = row['color']
-                
-                # Extract the starting time for sorting
-                if 'No data' in label:
-                    sort_key = 9999  # Put "No data" at the end
-                elif '+' in label:
-                    # Extract number before '+'
-                    sort_key = float(label.split('+')[0])
-                else:
-                    # Extract first number from range like "0-15 min"
-                    sort_key = float(label.split('-')[0])
-                
-                legend_data_list.append({
-                    'color': color,
-                    'label': label,
-                    'sort_key': sort_key
-                })
-                
-                logger.info(f"Legend item: {label} -> {color} (sort_key: {sort_key})")
-            
-            # Sort by time (ascending order: shortest to longest)
-            legend_data_list.sort(key=lambda x: x['sort_key'])
-            logger.info(f"Legend sorted order: {[item['label'] for item in legend_data_list]}")
-            
-            # Create final legend items
-            legend_items = [{'color': item['color'], 'label': item['label']} for item in legend_data_list]
-        
-        if legend_items:
-            legend_data = {
-                'title': f'Travel Time from Zone {analysis_config.clicked_zone_id}',
-                'items': legend_items
-            }
-            add_streamlit_safe_legend(m, legend_data, map_config.fill_opacity)
-            
-    elif analysis_config.analysis_type == "Accessibility":
-        # Create legend for accessibility analysis
-        legend_items = []
-        if hasattr(zones, 'label') and hasattr(zones, 'color'):
-            # Get unique label-color pairs from the zones
-            unique_labels = zones.dropna(subset=['label', 'color']).drop_duplicates(['label', 'color'])
-            
-            # Convert to list and sort by value range
-            legend_data_list = []
-            for _, row in unique_labels.iterrows():
-                label = row['label']
-                color = row['color']
-                
-                # Extract starting value for sorting (e.g., "1,000 - 2,000" -> 1000)
-                try:
-                    if '+' in label:
-                        # Handle "10,000+" format
-                        sort_key = float(label.split('+')[0].replace(',', ''))
-                    elif ' - ' in label:
-                        # Handle "1,000 - 2,000" format
-                        sort_key = float(label.split(' - ')[0].replace(',', ''))
-                    else:
-                        sort_key = 0  # Fallback for unexpected formats
-                except (ValueError, IndexError):
-                    sort_key = 0
-                
-                legend_data_list.append({
-                    'color': color,
-                    'label': label,
-                    'sort_key': sort_key
-                })
-                
-                logger.info(f"Accessibility legend item: {label} -> {color} (sort_key: {sort_key})")
-            
-            # Sort by value (ascending order: lowest to highest)
-            legend_data_list.sort(key=lambda x: x['sort_key'])
-            logger.info(f"Accessibility legend sorted order: {[item['label'] for item in legend_data_list]}")
-            
-            # Create final legend items
-            legend_items = [{'color': item['color'], 'label': item['label']} for item in legend_data_list]
-        
-        if legend_items:
-            # Determine legend title based on view
-            if analysis_config.view == "Base Scenario":
-                title = f'{analysis_config.selected_attribute} Accessibility'
-            elif analysis_config.view == "Difference":
-                title = f'{analysis_config.selected_attribute} Accessibility Change'
-            else:
-                title = f'{analysis_config.selected_attribute} Accessibility ({analysis_config.view})'
-                
-            legend_data = {
-                'title': title,
-                'items': legend_items
-            }
-            add_streamlit_safe_legend(m, legend_data, map_config.fill_opacity)
+    # Travel time legends are titled by the selected zone; legends come ordered from the classification
+    if legend and analysis_config.analysis_type == "Time Mapping":
+        legend = legend.titled(f'Travel Time from Zone {analysis_config.clicked_zone_id}'
+                               if analysis_config.time_mapping_direction == "origin"
+                               else f'Travel Time to Zone {analysis_config.clicked_zone_id}')
+
+    if style_only:
+        legend_box = legend_html(legend, map_config.fill_opacity, "zone-legend") if legend else None
+        payload = zone_style_payload(zones, map_config, analysis_config.clicked_zone_id, border_color,
+                                     detail_col, detail_alias, legend_box)
+        if travel_time is not None:
+            payload["travel_time"] = travel_time
+        ZoneStyleUpdate(payload).add_to(style_group)
+    elif legend:
+        add_streamlit_safe_legend(m, legend, map_config.fill_opacity)
 
     # Add zone labels if enabled
     add_zone_labels(m, zones, map_config)
@@ -337,7 +382,57 @@ def create_map_layers(zones, analysis_config, map_config, lga_gdf, base_skim=Non
     if map_config.show_lga_layer and lga_gdf is not None:
         add_lga_layer(m, lga_gdf, map_config)
     
-    return m, zones
+    return m, zones, style_group
+
+def apply_map_click(map_state, analysis_config) -> bool:
+    """Select the zone of the latest map click, once per click.
+
+    Returns True when the selected zone changed.
+    """
+    drawing = (map_state or {}).get("last_active_drawing")
+    if not drawing:
+        return False
+    zone_id = drawing.get("properties", {}).get("ZONE_ID")
+    if zone_id == st.session_state.get("last_map_click"):
+        return False
+    st.session_state.last_map_click = zone_id
+    if zone_id == analysis_config.clicked_zone_id:
+        return False
+    analysis_config.clicked_zone_id = zone_id
+    st.session_state.analysis_config.clicked_zone_id = zone_id
+    return True
+
+def draw_main_map(zones, base_skim, scenario_skim, analysis_config, map_config, config, period_stack=None):
+    """Process the analysis data and draw the main map.
+
+    Returns the map, the processed zones, the style group (None for full
+    maps) and the isochrones of the selected zone, if shown.
+    """
+    # Process data based on analysis type
+    if analysis_config.analysis_type == "Accessibility":
+        zones = process_accessibility_data(zones, base_skim, scenario_skim, analysis_config, config, period_stack)
+    else:  # Time Mapping
+        zones = process_time_mapping_data(zones, base_skim, scenario_skim, analysis_config, config)
+
+    # Load LGA data only if needed (lazy loading)
+    lga_gdf = None
+    if map_config.show_lga_layer:
+        lga_gdf = load_lga_gdf(config)
+
+    # Isochrones for the selected zone (cached per skim, zone, direction and band width)
+    isochrones = None
+    if map_config.show_isochrones and analysis_config.analysis_type == "Time Mapping" and analysis_config.clicked_zone_id:
+        isochrones = assign_isochrone_colors(
+            calculate_isochrones(zones, base_skim, analysis_config.clicked_zone_id, analysis_config.time_band,
+                                 analysis_config.time_mapping_direction),
+            config.color_schemes["time_mapping"]
+        )
+
+    m, zones, style_group = create_map_layers(zones, analysis_config, map_config, lga_gdf, base_skim, isochrones,
+                                              style_only=config.map_style_updates,
+                                              static_dir=str(Path(__file__).parent / "static"),
+                                              client_travel_times=config.client_time_mapping and not map_config.show_isochrones)
+    return m, zones, style_group, isochrones
 
 def display_debug_report():
     """Display the debug report in the main area."""
@@ -413,6 +508,38 @@ def display_debug_report():
         st.write(f"**App Loaded:** {report['session_state']['app_fully_loaded']}")
         st.write(f"**Data Cached:** {report['session_state']['data_loaded']}")
     
+    # Cache statistics (hits, misses, evictions, sizes and compute time saved)
+    cache = report.get("cache")
+    if cache:
+        st.markdown("### 🗄️ Cache Statistics")
+        result_cache = cache["result_cache"]
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Result Cache", f"{result_cache['nbytes'] / 1024**2:.1f} / {result_cache['max_bytes'] / 1024**2:.0f} MB")
+        with col2:
+            st.metric("Entries", f"{result_cache['entries']:,}")
+        with col3:
+            st.metric("Hits / Disk Hits / Misses", f"{result_cache['hits']} / {result_cache['disk_hits']} / {result_cache['misses']}")
+        with col4:
+            st.metric("Evictions", f"{result_cache['evictions']:,}")
+        if cache["result_store"]:
+            store = cache["result_store"]
+            st.write(f"**Result Store:** {store['results']:,} results, {store['nbytes'] / 1024**2:.1f} / "
+                     f"{store['max_bytes'] / 1024**2:.0f} MB, {store['evictions']} evictions ({store['directory']})")
+        if cache.get("scenario_registry"):
+            scenarios = cache["scenario_registry"]
+            st.write(f"**Scenarios:** {scenarios['resident']} in memory ({scenarios['nbytes'] / 1024**2:.1f} / "
+                     f"{scenarios['max_bytes'] / 1024**2:.0f} MB), {scenarios['spilled']} spilled "
+                     f"({scenarios['spilled_bytes'] / 1024**2:.1f} MB)")
+        if cache["functions"]:
+            st.dataframe(pd.DataFrame(cache["functions"]), hide_index=True, use_container_width=True)
+        st.download_button(
+            "📥 Download Cache Statistics (JSON)",
+            json.dumps(cache, indent=2, default=str),
+            file_name=f"lagos_dashboard_cache_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json"
+        )
+    
     # Export report as JSON
     report_json = json.dumps(report, indent=2, default=str)
     st.download_button(
@@ -478,7 +605,8 @@ def generate_debug_report(zones, base_skim, analysis_config, load_time, config):
             "map_center": config.map_config.center,
             "map_zoom": config.map_config.zoom,
             "map_height": config.map_config.height
-        }
+        },
+        "cache": collect_cache_report()
     }
     
     # Store report in session state for display
@@ -508,28 +636,27 @@ def main():
         # Store config in session state
         st.session_state.app_config = config
         
-        # Load all data
-        zones, base_skim, node_to_taz = safe_load_data(config)
-        if zones is None or base_skim is None:
-            st.error("❌ Failed to load required data. Please check your data files.")
-            st.info("💡 **Tip**: Ensure all data files are in the correct directory and try refreshing the page.")
-            st.stop()
-        
-        # Cache everything in session state
-        st.session_state.zones = zones
-        st.session_state.base_skim = base_skim
-        st.session_state.node_to_taz = node_to_taz
         st.session_state.app_fully_loaded = True
     else:
-        # Use cached data for instant subsequent loads
+        # Use cached configuration for instant subsequent loads
         config = st.session_state.app_config
-        zones = st.session_state.zones
-        base_skim = st.session_state.base_skim
-        node_to_taz = st.session_state.node_to_taz
         # Still need to call these for UI setup
         setup_page_config()
         load_custom_css()
     
+    # Base data is loaded once per process and shared read-only by all sessions
+    zones, base_skim, node_to_taz = safe_load_data(config)
+    if zones is None or base_skim is None:
+        st.error("❌ Failed to load required data. Please check your data files.")
+        st.info("💡 **Tip**: Ensure all data files are in the correct directory and try refreshing the page.")
+        st.stop()
+    # Shallow per-session view: added columns never reach the shared frame
+    zones = zones.copy(deep=False)
+    
+    configure_result_cache(config.result_cache_mb, config.result_store_dir, config.result_store_mb)
+    configure_scenario_registry(config.scenario_memory_mb, config.scenario_spill_dir, config.scenario_spill_mb)
+    start_background_warmup(config)
+    
     # Display combined header box
     display_combined_header(st.session_state.analysis_config)
     
@@ -547,10 +674,6 @@ def main():
         st.error("No valid attributes found in the data")
         st.stop()
     
-    # Format population and employment for tooltips
-    zones["POP_2024_fmt"] = zones["POP_2024"].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "N/A")
-    zones["Emp_2024_fmt"] = zones["Emp 2024"].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "N/A")
-    
     # Display sidebar settings and get updated configuration
     analysis_config = display_sidebar_settings(
         st.session_state.analysis_config, 
@@ -558,6 +681,22 @@ def main():
         attribute_display_names
     )
     
+    # Time-of-day period skims replace the base skim when configured
+    period_stack = get_period_stack(config, node_to_taz)
+    if period_stack is not None:
+        analysis_config.period = display_period_selector(period_stack.periods, analysis_config.period)
+        base_skim = get_period_skim(period_stack.fingerprint, analysis_config.period, period_stack)
+    
+    # Multimodal network combined lazily from the configured mode skims
+    if config.mode_skims:
+        analysis_config = display_multimodal_settings(list(config.mode_skims), analysis_config)
+        if analysis_config.combined_modes:
+            combined_skim = get_combined_skim(config, node_to_taz, analysis_config.combined_modes,
+                                              analysis_config.combine_method)
+            if combined_skim is not None:
+                base_skim = combined_skim
+                period_stack = None  # Period results describe the base network only
+    
     # Handle file upload
     uploaded_file, scenario_name, view = display_file_upload_section()
     analysis_config.view = view
@@ -579,52 +718,83 @@ def main():
         center=config.map_config.center,
         zoom=config.map_config.zoom,
         height=config.map_config.height,
+        geometry_encoding=config.map_config.geometry_encoding,
+        prefer_canvas=config.map_config.prefer_canvas,
         fill_opacity=map_settings['fill_opacity'],
         line_weight=map_settings['line_weight'],
         show_labels=map_settings['show_labels'],
         show_lga_layer=map_settings['show_lga_layer'],
         lga_border_color=map_settings['lga_border_color'],
         lga_border_weight=map_settings['lga_border_weight'],
-        show_lga_labels=map_settings['show_lga_labels']
+        show_lga_labels=map_settings['show_lga_labels'],
+        show_isochrones=map_settings['show_isochrones'],
+        classification_scheme=map_settings['classification_scheme']
     )
     
-    # Process data based on analysis type
-    if analysis_config.analysis_type == "Accessibility":
-        zones = process_accessibility_data(zones, base_skim, scenario_skim, analysis_config)
-    else:  # Time Mapping
-        zones = process_time_mapping_data(zones, base_skim, scenario_skim, analysis_config)
-    
-    # Load LGA data only if needed (lazy loading)
-    lga_gdf = None
-    if map_config.show_lga_layer:
-        if 'lga_gdf' not in st.session_state:
-            st.session_state.lga_gdf = load_lga_gdf(config)
-        lga_gdf = st.session_state.lga_gdf
-    
-    # Combined header already includes analysis and instructions
-    
-    # Create and display map
-    m, zones = create_map_layers(zones, analysis_config, map_config, lga_gdf, base_skim)
+    # Style-only maps keep the key "main_map", under which st_folium stores its latest value before
+    # this run; taking the click here lets this run draw it instead of needing a second rerun
+    if config.map_style_updates and apply_map_click(st.session_state.get("main_map"), analysis_config):
+        if analysis_config.analysis_type == "Accessibility":
+            st.toast(f"📍 Selected Zone {analysis_config.clicked_zone_id}", icon="✅")
     
     # Display the map with stable key to prevent unnecessary reloads
-    # Only change key when analysis type or view changes, not on zone clicks
-    map_key = f"main_map_{analysis_config.analysis_type}_{analysis_config.time_band}_{hash(str(analysis_config.view))}"
+    # Only change key when analysis type or view changes, not on zone clicks.
+    # Style-only maps keep one key: their script is stable and only the styles change
+    if config.map_style_updates:
+        map_key = "main_map"
+    else:
+        map_key = f"main_map_{analysis_config.analysis_type}_{analysis_config.time_band}_{hash(str(analysis_config.view))}"
     logger.info(f"Using map key: {map_key}")
-    clicked_data = st_folium(
-        m,
-        width=None,
-        height=map_config.height,
-        returned_objects=["last_active_drawing", "bounds", "center", "zoom"],
-        key=map_key,
-        # Force re-render to ensure custom elements are preserved
-        use_container_width=True
-    )
+    returned_objects = ["last_active_drawing", "bounds", "center", "zoom"]
+    
+    def draw():
+        return draw_main_map(zones, base_skim, scenario_skim, analysis_config, map_config, config, period_stack)
+    
+    rendered = None
+    if map_render_cache_enabled(config.map_render_cache_entries):
+        # Reruns from widgets that leave the map unchanged reuse the rendered map
+        render_key = canonical_key(
+            analysis_config, map_config, config, map_key,
+            skim_fingerprint(base_skim),
+            skim_fingerprint(scenario_skim) if scenario_skim is not None else None,
+            period_stack.fingerprint if period_stack is not None else None
+        )
+        
+        def render():
+            m, drawn_zones, style_group, isochrones = draw()
+            args = render_component_args(m, map_key, map_config.height, style_group, returned_objects)
+            return RenderedMap(m, drawn_zones, isochrones, style_group is not None, map_key, args)
+        
+        try:
+            rendered = configure_map_render_cache(config.map_render_cache_entries).get_or_render(render_key, render)
+            clicked_data = show_rendered_map(rendered)
+        except RenderCacheError as e:
+            # The streamlit-folium internals changed; st_folium draws the map from now on
+            disable_map_render_cache(e)
+            rendered = None
+    
+    if rendered is not None:
+        m, zones, isochrones = rendered.map, rendered.zones.copy(deep=False), rendered.isochrones
+        style_only = rendered.style_only
+    else:
+        m, zones, style_group, isochrones = draw()
+        style_only = style_group is not None
+        clicked_data = st_folium(
+            m,
+            width=None,
+            height=map_config.height,
+            returned_objects=returned_objects,
+            key=map_key,
+            feature_group_to_add=style_group,
+            # Force re-render to ensure custom elements are preserved
+            use_container_width=True
+        )
     
     # Note: Map state preservation removed to prevent zoom/pan reloads
     # The map will maintain its position naturally without session state updates
     
-    # Handle zone clicks with map refresh for highlighting
-    if clicked_data and clicked_data.get("last_active_drawing"):
+    # Handle zone clicks with map refresh for highlighting (style-only maps took the click before drawing)
+    if not style_only and clicked_data and clicked_data.get("last_active_drawing"):
         props = clicked_data["last_active_drawing"]["properties"]
         new_zone_id = props.get("ZONE_ID")
         if new_zone_id != st.session_state.analysis_config.clicked_zone_id:
@@ -662,9 +832,10 @@ def main():
     if analysis_config.analysis_type == "Time Mapping" and analysis_config.clicked_zone_id:
         result = display_time_mapping_analysis(
             analysis_config.clicked_zone_id, 
-            base_skim, 
+            get_zone_travel_times(base_skim, analysis_config.clicked_zone_id, analysis_config.time_mapping_direction), 
             zones, 
-            analysis_config.time_band
+            analysis_config.time_band,
+            analysis_config.time_mapping_direction
         )
         if result is None:  # User clicked clear button
             st.session_state.analysis_config.clicked_zone_id = None
@@ -672,7 +843,7 @@ def main():
             st.rerun()
     
     # Display export section
-    display_export_section(m, zones, analysis_config, clicked_data)
+    display_export_section(m, zones, analysis_config, clicked_data, isochrones)
     
     # Add keyboard shortcuts
     add_keyboard_shortcuts()
@@ -680,6 +851,10 @@ def main():
     # Display statistics
     display_statistics(total_population, total_employment)
     
+    # Display equity metrics for base and scenario accessibility
+    if analysis_config.analysis_type == "Accessibility":
+        display_equity_metrics(compute_equity(zones, analysis_config, config), analysis_config)
+    
     # Display accessibility table for Accessibility mode
     display_accessibility_table(zones, analysis_config)
     
@@ -708,6 +883,13 @@ def main():
                 if st.button("🧹 Clear All Cache"):
                     st.cache_data.clear()
                     st.cache_resource.clear()
+                    # Process-wide caches outside Streamlit: results (memory and disk), scenarios, rendered maps
+                    result_cache = get_result_cache()
+                    result_cache.clear()
+                    if result_cache.store is not None:
+                        result_cache.store.clear()
+                    get_scenario_registry().clear()
+                    get_map_render_cache().clear()
                     st.success("Cache cleared!")
                     
             st.metric("Page Load Time", f"{load_time:.2f} seconds")
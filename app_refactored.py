@@ -23,13 +23,23 @@ from streamlit_folium import st_folium
 
 # Local imports
 from models import AppConfig, AnalysisConfig, MapConfig
+from result_cache import configure_result_cache
+from scenario_registry import configure_scenario_registry
+from warmup import start_background_warmup
 from data_processing import (
     safe_load_data, 
+    align_to_zones,
     calculate_accessibility, 
+    calculate_accessibility_incremental,
     calculate_time_band_accessibility,
     organize_available_attributes,
     load_uploaded_skim,
-    load_lga_gdf
+    load_lga_gdf,
+    get_period_stack,
+    get_period_skim,
+    get_combined_skim,
+    calculate_period_accessibility,
+    get_zone_travel_times
 )
 from map_utils import (
     create_base_map,
@@ -45,6 +55,8 @@ from ui_components import (
     display_main_header,
     display_sidebar_settings,
     display_file_upload_section,
+    display_period_selector,
+    display_multimodal_settings,
     display_map_settings,
     display_zone_info,
     display_analysis_info,
@@ -77,7 +89,7 @@ logger = logging.getLogger(__name__)
 def initialize_session_state(config: AppConfig):
     """Initialize all session state variables with proper configuration."""
     if "analysis_config" not in st.session_state:
-        st.session_state.analysis_config = AnalysisConfig()
+        st.session_state.analysis_config = AnalysisConfig(time_threshold=config.default_time_threshold)
     
     if "map_config" not in st.session_state:
         st.session_state.map_config = config.map_config
@@ -88,40 +100,52 @@ def initialize_session_state(config: AppConfig):
     if "scenario_file" not in st.session_state:
         st.session_state.scenario_file = None
 
-def process_time_mapping_data(zones, base_skim, scenario_skim, analysis_config):
+def process_time_mapping_data(zones, base_skim, scenario_skim, analysis_config, config=None):
     """Process time mapping data with proper error handling."""
     try:
-        # Calculate time bands for base scenario
-        base_time_bands = calculate_time_band_accessibility(base_skim, analysis_config.time_band)
+        n_bands = config.time_band_count if config is not None else 5
         
-        # Merge time band data with zones
-        for band_name, band_data in base_time_bands.items():
-            zones = zones.merge(band_data, left_on="ZONE_ID", right_on="origin_zone", how="left")
-            zones = zones.drop(columns=['origin_zone'])
-            zones[band_name] = zones[band_name].fillna(0)
+        # Calculate all time bands for base scenario in one pass
+        band_table = align_to_zones(zones, calculate_time_band_accessibility(base_skim, analysis_config.time_band, n_bands), "origin_zone")
         
-        # If we have a scenario file, calculate time bands for it too
+        # If we have a scenario file, calculate its time bands too and combine into one table
         if scenario_skim is not None:
-            scenario_time_bands = calculate_time_band_accessibility(scenario_skim, analysis_config.time_band)
-            for band_name, band_data in scenario_time_bands.items():
-                scenario_band_name = f"{band_name}_scenario"
-                zones = zones.merge(band_data, left_on="ZONE_ID", right_on="origin_zone", how="left")
-                zones = zones.drop(columns=['origin_zone'])
-                zones[scenario_band_name] = zones[scenario_band_name].fillna(0)
+            scenario_table = calculate_time_band_accessibility(scenario_skim, analysis_config.time_band, n_bands)
+            scenario_table = align_to_zones(zones, scenario_table, "origin_zone").add_suffix("_scenario")
+            band_table = band_table.join(scenario_table)
         
-        return zones
+        # Add the band columns to this session's view of the shared zones
+        return zones.assign(**{col: band_table[col].to_numpy() for col in band_table.columns})
         
     except Exception as e:
         logger.error(f"Error calculating time bands: {str(e)}")
         st.error(f"Error calculating time bands: {str(e)}")
         return zones
 
-def process_accessibility_data(zones, base_skim, scenario_skim, analysis_config):
+def process_accessibility_data(zones, base_skim, scenario_skim, analysis_config, config=None, period_stack=None):
     """Process accessibility data for both base and scenario."""
-    # Calculate base accessibility
-    access_a = calculate_accessibility(base_skim, zones, analysis_config.time_threshold, analysis_config.selected_attribute)
-    zones = zones.merge(access_a, on="ZONE_ID", how="left").rename(columns={"accessible_value": "access_A"})
-    zones["access_A"] = zones["access_A"].fillna(0)
+    # Blocked, bounded-memory computation settings from config.yaml
+    block_settings = {}
+    if config is not None:
+        block_settings = {
+            "chunk_size": config.chunk_size,
+            "memory_limit_mb": config.accessibility_memory_limit_mb,
+            "max_workers": config.accessibility_workers,
+        }
+
+    def compute(skim):
+        if config is not None and config.incremental_accessibility:
+            return calculate_accessibility_incremental(skim, zones, analysis_config.time_threshold, analysis_config.selected_attribute)
+        return calculate_accessibility(skim, zones, analysis_config.time_threshold, analysis_config.selected_attribute, **block_settings)
+
+    # Calculate base accessibility (all periods at once when time-of-day skims are configured)
+    if period_stack is not None and analysis_config.period:
+        access_a = calculate_period_accessibility(
+            period_stack, zones, analysis_config.time_threshold, analysis_config.selected_attribute
+        )[["ZONE_ID", analysis_config.period]].rename(columns={analysis_config.period: "accessible_value"})
+    else:
+        access_a = compute(base_skim)
+    zones = zones.assign(access_A=align_to_zones(zones, access_a, "ZONE_ID")["accessible_value"].to_numpy())
 
     # Calculate percentage of total
     total_attribute = zones[analysis_config.selected_attribute].sum()
@@ -130,9 +154,8 @@ def process_accessibility_data(zones, base_skim, scenario_skim, analysis_config)
 
     # Process scenario if available
     if scenario_skim is not None:
-        access_b = calculate_accessibility(scenario_skim, zones, analysis_config.time_threshold, analysis_config.selected_attribute)
-        zones = zones.merge(access_b, on="ZONE_ID", how="left").rename(columns={"accessible_value": "access_B"})
-        zones["access_B"] = zones["access_B"].fillna(0)
+        access_b = compute(scenario_skim)
+        zones = zones.assign(access_B=align_to_zones(zones, access_b, "ZONE_ID")["accessible_value"].to_numpy())
         zones["access_B_pct"] = (zones["access_B"] / total_attribute * 100).round(1)
         zones["access_B_pct_fmt"] = zones["access_B_pct"].apply(lambda x: f"{x:.1f}%" if pd.notnull(x) else "N/A")
         zones["delta"] = zones["access_B"] - zones["access_A"]
@@ -157,7 +180,7 @@ def create_map_layers(zones, analysis_config, map_config, lga_gdf):
             color_column = "access_A"
         
         # Assign colors to zones
-        zones, bins, color_list = assign_colors_to_zones(zones, color_column, analysis_config.selected_attribute)
+        zones, _ = assign_colors_to_zones(zones, color_column, analysis_config.selected_attribute)
         
         # Create accessibility layer
         zones_layer = create_accessibility_layer(zones, analysis_config.view, map_config, analysis_config.clicked_zone_id)
@@ -171,11 +194,11 @@ def create_map_layers(zones, analysis_config, map_config, lga_gdf):
             zones["total_accessible"] = zones[total_accessibility_col]
             
             # Assign time mapping colors
-            zones, bins, color_list = assign_time_mapping_colors(zones, total_accessibility_col, 
-                                                               st.session_state.app_config.color_schemes["time_mapping"])
+            zones, _ = assign_time_mapping_colors(zones, total_accessibility_col, 
+                                                  st.session_state.app_config.color_schemes["time_mapping"])
         else:
             # Fallback to population
-            zones, bins, color_list = assign_colors_to_zones(zones, "POP_2024", "Population")
+            zones, _ = assign_colors_to_zones(zones, "POP_2024", "Population")
         
         # Create time mapping layer
         zones_layer = create_time_mapping_layer(zones, map_config, analysis_config.clicked_zone_id)
@@ -202,6 +225,9 @@ def main():
     
     # Store config in session state for access throughout the app
     st.session_state.app_config = config
+    configure_result_cache(config.result_cache_mb, config.result_store_dir, config.result_store_mb)
+    configure_scenario_registry(config.scenario_memory_mb, config.scenario_spill_dir, config.scenario_spill_mb)
+    start_background_warmup(config)
     
     # Display main header
     display_main_header()
@@ -212,6 +238,8 @@ def main():
     if zones is None or base_skim is None:
         st.error("Failed to load required data. Please check your data files.")
         st.stop()
+    # Shallow per-session view: added columns never reach the shared frame
+    zones = zones.copy(deep=False)
     
     # Show data validation status
     total_zones = len(zones)
@@ -227,9 +255,6 @@ def main():
         st.error("No valid attributes found in the data")
         st.stop()
     
-    # Format population for tooltips
-    zones["POP_2024_fmt"] = zones["POP_2024"].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "N/A")
-    
     # Display sidebar settings and get updated configuration
     analysis_config = display_sidebar_settings(
         st.session_state.analysis_config, 
@@ -237,6 +262,22 @@ def main():
         attribute_display_names
     )
     
+    # Time-of-day period skims replace the base skim when configured
+    period_stack = get_period_stack(config, node_to_taz)
+    if period_stack is not None:
+        analysis_config.period = display_period_selector(period_stack.periods, analysis_config.period)
+        base_skim = get_period_skim(period_stack.fingerprint, analysis_config.period, period_stack)
+    
+    # Multimodal network combined lazily from the configured mode skims
+    if config.mode_skims:
+        analysis_config = display_multimodal_settings(list(config.mode_skims), analysis_config)
+        if analysis_config.combined_modes:
+            combined_skim = get_combined_skim(config, node_to_taz, analysis_config.combined_modes,
+                                              analysis_config.combine_method)
+            if combined_skim is not None:
+                base_skim = combined_skim
+                period_stack = None  # Period results describe the base network only
+    
     # Handle file upload
     uploaded_file, scenario_name, view = display_file_upload_section()
     analysis_config.view = view
@@ -268,9 +309,9 @@ def main():
     
     # Process data based on analysis type
     if analysis_config.analysis_type == "Accessibility":
-        zones = process_accessibility_data(zones, base_skim, scenario_skim, analysis_config)
+        zones = process_accessibility_data(zones, base_skim, scenario_skim, analysis_config, config, period_stack)
     else:  # Time Mapping
-        zones = process_time_mapping_data(zones, base_skim, scenario_skim, analysis_config)
+        zones = process_time_mapping_data(zones, base_skim, scenario_skim, analysis_config, config)
     
     # Load LGA data
     lga_gdf = load_lga_gdf(config)
@@ -307,9 +348,10 @@ def main():
     if analysis_config.analysis_type == "Time Mapping" and analysis_config.clicked_zone_id:
         result = display_time_mapping_analysis(
             analysis_config.clicked_zone_id, 
-            base_skim, 
+            get_zone_travel_times(base_skim, analysis_config.clicked_zone_id, analysis_config.time_mapping_direction), 
             zones, 
-            analysis_config.time_band
+            analysis_config.time_band,
+            analysis_config.time_mapping_direction
         )
         if result is None:  # User clicked clear button
             st.session_state.analysis_config.clicked_zone_id = None
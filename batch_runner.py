@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Headless batch runner for Lagos Accessibility Dashboard
+Computes accessibility for every scenario x attribute x time threshold
+combination and writes one partitioned Parquet results dataset.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BASE_SCENARIO_NAME = "Base Scenario"
+
+# Per-process state, loaded lazily so each worker reads the inputs only once
+_WORKER_STATE: Dict[str, object] = {}
+
+def _quiet_streamlit():
+    """Silence Streamlit's 'no runtime' warnings when cached loaders run headless."""
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+
+def _worker_inputs(config_path: str):
+    """Return (config, zones, node_to_taz) for this process."""
+    if "config" not in _WORKER_STATE:
+        _quiet_streamlit()
+        from models import AppConfig
+        from data_processing import load_zones, load_node_to_taz_mapping
+        from result_cache import configure_result_cache
+
+        config = AppConfig.load_from_yaml(config_path)
+        configure_result_cache(config.result_cache_mb, config.result_store_dir, config.result_store_mb)
+        _WORKER_STATE["config"] = config
+        _WORKER_STATE["zones"] = pd.DataFrame(load_zones(config).drop(columns="geometry"))
+        _WORKER_STATE["node_to_taz"] = load_node_to_taz_mapping(config)
+    return _WORKER_STATE["config"], _WORKER_STATE["zones"], _WORKER_STATE["node_to_taz"]
+
+def _worker_index(config_path: str, scenario_path: Optional[str]):
+    """Return (travel time index, skim fingerprint) of a scenario (None means the base scenario)."""
+    from accessibility_engine import TravelTimeIndex, skim_fingerprint
+    from data_processing import load_base_skim, load_scenario_skim
+
+    key = f"index:{scenario_path}"
+    if key not in _WORKER_STATE:
+        config, _, node_to_taz = _worker_inputs(config_path)
+        if scenario_path is None:
+            skim = load_base_skim(config)
+        else:
+            skim = load_scenario_skim(scenario_path, node_to_taz)
+        _WORKER_STATE[key] = (TravelTimeIndex(skim), skim_fingerprint(skim))
+    return _WORKER_STATE[key]
+
+def compute_scenario_attribute(config_path: str, scenario_name: str, scenario_path: Optional[str],
+                               attribute: str, thresholds: List[int]) -> pd.DataFrame:
+    """Compute accessibility for all thresholds of one scenario/attribute pair.
+
+    Thresholds are swept in ascending order with the incremental engine, so
+    each OD pair is visited once per attribute regardless of grid size.
+    Each result is also written to the shared result store, if configured,
+    under the same key the dashboard uses.
+    """
+    from accessibility_engine import IncrementalAccessibility
+    from data_processing import accessibility_cache_key
+    from result_cache import get_result_cache, frame_to_arrays
+
+    _, zones, _ = _worker_inputs(config_path)
+    index, skim_id = _worker_index(config_path, scenario_path)
+    engine = IncrementalAccessibility(index, zones, attribute)
+    store = get_result_cache().store
+    total_attribute = zones[attribute].sum()
+    zone_ids = zones[["ZONE_ID"]]
+
+    frames = []
+    for threshold in sorted(thresholds):
+        engine.update(threshold)
+        result = engine.to_frame()
+        if store is not None:
+            store.put(accessibility_cache_key(skim_id, zones, threshold, attribute), frame_to_arrays(result))
+        access = zone_ids.merge(result, on="ZONE_ID", how="left")
+        access["accessible_value"] = access["accessible_value"].fillna(0)
+        access["accessible_pct"] = (access["accessible_value"] / total_attribute * 100) if total_attribute else np.nan
+        access["threshold"] = np.int32(threshold)
+        frames.append(access)
+
+    results = pd.concat(frames, ignore_index=True)
+    results["scenario"] = scenario_name
+    results["attribute"] = attribute
+    return results
+
+def default_attributes(zones: pd.DataFrame) -> List[str]:
+    """Main attributes: those with display metadata that exist in the zone data."""
+    from models import ATTRIBUTE_METADATA
+
+    attributes = [attr for category in ATTRIBUTE_METADATA.values() for attr in category
+                  if attr in zones.columns]
+    if "POP_2024" in zones.columns:
+        attributes.append("POP_2024")
+    return attributes
+
+def write_results(results: pd.DataFrame, output_dir: str):
+    """Append one result chunk to the partitioned Parquet dataset."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(results, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        root_path=output_dir,
+        partition_cols=["scenario", "attribute"],
+        existing_data_behavior="delete_matching"
+    )
+
+def run_batch(config_path: str, scenarios: List[Tuple[str, Optional[str]]], attributes: List[str],
+              thresholds: List[int], output_dir: str, workers: int) -> int:
+    """Run the full grid across a process pool; returns the number of result rows."""
+    tasks = [(name, path, attribute) for name, path in scenarios for attribute in attributes]
+    print(f"🧮 {len(scenarios)} scenarios x {len(attributes)} attributes x {len(thresholds)} thresholds "
+          f"= {len(tasks) * len(thresholds)} accessibility maps")
+
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(compute_scenario_attribute, config_path, name, path, attribute, thresholds): (name, attribute)
+            for name, path, attribute in tasks
+        }
+        for future in as_completed(futures):
+            name, attribute = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"❌ {name} / {attribute}: {e}")
+                logger.error(f"Batch task failed for {name} / {attribute}: {e}")
+                continue
+            write_results(results, output_dir)
+            total_rows += len(results)
+            print(f"✅ {name} / {attribute}: {len(results):,} rows")
+
+    return total_rows
+
+def main():
+    """Main function with command line argument parsing."""
+    parser = argparse.ArgumentParser(description="Compute accessibility for scenario x threshold x attribute grids")
+    parser.add_argument("scenarios", nargs="*", help="Scenario skim files (node-based Parquet or Excel)")
+    parser.add_argument("--config", default="config.yaml", help="Configuration file (default: config.yaml)")
+    parser.add_argument("--attributes", nargs="+", help="Zone attributes to analyze (default: main attributes)")
+    parser.add_argument("--thresholds", nargs="+", type=int, help="Time thresholds in minutes (default: time_thresholds from config)")
+    parser.add_argument("--output", default="results/accessibility", help="Output dataset directory")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes (default: 4)")
+    parser.add_argument("--skip-base", action="store_true", help="Do not include the base scenario")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    print("🗺️  Lagos Accessibility Dashboard - Batch Runner")
+    print("=" * 50)
+
+    config, zones, _ = _worker_inputs(args.config)
+    thresholds = args.thresholds or config.time_thresholds
+    attributes = args.attributes or default_attributes(zones)
+    missing = [attr for attr in attributes if attr not in zones.columns]
+    if missing:
+        print(f"❌ Unknown attributes: {', '.join(missing)}")
+        sys.exit(1)
+
+    scenarios: List[Tuple[str, Optional[str]]] = []
+    if not args.skip_base:
+        scenarios.append((BASE_SCENARIO_NAME, None))
+    for path in args.scenarios:
+        if not Path(path).exists():
+            print(f"❌ Scenario file not found: {path}")
+            sys.exit(1)
+        scenarios.append((Path(path).stem, path))
+    if not scenarios:
+        print("❌ No scenarios to process")
+        sys.exit(1)
+
+    start_time = time.time()
+    total_rows = run_batch(args.config, scenarios, attributes, thresholds, args.output, max(1, args.workers))
+    print(f"\n🎉 Wrote {total_rows:,} rows to {args.output} in {time.time() - start_time:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
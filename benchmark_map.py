@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Map rendering benchmark for Lagos Accessibility Dashboard
+Builds zone maps from synthetic zone sets of increasing size with Leaflet's
+SVG and canvas renderers, and reports Python build time, HTML size and,
+when Selenium and Chrome are available, headless browser render times.
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import folium
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from models import MapConfig
+from map_utils import (
+    ZONE_GEOMETRY_FIELDS,
+    ZoneGeometryLayer,
+    ZoneStyleUpdate,
+    assign_colors_to_zones,
+    create_accessibility_layer,
+    create_base_map,
+    zone_style_payload
+)
+from geometry_encoding import DEFAULT_ENCODING, encode_layer
+
+logger = logging.getLogger(__name__)
+
+ZONE_COUNTS = [930, 1860, 2790, 5580, 9300]  # Current model, then 2x, 3x, 6x and 10x the zones
+VERTICES_PER_ZONE = 22  # Mean of the current TAZ polygons
+BOUNDS = (2.95, 6.38, 3.85, 6.70)  # Around the default view, so every synthetic zone is drawn
+
+# Appended to the map page: records when the first frame after load has been painted
+_LOAD_PROBE = """
+<script>
+window.addEventListener("load", function() {
+    requestAnimationFrame(function() { requestAnimationFrame(function() {
+        window.benchmarkLoadMs = performance.now();
+    }); });
+});
+</script>
+"""
+
+# Zooms in and back out without animation; reports the mean time until the next painted frame
+_REDRAW_PROBE = """
+var done = arguments[arguments.length - 1];
+var map = window[arguments[0]];
+var times = [];
+function step(delta, next) {
+    var start = performance.now();
+    map.once("zoomend", function() {
+        requestAnimationFrame(function() { requestAnimationFrame(function() {
+            times.push(performance.now() - start);
+            next();
+        }); });
+    });
+    map.setZoom(map.getZoom() + delta, {animate: false});
+}
+step(1, function() { step(-1, function() { done((times[0] + times[1]) / 2); }); });
+"""
+
+def synthetic_zones(n_zones: int, vertices_per_zone: int = VERTICES_PER_ZONE, seed: int = 0) -> gpd.GeoDataFrame:
+    """Voronoi zones covering BOUNDS with the app's zone columns and random attributes."""
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = BOUNDS
+    points = shapely.points(rng.uniform(minx, maxx, n_zones), rng.uniform(miny, maxy, n_zones))
+    extent = shapely.box(*BOUNDS)
+    cells = shapely.get_parts(shapely.voronoi_polygons(shapely.multipoints(points), extend_to=extent))
+    cells = shapely.intersection(cells, extent)
+    # Densify the cell edges to the vertex count of real zone boundaries
+    cells = shapely.segmentize(cells, shapely.length(cells) / vertices_per_zone)
+
+    population = rng.integers(500, 50_000, len(cells))
+    employment = rng.integers(100, 20_000, len(cells))
+    return gpd.GeoDataFrame({
+        "ZONE_ID": np.arange(1, len(cells) + 1),
+        "POP_2024": population,
+        "Emp 2024": employment,
+        "POP_2024_fmt": [f"{v:,}" for v in population],
+        "Emp_2024_fmt": [f"{v:,}" for v in employment],
+        "access_A": rng.gamma(2.0, 1_000_000, len(cells)),
+    }, geometry=cells, crs="EPSG:4326")
+
+def build_map(zones: gpd.GeoDataFrame, prefer_canvas: bool, mode: str = "style",
+              encoding: str = DEFAULT_ENCODING) -> folium.Map:
+    """Map of colored zones built the way the app builds it.
+
+    mode "style" embeds the zone geometry with a style payload (the app's
+    map_style_updates mode); "full" draws a styled GeoJSON layer.
+    """
+    config = MapConfig(prefer_canvas=prefer_canvas, geometry_encoding=encoding)
+    m = create_base_map(config)
+    zones, _ = assign_colors_to_zones(zones, "access_A", "Jobs")
+    if mode == "style":
+        fields = [col for col in ZONE_GEOMETRY_FIELDS if col in zones.columns]
+        ZoneGeometryLayer(encode_layer(zones, fields, encoding, "zones")).add_to(m)
+        styles = folium.FeatureGroup(name="Zone styles", control=False)
+        ZoneStyleUpdate(zone_style_payload(zones, config)).add_to(styles)
+        styles.add_to(m)
+    else:
+        create_accessibility_layer(zones, "Base", config).add_to(m)
+    return m
+
+def start_browser(width: int = 1600, height: int = 1000):
+    """Headless Chrome driver, or None when Selenium or Chrome is unavailable."""
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+    except ImportError:
+        return None
+
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument(f"--window-size={width},{height}")
+    try:
+        return webdriver.Chrome(options=options)
+    except Exception as e:
+        logger.warning(f"Headless Chrome unavailable: {e}")
+        return None
+
+def measure_render(driver, html_path: Path, map_name: str, timeout: float = 120.0) -> Dict[str, Optional[float]]:
+    """Milliseconds until the first painted frame after load, and per zoom redraw."""
+    driver.set_script_timeout(timeout)
+    driver.get(html_path.resolve().as_uri())
+    deadline = time.time() + timeout
+    load_ms = None
+    while load_ms is None and time.time() < deadline:
+        load_ms = driver.execute_script("return window.benchmarkLoadMs || null;")
+        if load_ms is None:
+            time.sleep(0.05)
+    redraw_ms = driver.execute_async_script(_REDRAW_PROBE, map_name) if load_ms is not None else None
+    return {"load_ms": load_ms, "redraw_ms": redraw_ms}
+
+def run_benchmark(zone_counts: List[int], mode: str = "style", repeat: int = 3,
+                  output_dir: Optional[str] = None, use_browser: bool = True) -> pd.DataFrame:
+    """One row per zone count and renderer; times are the best of repeat runs."""
+    output = Path(output_dir or tempfile.mkdtemp(prefix="map_benchmark_"))
+    output.mkdir(parents=True, exist_ok=True)
+    driver = start_browser() if use_browser else None
+    if use_browser and driver is None:
+        print("⚠️  Selenium/Chrome not available, skipping browser render times")
+
+    rows = []
+    try:
+        for n_zones in zone_counts:
+            zones = synthetic_zones(n_zones)
+            for renderer in ("svg", "canvas"):
+                build_times, html = [], ""
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    m = build_map(zones, renderer == "canvas", mode)
+                    html = m.get_root().render()
+                    build_times.append(time.perf_counter() - start)
+
+                row = {
+                    "zones": len(zones),
+                    "renderer": renderer,
+                    "build_s": round(min(build_times), 3),
+                    "html_mb": round(len(html.encode()) / 1e6, 2),
+                    "load_ms": None,
+                    "redraw_ms": None,
+                }
+                if driver is not None:
+                    html_path = output / f"map_{mode}_{len(zones)}_{renderer}.html"
+                    html_path.write_text(html.replace("</body>", _LOAD_PROBE + "</body>"), encoding="utf-8")
+                    timings = [measure_render(driver, html_path, m.get_name()) for _ in range(repeat)]
+                    for name in ("load_ms", "redraw_ms"):
+                        values = [t[name] for t in timings if t[name] is not None]
+                        row[name] = round(min(values)) if values else None
+                rows.append(row)
+                print(f"✅ {row['zones']:,} zones, {renderer}: {row['build_s']}s build, {row['html_mb']} MB")
+    finally:
+        if driver is not None:
+            driver.quit()
+    return pd.DataFrame(rows)
+
+def main():
+    """Main function with command line argument parsing."""
+    parser = argparse.ArgumentParser(description="Benchmark map build and render cost against zone count")
+    parser.add_argument("--zones", nargs="+", type=int, default=ZONE_COUNTS, help="Synthetic zone counts")
+    parser.add_argument("--mode", choices=["style", "full"], default="style",
+                        help="style: embedded geometry with a style payload (map_style_updates); full: styled GeoJSON layer")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported (default: 3)")
+    parser.add_argument("--no-browser", action="store_true", help="Skip headless browser render times")
+    parser.add_argument("--html-dir", help="Keep the benchmark maps in this directory")
+    parser.add_argument("--output", help="Write the results to this CSV file")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    print("🗺️  Lagos Accessibility Dashboard - Map Rendering Benchmark")
+    print("=" * 50)
+
+    results = run_benchmark(args.zones, args.mode, max(1, args.repeat), args.html_dir, not args.no_browser)
+    print()
+    print(results.to_string(index=False))
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\n📄 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Cache instrumentation for Lagos Accessibility Dashboard
+
+Every cache layer records calls, misses, compute time and entry sizes per
+cached function (or result kind) in one process-wide registry. Hits are
+calls minus misses; the compute time saved is estimated as hits times the
+mean compute time of a miss. Use tracked_cache_data / tracked_cache_resource
+in place of st.cache_data / st.cache_resource to instrument a function.
+"""
+import functools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+@dataclass
+class CacheStats:
+    """Counters for one cached function or result kind."""
+    name: str
+    layer: str
+    calls: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    evictions: Optional[int] = None  # None where the layer does not report evictions
+    compute_seconds: float = 0.0
+    computed_bytes: int = 0
+
+    @property
+    def hits(self) -> int:
+        return max(self.calls - self.misses, 0)
+
+    @property
+    def mean_compute_seconds(self) -> float:
+        return self.compute_seconds / self.misses if self.misses else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "layer": self.layer,
+            "calls": self.calls,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / self.calls, 4) if self.calls else None,
+            "compute_seconds": round(self.compute_seconds, 4),
+            "mean_compute_seconds": round(self.mean_compute_seconds, 4),
+            "saved_seconds": round(self.hits * self.mean_compute_seconds, 4),
+            "mean_entry_bytes": self.computed_bytes // self.misses if self.misses else 0,
+        }
+
+_REGISTRY: Dict[str, CacheStats] = {}
+_lock = threading.Lock()
+
+def get_stats(name: str, layer: str, track_evictions: bool = False) -> CacheStats:
+    """Return (creating on first use) the stats record for a cached function."""
+    with _lock:
+        stats = _REGISTRY.get(name)
+        if stats is None:
+            stats = _REGISTRY[name] = CacheStats(name, layer, evictions=0 if track_evictions else None)
+        return stats
+
+def record_call(stats: CacheStats, disk_hit: bool = False):
+    with _lock:
+        stats.calls += 1
+        if disk_hit:
+            stats.disk_hits += 1
+
+def record_miss(stats: CacheStats, seconds: float, nbytes: int):
+    with _lock:
+        stats.misses += 1
+        stats.compute_seconds += seconds
+        stats.computed_bytes += nbytes
+
+def record_eviction(stats: CacheStats):
+    with _lock:
+        stats.evictions = (stats.evictions or 0) + 1
+
+def estimate_nbytes(value: Any) -> int:
+    """Shallow in-memory size of a cached value (frames, arrays and containers of them)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (pd.Series, np.ndarray)):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_nbytes(v) for v in value)
+    nbytes = getattr(value, "nbytes", 0)
+    return int(nbytes) if isinstance(nbytes, (int, np.integer)) else 0
+
+def _tracked(cache_decorator: Callable, layer: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        stats = get_stats(func.__qualname__, layer)
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            # Only runs when the Streamlit cache misses
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            record_miss(stats, time.perf_counter() - start, estimate_nbytes(result))
+            return result
+
+        cached = cache_decorator(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            record_call(stats)
+            return cached(*args, **kwargs)
+
+        call.clear = cached.clear
+        return call
+    return decorator
+
+def tracked_cache_data(**kwargs) -> Callable:
+    """st.cache_data with hit/miss, compute time and entry size tracking."""
+    return _tracked(st.cache_data(**kwargs), "st.cache_data")
+
+def tracked_cache_resource(**kwargs) -> Callable:
+    """st.cache_resource with hit/miss, compute time and entry size tracking."""
+    return _tracked(st.cache_resource(**kwargs), "st.cache_resource")
+
+def function_stats() -> List[Dict[str, Any]]:
+    """Snapshot of all registered stats, sorted by layer and name."""
+    with _lock:
+        return [stats.to_dict() for stats in sorted(_REGISTRY.values(), key=lambda s: (s.layer, s.name))]
+
+def reset_stats():
+    """Zero all recorded counters (the caches themselves are untouched)."""
+    with _lock:
+        for stats in _REGISTRY.values():
+            stats.calls = stats.misses = stats.disk_hits = stats.computed_bytes = 0
+            stats.compute_seconds = 0.0
+            stats.evictions = 0 if stats.evictions is not None else None
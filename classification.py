@@ -0,0 +1,185 @@
+"""
+Choropleth classification for Lagos Accessibility Dashboard
+
+Class breaks come from one of the supported schemes (quantile, equal
+interval, Jenks natural breaks). Values are assigned to classes in one
+np.digitize call, and colors and labels are looked up from small per-class
+arrays, so coloring costs the same whatever the number of zones. The
+map legend is read off the classification as well, in class order.
+"""
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SCHEMES = {
+    "quantile": "Quantiles",
+    "equal_interval": "Equal interval",
+    "jenks": "Natural breaks (Jenks)",
+}
+DEFAULT_SCHEME = "quantile"
+
+JENKS_MAX_SAMPLE = 2000  # Jenks is O(k n²); larger inputs are reduced to evenly spaced quantiles
+
+@dataclass
+class LegendItem:
+    """One legend row; lower/upper are the class edges (None for missing values)."""
+    color: str
+    label: str
+    lower: Optional[float] = None
+    upper: Optional[float] = None
+    count: int = 0
+
+@dataclass
+class Legend:
+    """Legend rows in display order, with the legend title."""
+    items: List[LegendItem] = field(default_factory=list)
+    title: str = "Legend"
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def titled(self, title: str) -> "Legend":
+        return replace(self, title=title)
+
+@dataclass
+class Classification:
+    """Class of every value plus the per-class breaks, colors and labels.
+
+    classes holds -1 for missing values, which index the trailing
+    missing_color / missing_label entry of the lookup arrays.
+    """
+    breaks: List[float]
+    colors: List[str]
+    labels: List[str]
+    classes: np.ndarray
+    missing_color: str = "#808080"
+    missing_label: str = "No data"
+
+    @property
+    def n_classes(self) -> int:
+        return len(self.colors)
+
+    def color_array(self) -> np.ndarray:
+        return np.array(self.colors + [self.missing_color], dtype=object)[self.classes]
+
+    def label_array(self) -> np.ndarray:
+        return np.array(self.labels + [self.missing_label], dtype=object)[self.classes]
+
+    def counts(self) -> np.ndarray:
+        """Number of values per class (missing values excluded)."""
+        return np.bincount(self.classes[self.classes >= 0], minlength=self.n_classes)
+
+    def legend(self, title: str = "Legend", missing_first: bool = False) -> Legend:
+        """Legend of the classes holding at least one value, plus the missing entry if any value is missing."""
+        counts = self.counts()
+        items = [LegendItem(self.colors[i], self.labels[i], self.breaks[i], self.breaks[i + 1], int(counts[i]))
+                 for i in range(self.n_classes) if counts[i]]
+        n_missing = int((self.classes < 0).sum())
+        if n_missing:
+            missing = LegendItem(self.missing_color, self.missing_label, count=n_missing)
+            items = [missing] + items if missing_first else items + [missing]
+        return Legend(items, title)
+
+def as_float_array(values) -> np.ndarray:
+    """Values as a float array with NaN for missing or non-numeric entries."""
+    return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+def quantile_breaks(values: np.ndarray, n_classes: int) -> np.ndarray:
+    return pd.Series(values).quantile(np.arange(n_classes + 1) / n_classes).to_numpy()
+
+def equal_interval_breaks(values: np.ndarray, n_classes: int) -> np.ndarray:
+    return np.linspace(values.min(), values.max(), n_classes + 1)
+
+def jenks_breaks(values: np.ndarray, n_classes: int, max_sample: int = JENKS_MAX_SAMPLE) -> np.ndarray:
+    """Fisher-Jenks natural breaks: lower bound of every class plus the maximum.
+
+    Minimizes the total within-class sum of squared deviations by dynamic
+    programming over the sorted values.
+    """
+    v = np.sort(values)
+    if len(v) > max_sample:
+        v = np.quantile(v, np.linspace(0, 1, max_sample))
+    n = len(v)
+    k = max(1, min(n_classes, len(np.unique(v))))
+    csum = np.concatenate([[0.0], np.cumsum(v)])
+    csum2 = np.concatenate([[0.0], np.cumsum(v * v)])
+
+    # cost[c, j]: best total deviation of v[:j] in c classes; start[c, j]: first index of the last class
+    cost = np.full((k + 1, n + 1), np.inf)
+    cost[0, 0] = 0.0
+    start = np.zeros((k + 1, n + 1), dtype=np.int64)
+    for c in range(1, k + 1):
+        for j in range(c, n + 1):
+            i = np.arange(c - 1, j)
+            size = j - i
+            deviation = csum2[j] - csum2[i] - (csum[j] - csum[i]) ** 2 / size
+            total = cost[c - 1, i] + deviation
+            best = int(np.argmin(total))
+            cost[c, j] = total[best]
+            start[c, j] = i[best]
+
+    lower_bounds = []
+    j = n
+    for c in range(k, 0, -1):
+        j = start[c, j]
+        lower_bounds.append(v[j])
+    return np.array(lower_bounds[::-1] + [v[-1]])
+
+_BREAKS = {
+    "quantile": quantile_breaks,
+    "equal_interval": equal_interval_breaks,
+    "jenks": jenks_breaks,
+}
+
+def class_breaks(values, n_classes: int, scheme: str = DEFAULT_SCHEME) -> np.ndarray:
+    """n_classes + 1 class edges (fewer for Jenks on few distinct values) of the non-missing values."""
+    if scheme not in _BREAKS:
+        raise ValueError(f"Unknown classification scheme '{scheme}', expected one of {list(SCHEMES)}")
+    values = as_float_array(values)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.array([])
+    return _BREAKS[scheme](values, n_classes)
+
+def make_increasing(breaks: Sequence[float], step: float = 1) -> List[float]:
+    """Bump repeated edges so every break is larger than the previous one."""
+    breaks = [float(b) for b in breaks]
+    for i in range(1, len(breaks)):
+        if breaks[i] <= breaks[i - 1]:
+            breaks[i] = breaks[i - 1] + step
+    return breaks
+
+def range_labels(breaks: Sequence[float], formatter: Callable[[float], str],
+                 separator: str = " - ", suffix: str = "") -> List[str]:
+    """"a - b" labels for every class, with an open "z+" label for the last one."""
+    n_classes = len(breaks) - 1
+    labels = [f"{formatter(breaks[i])}{separator}{formatter(breaks[i + 1])}{suffix}" for i in range(n_classes - 1)]
+    labels.append(f"{formatter(breaks[n_classes - 1])}+{suffix}")
+    return labels
+
+def classify(values, breaks: Sequence[float], colors: Sequence[str], labels: Sequence[str],
+             missing: Optional[np.ndarray] = None, missing_color: str = "#808080",
+             missing_label: str = "No data", right: bool = False) -> Classification:
+    """Assign every value to a class of breaks.
+
+    Classes are [breaks[i], breaks[i+1]) (or (breaks[i], breaks[i+1]] with
+    right=True); values beyond the outer edges fall into the first or last
+    class. NaN values, and those flagged in missing, get class -1.
+    """
+    values = as_float_array(values)
+    inner = np.asarray(breaks[1:-1], dtype=float)
+    classes = np.digitize(values, inner, right=right).astype(np.int64)
+    invalid = np.isnan(values)
+    if missing is not None:
+        invalid |= np.asarray(missing, dtype=bool)
+    classes[invalid] = -1
+    return Classification(
+        breaks=[float(b) for b in breaks],
+        colors=list(colors),
+        labels=list(labels),
+        classes=classes,
+        missing_color=missing_color,
+        missing_label=missing_label,
+    )
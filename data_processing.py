@@ -3,13 +3,31 @@ Data loading and processing utilities for Lagos Accessibility Dashboard
 """
 import pandas as pd
 import geopandas as gpd
+import hashlib
 import logging
 import math
+import os
+import time
 from typing import Optional, Tuple, List, Dict
 from pathlib import Path
 import streamlit as st
 
-from models import AppConfig, ATTRIBUTE_METADATA
+from models import AppConfig, ATTRIBUTE_METADATA, DAILY_PERIOD
+from equity_analysis import compute_equity_metrics
+from isochrones import build_isochrones
+from cache_stats import tracked_cache_data, tracked_cache_resource, function_stats
+from scenario_registry import get_scenario_registry
+from result_cache import get_result_cache, array_digest, frame_to_arrays, arrays_to_frame
+from accessibility_engine import (
+    compute_accessibility_blocked,
+    compute_time_bands,
+    skim_fingerprint,
+    TravelTimeIndex,
+    IncrementalAccessibility,
+    ZoneSliceIndex,
+    PeriodSkimStack,
+    combine_mode_skims
+)
 
 logger = logging.getLogger(__name__)
 
@@ -103,7 +121,7 @@ def validate_uploaded_file(uploaded_file, config: AppConfig) -> bool:
         log_error_with_context("validate_uploaded_file", e)
         return False
 
-@st.cache_data(ttl=7200, show_spinner=False)  # Cache for 2 hours, hide spinner for cached loads
+@tracked_cache_data(ttl=7200, show_spinner=False)  # Cache for 2 hours, hide spinner for cached loads
 def load_zones(config: AppConfig) -> Optional[gpd.GeoDataFrame]:
     """Load and prepare transportation analysis zones."""
     try:
@@ -148,34 +166,75 @@ def load_zones(config: AppConfig) -> Optional[gpd.GeoDataFrame]:
         log_error_with_context("load_zones", e, {"file": config.data_paths.zones})
         raise DataLoadError(f"Failed to load transportation zones: {str(e)}")
 
-@st.cache_data(ttl=7200, show_spinner=False, max_entries=3)  # Cache for 2 hours, hide spinner, limit cache size
+def read_node_skim(source, file_extension: str) -> pd.DataFrame:
+    """Read a node-based skim (Parquet or Excel) into origin_node, destination_node, travel_time."""
+    if file_extension == '.parquet':
+        # Load Parquet file (much faster!)
+        df = pd.read_parquet(source)
+        # Ensure columns are named correctly
+        if len(df.columns) >= 3 and "travel_time" not in df.columns:
+            df.columns = ["origin_node", "destination_node", "travel_time"]
+        # Parquet files are typically pre-cleaned
+        return df
+
+    # Load Excel file with optimizations
+    df = pd.read_excel(
+        source, 
+        usecols=[0, 1, 2],
+        engine='openpyxl',  # Use faster engine
+        dtype={2: str}  # Read travel_time as string to handle "--" values
+    )
+    df.columns = ["origin_node", "destination_node", "travel_time"]
+    
+    # Clean Excel data (Parquet files are typically pre-cleaned)
+    mask = df["travel_time"] != "--"
+    df = df[mask].copy()  # Create copy to avoid warnings
+    df["travel_time"] = pd.to_numeric(df["travel_time"], errors="coerce")
+    return df.dropna(subset=["travel_time"])
+
+def convert_node_skim_to_zones(df: pd.DataFrame, node_to_zone_df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a node-based skim to a zone-based skim, averaging duplicate zone pairs."""
+    # Convert node IDs to zone IDs
+    df = df.merge(
+        node_to_zone_df[["node_id", "zone_id"]], 
+        left_on="origin_node", 
+        right_on="node_id"
+    ).rename(columns={"zone_id": "origin_zone"}).drop(columns=["node_id"])
+    
+    df = df.merge(
+        node_to_zone_df[["node_id", "zone_id"]], 
+        left_on="destination_node", 
+        right_on="node_id"
+    ).rename(columns={"zone_id": "destination_zone"}).drop(columns=["node_id"])
+
+    # Clean up and prepare final skim
+    df = df.dropna(subset=["origin_zone", "destination_zone"])
+    df["origin_zone"] = df["origin_zone"].astype("int32")
+    df["destination_zone"] = df["destination_zone"].astype("int32")
+
+    # Average travel times for same zone pairs
+    return df.groupby(["origin_zone", "destination_zone"])["travel_time"].mean().reset_index()
+
+def load_scenario_skim(path: str, node_to_zone_df: pd.DataFrame) -> pd.DataFrame:
+    """Load a scenario skim file from disk (used outside the Streamlit app)."""
+    try:
+        file_path = Path(path)
+        df = read_node_skim(file_path, file_path.suffix.lower())
+        return convert_node_skim_to_zones(df, node_to_zone_df)
+    except FileNotFoundError:
+        log_error_with_context("load_scenario_skim", FileNotFoundError("File not found"), {"file": path})
+        raise DataLoadError(f"Scenario file ({path}) not found")
+    except Exception as e:
+        log_error_with_context("load_scenario_skim", e, {"file": path})
+        raise DataLoadError(f"Failed to load scenario {path}: {str(e)}")
+
+@tracked_cache_data(ttl=7200, show_spinner=False, max_entries=3)  # Cache for 2 hours, hide spinner, limit cache size
 def load_base_skim(config: AppConfig) -> Optional[pd.DataFrame]:
     """Load base scenario travel time matrix and convert from node-based to zone-based."""
     try:
+        # Same reader as uploaded and registered scenarios, so all skims are cleaned alike
         file_path = Path(str(config.data_paths.base_scenario))
-        
-        # Auto-detect file format and use appropriate loader
-        if file_path.suffix.lower() == '.parquet':
-            # Load Parquet file (much faster!)
-            df = pd.read_parquet(config.data_paths.base_scenario)
-            # Parquet files are already cleaned, so minimal processing needed
-            if "travel_time" not in df.columns:
-                df.columns = ["origin_node", "destination_node", "travel_time"]
-        else:
-            # Load Excel file (legacy support)
-            df = pd.read_excel(
-                config.data_paths.base_scenario, 
-                usecols=[0, 1, 2],
-                engine='openpyxl',  # Use faster engine
-                dtype={'travel_time': str}  # Read as string first to handle "--" values
-            )
-            df.columns = ["origin_node", "destination_node", "travel_time"]
-            
-            # Clean Excel data (Parquet files are pre-cleaned)
-            mask = df["travel_time"] != "--"
-            df = df[mask].copy()  # Create copy to avoid SettingWithCopyWarning
-            df["travel_time"] = pd.to_numeric(df["travel_time"], errors="coerce")
-            df = df.dropna(subset=["travel_time"])
+        df = read_node_skim(file_path, file_path.suffix.lower())
 
         # Load node to zone mapping
         node_to_zone_df = load_node_to_taz_mapping(config)
@@ -183,28 +242,7 @@ def load_base_skim(config: AppConfig) -> Optional[pd.DataFrame]:
         # Ensure zone_id is int32 in mapping
         node_to_zone_df["zone_id"] = node_to_zone_df["zone_id"].astype("int32")
         
-        # Convert node IDs to zone IDs
-        df = df.merge(
-            node_to_zone_df[["node_id", "zone_id"]], 
-            left_on="origin_node", 
-            right_on="node_id"
-        ).rename(columns={"zone_id": "origin_zone"}).drop(columns=["node_id"])
-        
-        df = df.merge(
-            node_to_zone_df[["node_id", "zone_id"]], 
-            left_on="destination_node", 
-            right_on="node_id"
-        ).rename(columns={"zone_id": "destination_zone"}).drop(columns=["node_id"])
-
-        # Clean up and prepare final skim
-        df = df.dropna(subset=["origin_zone", "destination_zone"])
-        df["origin_zone"] = df["origin_zone"].astype("int32")
-        df["destination_zone"] = df["destination_zone"].astype("int32")
-
-        # Average travel times for same zone pairs
-        skim = df.groupby(["origin_zone", "destination_zone"])["travel_time"].mean().reset_index()
-        
-        return skim
+        return convert_node_skim_to_zones(df, node_to_zone_df)
     except FileNotFoundError:
         log_error_with_context("load_base_skim", FileNotFoundError("File not found"), {"file": config.data_paths.base_scenario})
         raise DataLoadError(f"Base scenario file ({config.data_paths.base_scenario}) not found")
@@ -212,7 +250,7 @@ def load_base_skim(config: AppConfig) -> Optional[pd.DataFrame]:
         log_error_with_context("load_base_skim", e, {"file": config.data_paths.base_scenario})
         raise DataLoadError(f"Failed to load base scenario: {str(e)}")
 
-@st.cache_data(ttl=7200, show_spinner=False)  # Cache for 2 hours, hide spinner
+@tracked_cache_data(ttl=7200, show_spinner=False)  # Cache for 2 hours, hide spinner
 def load_node_to_taz_mapping(config: AppConfig) -> pd.DataFrame:
     """Load mapping between network nodes and transportation zones."""
     try:
@@ -235,7 +273,7 @@ def load_node_to_taz_mapping(config: AppConfig) -> pd.DataFrame:
         log_error_with_context("load_node_to_taz_mapping", e, {"file": config.data_paths.node_mapping})
         raise DataLoadError(f"Failed to load node-to-TAZ mapping: {str(e)}")
 
-@st.cache_data(ttl=7200, show_spinner=False)  # Cache for 2 hours, hide spinner
+@tracked_cache_resource(show_spinner=False, max_entries=2)  # One read-only copy shared by all sessions
 def load_lga_gdf(config: AppConfig):
     """Load LGA boundaries."""
     try:
@@ -249,108 +287,297 @@ def load_lga_gdf(config: AppConfig):
         logger.warning(f"Could not load LGAs.geojson: {e}")
         return None
 
-@st.cache_data(ttl=1800, show_spinner=False)  # Cache uploaded files for 30 minutes
+@tracked_cache_resource(show_spinner="Loading time-of-day skims...", max_entries=2)  # One shared stack per period set
+def load_period_skim_stack(period_paths: Tuple[Tuple[str, str], ...], period_weights: Tuple[Tuple[str, float], ...],
+                           _node_to_zone_df: pd.DataFrame) -> PeriodSkimStack:
+    """Load the configured period skims into one stacked array sharing the zone index."""
+    skims = {period: load_scenario_skim(path, _node_to_zone_df) for period, path in period_paths}
+    stack = PeriodSkimStack(skims, dict(period_weights))
+    logger.info(f"Loaded {len(stack.periods)} period skims on {len(stack.zone_ids)} zones "
+                f"({stack.nbytes / 1024 ** 2:.1f} MB)")
+    return stack
+
+def get_period_stack(config: AppConfig, node_to_zone_df: pd.DataFrame) -> Optional[PeriodSkimStack]:
+    """Return the period skim stack from config.yaml, or None when no periods are configured."""
+    if not config.period_skims:
+        return None
+    try:
+        return load_period_skim_stack(
+            tuple(config.period_skims.items()),
+            tuple(sorted(config.period_weights.items())),
+            node_to_zone_df
+        )
+    except Exception as e:
+        log_error_with_context("get_period_stack", e, {"periods": list(config.period_skims)})
+        st.warning(f"Time-of-day skims could not be loaded, using the base scenario: {str(e)}")
+        return None
+
+@tracked_cache_resource(show_spinner=False, max_entries=8)  # Long-format skim per period, shared across sessions
+def get_period_skim(stack_key: str, period: str, _stack: PeriodSkimStack) -> pd.DataFrame:
+    """Long-format skim for one period, or the weighted daily mean travel times for DAILY_PERIOD."""
+    return _stack.daily_skim() if period == DAILY_PERIOD else _stack.period_skim(period)
+
+def calculate_period_accessibility(stack: PeriodSkimStack, zone_df: gpd.GeoDataFrame,
+                                   time_limit: int, attribute: str, memory_limit_mb: float = 512) -> pd.DataFrame:
+    """Accessibility for all periods and the weighted daily average (one column each)."""
+    zones_id = array_digest(zone_df["ZONE_ID"].to_numpy(), zone_df[attribute].to_numpy())
+    key = ("period_accessibility", stack.fingerprint, zones_id, float(time_limit), attribute)
+    arrays = get_result_cache().get_or_compute(key, lambda: frame_to_arrays(
+        stack.accessibility(zone_df, time_limit, attribute, memory_limit_mb).rename(columns={"daily": DAILY_PERIOD})
+    ))
+    return arrays_to_frame(arrays)
+
+def _file_signature(path: str) -> str:
+    """Path, size and modification time, so edited input files invalidate disk caches."""
+    stat = Path(path).stat()
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def combined_skim_cache_path(cache_dir: str, mode_paths: Tuple[Tuple[str, str], ...], method: str,
+                             shares: Tuple[Tuple[str, float], ...], node_mapping_path: str) -> Path:
+    """Disk cache location of one mode combination."""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(method.encode())
+    digest.update(_file_signature(node_mapping_path).encode())
+    for mode, path in sorted(mode_paths):
+        digest.update(f"{mode}={_file_signature(path)}".encode())
+    if method == "blend":
+        digest.update(repr(sorted(shares)).encode())
+    return Path(cache_dir) / f"combined_{method}_{digest.hexdigest()}.parquet"
+
+@tracked_cache_resource(show_spinner="Combining mode skims...", max_entries=4)  # Shared across sessions
+def load_combined_skim(mode_paths: Tuple[Tuple[str, str], ...], method: str, shares: Tuple[Tuple[str, float], ...],
+                       cache_dir: str, node_mapping_path: str, _node_to_zone_df: pd.DataFrame) -> pd.DataFrame:
+    """Materialize a combined mode skim once, reusing the on-disk copy when inputs are unchanged."""
+    cache_file = combined_skim_cache_path(cache_dir, mode_paths, method, shares, node_mapping_path)
+    if cache_file.exists():
+        logger.info(f"Loading combined skim from {cache_file}")
+        return pd.read_parquet(cache_file)
+
+    skims = {mode: load_scenario_skim(path, _node_to_zone_df) for mode, path in mode_paths}
+    combined = combine_mode_skims(skims, method, dict(shares))
+
+    # Write to a temporary file first so readers never see a partial file
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    combined.to_parquet(tmp_file, index=False)
+    os.replace(tmp_file, cache_file)
+    logger.info(f"Combined {len(skims)} mode skims ({method}) into {len(combined):,} OD pairs, cached at {cache_file}")
+    return combined
+
+def get_combined_skim(config: AppConfig, node_to_zone_df: pd.DataFrame, modes: List[str],
+                      method: str) -> Optional[pd.DataFrame]:
+    """Return the lazily combined skim for the selected modes, or None if it cannot be built."""
+    try:
+        mode_paths = tuple((mode, config.mode_skims[mode]) for mode in modes)
+        shares = tuple(sorted((mode, config.mode_shares[mode]) for mode in modes if mode in config.mode_shares))
+        return load_combined_skim(mode_paths, method, shares, config.combined_skim_cache_dir,
+                                  config.data_paths.node_mapping, node_to_zone_df)
+    except Exception as e:
+        log_error_with_context("get_combined_skim", e, {"modes": modes, "method": method})
+        st.warning(f"Multimodal skim could not be built, using the base scenario: {str(e)}")
+        return None
+
+def uploaded_scenario_id(uploaded_file, config: AppConfig) -> str:
+    """Content id of an uploaded scenario: file bytes plus the node mapping it is converted with."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(uploaded_file.getvalue())
+    digest.update(_file_signature(config.data_paths.node_mapping).encode())
+    return digest.hexdigest()
+
 def load_uploaded_skim(uploaded_file, node_to_zone_df: pd.DataFrame, config: AppConfig) -> Optional[pd.DataFrame]:
-    """Load and process an uploaded scenario skim file with optimizations."""
+    """Load and process an uploaded scenario skim file with optimizations.
+
+    Processed skims live in the process-wide scenario registry, so the same
+    upload is converted once and shared by all sessions within the
+    configured memory budget (spilling to disk beyond it).
+    """
     try:
         # Validate file before processing
         if not validate_uploaded_file(uploaded_file, config):
             return None
         
+        registry = get_scenario_registry()
+        scenario_id = uploaded_scenario_id(uploaded_file, config)
+        skim = registry.get(scenario_id)
+        if skim is not None:
+            return skim
+        
         # Auto-detect file format and load accordingly
+        start = time.perf_counter()
         file_extension = Path(uploaded_file.name).suffix.lower()
-        
-        if file_extension == '.parquet':
-            # Load Parquet file (much faster!)
-            df = pd.read_parquet(uploaded_file)
-            # Ensure columns are named correctly
-            if len(df.columns) >= 3 and "travel_time" not in df.columns:
-                df.columns = ["origin_node", "destination_node", "travel_time"]
-            # Parquet files are typically pre-cleaned
-        else:
-            # Load Excel file with optimizations
-            df = pd.read_excel(
-                uploaded_file, 
-                usecols=[0, 1, 2],
-                engine='openpyxl',  # Use faster engine
-                dtype={2: str}  # Read travel_time as string to handle "--" values
-            )
-            df.columns = ["origin_node", "destination_node", "travel_time"]
-            
-            # Clean Excel data (Parquet files are typically pre-cleaned)
-            mask = df["travel_time"] != "--"
-            df = df[mask].copy()  # Create copy to avoid warnings
-            df["travel_time"] = pd.to_numeric(df["travel_time"], errors="coerce")
-            df = df.dropna(subset=["travel_time"])
+        df = read_node_skim(uploaded_file, file_extension)
         
         # Convert node IDs to zone IDs
-        df = df.merge(
-            node_to_zone_df[["node_id", "zone_id"]], 
-            left_on="origin_node", 
-            right_on="node_id"
-        ).rename(columns={"zone_id": "origin_zone"}).drop(columns=["node_id"])
-        
-        df = df.merge(
-            node_to_zone_df[["node_id", "zone_id"]], 
-            left_on="destination_node", 
-            right_on="node_id"
-        ).rename(columns={"zone_id": "destination_zone"}).drop(columns=["node_id"])
-
-        # Clean up and prepare final skim
-        df = df.dropna(subset=["origin_zone", "destination_zone"])
-        df["origin_zone"] = df["origin_zone"].astype("int32")
-        df["destination_zone"] = df["destination_zone"].astype("int32")
-
-        # Average travel times for same zone pairs
-        skim = df.groupby(["origin_zone", "destination_zone"])["travel_time"].mean().reset_index()
+        skim = convert_node_skim_to_zones(df, node_to_zone_df)
         
         # Log successful processing
         logger.info(f"Successfully processed uploaded skim file: {uploaded_file.name}")
         
-        return skim
+        return registry.add(scenario_id, skim, time.perf_counter() - start)
     except Exception as e:
         log_error_with_context("load_uploaded_skim", e, {"file": uploaded_file.name if uploaded_file else "unknown"})
         st.error(f"Error loading scenario file: {str(e)}")
         return None
 
-@st.cache_data(ttl=3600, show_spinner=False)  # Cache calculations for 1 hour
-def calculate_accessibility(_skim_df: pd.DataFrame, _zone_df: gpd.GeoDataFrame, time_limit: int, attribute: str) -> pd.DataFrame:
-    """Calculate accessibility with dynamic attribute selection."""
-    # Filter skim data first to reduce processing
-    filtered_skim = _skim_df[_skim_df["travel_time"] <= time_limit].copy()
-    
-    # Prepare destinations data
-    destinations = _zone_df[["ZONE_ID", attribute]].rename(
-        columns={"ZONE_ID": "destination_zone", attribute: "attribute_value"}
-    )
-    
-    # Optimized merge and aggregation
-    joined = filtered_skim.merge(destinations, on="destination_zone", how="inner")  # Use inner join for efficiency
-    access = joined.groupby("origin_zone", as_index=False)["attribute_value"].sum()
-    access.columns = ["ZONE_ID", "accessible_value"]
-    return access
-
-def calculate_time_band_accessibility(skim_df: pd.DataFrame, time_band: int) -> Dict[str, pd.DataFrame]:
-    """Calculate which zones are accessible within each time band."""
-    time_bands = {}
-    
-    # Pre-sort data for more efficient filtering
-    skim_sorted = skim_df.sort_values("travel_time")
-    
-    for i in range(1, 6):  # Create 5 time bands
-        upper_limit = i * time_band
-        lower_limit = (i - 1) * time_band if i > 1 else 0
+def accessibility_cache_key(skim_id: str, zone_df: pd.DataFrame, time_limit: float, attribute: str) -> tuple:
+    """Result cache key: skim content, destination attribute values and parameters."""
+    zones_id = array_digest(zone_df["ZONE_ID"].to_numpy(), zone_df[attribute].to_numpy())
+    return ("accessibility", skim_id, zones_id, float(time_limit), attribute)
+
+def calculate_accessibility(skim_df: pd.DataFrame, zone_df: gpd.GeoDataFrame, time_limit: int, attribute: str,
+                            chunk_size: Optional[int] = None, memory_limit_mb: int = 512,
+                            max_workers: int = 4) -> pd.DataFrame:
+    """Calculate accessibility with dynamic attribute selection.
+
+    When chunk_size is given the skim is processed in origin blocks with a
+    bounded memory footprint instead of materialising the joined OD table.
+    Results are shared through the process-wide result cache, keyed by
+    skim content so a different skim never returns a stale result.
+    """
+    key = accessibility_cache_key(skim_fingerprint(skim_df), zone_df, time_limit, attribute)
+
+    def compute():
+        if chunk_size:
+            return frame_to_arrays(compute_accessibility_blocked(
+                skim_df, zone_df, time_limit, attribute,
+                chunk_size=chunk_size, memory_limit_mb=memory_limit_mb, max_workers=max_workers
+            ))
+
+        # Filter skim data first to reduce processing
+        filtered_skim = skim_df[skim_df["travel_time"] <= time_limit]
         
-        # Optimized filtering
-        mask = (skim_sorted["travel_time"] > lower_limit) & (skim_sorted["travel_time"] <= upper_limit)
-        band_skim = skim_sorted[mask]
+        # Prepare destinations data
+        destinations = zone_df[["ZONE_ID", attribute]].rename(
+            columns={"ZONE_ID": "destination_zone", attribute: "attribute_value"}
+        )
         
-        # Count accessible zones for each origin
-        band_access = band_skim.groupby("origin_zone", as_index=False).size()
-        band_access.columns = ["origin_zone", f"zones_{lower_limit}_{upper_limit}"]
-        time_bands[f"zones_{lower_limit}_{upper_limit}"] = band_access
-    
-    return time_bands
+        # Optimized merge and aggregation
+        joined = filtered_skim.merge(destinations, on="destination_zone", how="inner")  # Use inner join for efficiency
+        access = joined.groupby("origin_zone", as_index=False)["attribute_value"].sum()
+        access.columns = ["ZONE_ID", "accessible_value"]
+        return frame_to_arrays(access)
+
+    return arrays_to_frame(get_result_cache().get_or_compute(key, compute))
+
+@tracked_cache_resource(show_spinner=False, max_entries=4)  # Shared, read-only across sessions
+def get_travel_time_index(skim_id: str, _skim_df: pd.DataFrame) -> TravelTimeIndex:
+    """Build the travel-time-sorted OD index for a skim (once per skim content)."""
+    logger.info(f"Building travel time index for skim {skim_id[:8]} ({len(_skim_df):,} OD pairs)")
+    return TravelTimeIndex(_skim_df)
+
+def travel_time_index(skim_id: str, skim_df: pd.DataFrame) -> TravelTimeIndex:
+    """Travel time index of a skim; registered scenarios keep theirs within the scenario memory budget."""
+    index = get_scenario_registry().derived(skim_id, "travel_time_index", lambda: TravelTimeIndex(skim_df))
+    return index if index is not None else get_travel_time_index(skim_id, skim_df)
+
+def calculate_accessibility_incremental(skim_df: pd.DataFrame, zone_df: gpd.GeoDataFrame,
+                                        time_limit: int, attribute: str) -> pd.DataFrame:
+    """Calculate accessibility by updating this session's last result.
+
+    The per-session engine keeps the previous threshold's result, so moving
+    the slider only processes the OD pairs whose travel time lies between
+    the old and the new threshold.
+    """
+    skim_id = skim_fingerprint(skim_df)
+    cache = get_result_cache()
+    cache_key = accessibility_cache_key(skim_id, zone_df, time_limit, attribute)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return arrays_to_frame(cached)
+
+    engines = st.session_state.setdefault("accessibility_engines", {})
+    key = (skim_id, attribute)
+    engine = engines.get(key)
+    if engine is None:
+        engine = IncrementalAccessibility(travel_time_index(skim_id, skim_df), zone_df, attribute)
+        engines[key] = engine
+        # Keep only the most recent engines (base + scenario across a few attributes)
+        while len(engines) > 8:
+            engines.pop(next(iter(engines)))
+    start = time.perf_counter()
+    engine.update(time_limit)
+    arrays = frame_to_arrays(engine.to_frame())
+    return arrays_to_frame(cache.put(cache_key, arrays, time.perf_counter() - start))
+
+@tracked_cache_data(ttl=3600, show_spinner=False, max_entries=64)  # Keyed by the accessibility values themselves
+def calculate_equity_metrics(access: pd.DataFrame, population: pd.Series, total_attribute: float,
+                             thresholds_pct: Tuple[float, ...]) -> Dict[str, pd.DataFrame]:
+    """Calculate population-weighted equity metrics for each accessibility column."""
+    return compute_equity_metrics(access, population, total_attribute, thresholds_pct)
+
+def calculate_time_band_accessibility(skim_df: pd.DataFrame, time_band: int, n_bands: int = 5,
+                                      zone_df: Optional[gpd.GeoDataFrame] = None,
+                                      attribute: Optional[str] = None) -> pd.DataFrame:
+    """Calculate how many zones (or how much of an attribute) each origin reaches per time band.
+
+    Returns one wide table: origin_zone plus a zones_{lower}_{upper} column per band.
+    """
+    zones_id = array_digest(zone_df["ZONE_ID"].to_numpy(), zone_df[attribute].to_numpy()) if attribute else None
+    key = ("time_bands", skim_fingerprint(skim_df), zones_id, float(time_band), int(n_bands), attribute)
+    arrays = get_result_cache().get_or_compute(key, lambda: frame_to_arrays(
+        compute_time_bands(skim_df, time_band, n_bands, zone_df=zone_df, attribute=attribute)
+    ))
+    return arrays_to_frame(arrays)
+
+@tracked_cache_resource(show_spinner=False, max_entries=4)  # Shared, read-only across sessions
+def get_zone_slice_index(skim_id: str, by: str, _skim_df: pd.DataFrame) -> ZoneSliceIndex:
+    """Build the origin- or destination-sorted slice index for a skim."""
+    logger.info(f"Building {by} slice index for skim {skim_id[:8]}")
+    return ZoneSliceIndex(_skim_df, by=by)
+
+def get_zone_travel_times(skim_df: pd.DataFrame, zone_id: int, direction: str = "origin") -> pd.DataFrame:
+    """Travel times from (direction='origin') or to (direction='destination') one zone.
+
+    Returns ZONE_ID of the other end of each pair and travel_time.
+    """
+    by = "origin_zone" if direction == "origin" else "destination_zone"
+    skim_id = skim_fingerprint(skim_df)
+    # Registered scenarios keep their indexes within the scenario memory budget
+    index = get_scenario_registry().derived(skim_id, ("zone_slice_index", by), lambda: ZoneSliceIndex(skim_df, by=by))
+    if index is None:
+        index = get_zone_slice_index(skim_id, by, skim_df)
+    return index.travel_times_for(int(zone_id))
+
+@tracked_cache_data(show_spinner=False, max_entries=32)  # LRU over recently selected zones
+def get_isochrones(skim_id: str, zone_id: int, direction: str, time_band: int,
+                   _zones_gdf: gpd.GeoDataFrame, _skim_df: pd.DataFrame) -> gpd.GeoDataFrame:
+    """Dissolved travel time band polygons from or to one zone, cached per (skim, zone, direction, band width)."""
+    logger.info(f"Building {direction} isochrones for zone {zone_id} (skim {skim_id[:8]}, {time_band} min bands)")
+    return build_isochrones(_zones_gdf, get_zone_travel_times(_skim_df, zone_id, direction), time_band)
+
+def calculate_isochrones(zones_gdf: gpd.GeoDataFrame, skim_df: pd.DataFrame, zone_id: int,
+                         time_band: int, direction: str = "origin") -> gpd.GeoDataFrame:
+    """Isochrone polygons for the selected zone (see get_isochrones)."""
+    return get_isochrones(skim_fingerprint(skim_df), int(zone_id), direction, int(time_band), zones_gdf, skim_df)
+
+def collect_cache_report() -> Dict:
+    """Statistics of every cache layer for the debug report and JSON export."""
+    cache = get_result_cache()
+    report = {
+        "functions": function_stats(),
+        "result_cache": {
+            "entries": len(cache),
+            "nbytes": cache.nbytes,
+            "max_bytes": cache.max_bytes,
+            "hits": cache.hits,
+            "disk_hits": cache.disk_hits,
+            "misses": cache.misses,
+            "evictions": cache.evictions,
+        },
+        "result_store": None,
+        "scenario_registry": get_scenario_registry().summary(),
+    }
+    if cache.store is not None:
+        try:
+            report["result_store"] = {
+                "directory": str(cache.store.directory),
+                "max_bytes": cache.store.max_bytes,
+                "evictions": cache.store.evictions,
+                **cache.store.stats(),
+            }
+        except Exception as e:
+            logger.warning(f"Could not read result store statistics: {e}")
+    return report
 
 def organize_available_attributes(zones_df: gpd.GeoDataFrame) -> Tuple[List[str], Dict[str, str]]:
     """Organize available attributes into categories with proper display names."""
@@ -380,23 +607,48 @@ def organize_available_attributes(zones_df: gpd.GeoDataFrame) -> Tuple[List[str]
     
     return available_attributes, attribute_display_names
 
+def add_display_columns(zones: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Add the formatted population and employment columns used in tooltips."""
+    formatted = {}
+    for col, fmt_col in [("POP_2024", "POP_2024_fmt"), ("Emp 2024", "Emp_2024_fmt")]:
+        if col in zones.columns:
+            formatted[fmt_col] = zones[col].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "N/A")
+    return zones.assign(**formatted)
+
+@tracked_cache_resource(show_spinner=False, max_entries=2)  # One read-only copy shared by all sessions
+def load_shared_base_data(config: AppConfig) -> Tuple[gpd.GeoDataFrame, pd.DataFrame, pd.DataFrame]:
+    """Load zones, base skim and node mapping once per process.
+
+    The returned frames are shared by every session and must not be
+    modified in place; derive per-session frames with assign() or a
+    shallow copy instead.
+    """
+    zones = load_zones(config)
+    if zones is None:
+        raise DataLoadError("Failed to load zones")
+    
+    base_skim = load_base_skim(config)
+    if base_skim is None:
+        raise DataLoadError("Failed to load base scenario")
+    
+    node_to_taz = load_node_to_taz_mapping(config)
+    if node_to_taz is None:
+        raise DataLoadError("Failed to load node-to-TAZ mapping")
+    
+    return add_display_columns(zones), base_skim, node_to_taz
+
+def align_to_zones(zones: pd.DataFrame, table: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Rows of a per-zone result table in zone order, with missing zones filled with 0."""
+    return table.set_index(key).reindex(zones["ZONE_ID"].to_numpy()).fillna(0)
+
 def safe_load_data(config: AppConfig) -> Tuple[Optional[gpd.GeoDataFrame], Optional[pd.DataFrame], Optional[pd.DataFrame]]:
-    """Safely load all required data files with error handling."""
+    """Safely load all required data files with error handling.
+
+    Returns the process-wide shared (read-only) base data.
+    """
     try:
         # Load all data files (spinner handled at app level)
-        zones = load_zones(config)
-        if zones is None:
-            raise DataLoadError("Failed to load zones")
-        
-        base_skim = load_base_skim(config)
-        if base_skim is None:
-            raise DataLoadError("Failed to load base scenario")
-        
-        node_to_taz = load_node_to_taz_mapping(config)
-        if node_to_taz is None:
-            raise DataLoadError("Failed to load node-to-TAZ mapping")
-        
-        return zones, base_skim, node_to_taz
+        return load_shared_base_data(config)
     except Exception as e:
         log_error_with_context("safe_load_data", e)
         st.error(f"**Data Loading Error**: {str(e)}")
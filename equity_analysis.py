@@ -0,0 +1,120 @@
+"""
+Equity analysis of accessibility distributions for Lagos Accessibility Dashboard
+
+All metrics are population-weighted and computed for several scenarios at
+once: accessibility is passed as a (scenarios x zones) array and every
+function returns one value (or row) per scenario.
+"""
+import logging
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Population shares used for the Lorenz curve output grid
+LORENZ_GRID = np.linspace(0.0, 1.0, 101)
+
+def _sorted_cumulative(values: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sort each scenario by accessibility and return (sorted values, P, L).
+
+    P and L are the cumulative population and accessibility shares with a
+    leading zero column, i.e. the Lorenz curve vertices of each scenario.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), values.shape)
+
+    order = np.argsort(values, axis=1, kind="stable")
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    sorted_weights = np.take_along_axis(weights, order, axis=1)
+
+    cum_weights = np.cumsum(sorted_weights, axis=1)
+    cum_access = np.cumsum(sorted_values * sorted_weights, axis=1)
+    total_weights = cum_weights[:, -1:]
+    total_access = cum_access[:, -1:]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        population_share = np.where(total_weights > 0, cum_weights / total_weights, np.nan)
+        access_share = np.where(total_access > 0, cum_access / total_access, np.nan)
+
+    zeros = np.zeros((values.shape[0], 1))
+    return sorted_values, np.hstack([zeros, population_share]), np.hstack([zeros, access_share])
+
+def _interp_rows(x: np.ndarray, xp: np.ndarray, fp: np.ndarray) -> np.ndarray:
+    """Row-wise linear interpolation of fp(xp) at points x (xp increasing per row)."""
+    x = np.asarray(x, dtype=np.float64)
+    n = xp.shape[1]
+    # Index of the first vertex at or above each point, per row
+    upper = np.clip((xp[:, :, None] < x[None, None, :]).sum(axis=1), 1, n - 1)
+    lower = upper - 1
+    x0 = np.take_along_axis(xp, lower, axis=1)
+    x1 = np.take_along_axis(xp, upper, axis=1)
+    y0 = np.take_along_axis(fp, lower, axis=1)
+    y1 = np.take_along_axis(fp, upper, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(x1 > x0, (x[None, :] - x0) / (x1 - x0), 0.0)
+    return y0 + t * (y1 - y0)
+
+def weighted_gini(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Population-weighted Gini coefficient per scenario (0 = perfectly even)."""
+    _, population_share, access_share = _sorted_cumulative(values, weights)
+    dp = np.diff(population_share, axis=1)
+    area = (dp * (access_share[:, 1:] + access_share[:, :-1])).sum(axis=1)
+    return 1.0 - area
+
+def lorenz_curves(values: np.ndarray, weights: np.ndarray, grid: np.ndarray = LORENZ_GRID) -> np.ndarray:
+    """Lorenz curves sampled on a common population-share grid, shape (scenarios, grid)."""
+    _, population_share, access_share = _sorted_cumulative(values, weights)
+    return _interp_rows(grid, population_share, access_share)
+
+def palma_ratio(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Accessibility share of the best-served 10% over that of the worst-served 40%."""
+    _, population_share, access_share = _sorted_cumulative(values, weights)
+    bottom_40, top_cut = _interp_rows(np.array([0.4, 0.9]), population_share, access_share).T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(bottom_40 > 0, (1.0 - top_cut) / bottom_40, np.inf)
+
+def weighted_percentiles(values: np.ndarray, weights: np.ndarray, percentiles: Sequence[float]) -> np.ndarray:
+    """Accessibility at population-weighted percentiles, shape (scenarios, percentiles)."""
+    sorted_values, population_share, _ = _sorted_cumulative(values, weights)
+    q = np.asarray(percentiles, dtype=np.float64) / 100.0
+    # First zone whose cumulative population reaches each percentile
+    idx = (population_share[:, 1:, None] < q[None, None, :]).sum(axis=1)
+    idx = np.clip(idx, 0, sorted_values.shape[1] - 1)
+    return np.take_along_axis(sorted_values, idx, axis=1)
+
+def share_below(values: np.ndarray, weights: np.ndarray, thresholds: Sequence[float]) -> np.ndarray:
+    """Share of population whose accessibility is below each threshold, shape (scenarios, thresholds)."""
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    weights = np.asarray(weights, dtype=np.float64)
+    below = values[:, :, None] < np.asarray(thresholds, dtype=np.float64)[None, None, :]
+    total = weights.sum()
+    return (below * weights[None, :, None]).sum(axis=1) / total if total > 0 else np.full(below.shape[::2], np.nan)
+
+def compute_equity_metrics(access: pd.DataFrame, population: pd.Series, total_attribute: float,
+                           thresholds_pct: Sequence[float] = (10, 25, 50),
+                           percentiles: Sequence[float] = (10, 50, 90)) -> Dict[str, pd.DataFrame]:
+    """Compute equity metrics for every accessibility column (one column per scenario).
+
+    Returns a 'summary' table indexed by scenario and a 'lorenz' table with
+    one curve per scenario on a common population-share grid. Thresholds
+    are percentages of the city-wide attribute total.
+    """
+    scenarios: List[str] = list(access.columns)
+    values = np.nan_to_num(access.to_numpy(dtype=np.float64).T)
+    weights = np.nan_to_num(population.to_numpy(dtype=np.float64))
+
+    summary = pd.DataFrame(index=pd.Index(scenarios, name="scenario"))
+    summary["gini"] = weighted_gini(values, weights)
+    summary["palma"] = palma_ratio(values, weights)
+    for p, column in zip(percentiles, weighted_percentiles(values, weights, percentiles).T):
+        summary[f"p{int(p)}"] = column
+
+    thresholds = np.asarray(thresholds_pct, dtype=np.float64) / 100.0 * total_attribute
+    for pct, column in zip(thresholds_pct, share_below(values, weights, thresholds).T):
+        summary[f"share_below_{int(pct)}pct"] = column
+
+    lorenz = pd.DataFrame(lorenz_curves(values, weights).T, columns=scenarios,
+                          index=pd.Index(LORENZ_GRID, name="population_share"))
+    return {"summary": summary, "lorenz": lorenz}
@@ -12,6 +12,7 @@ import logging
 from pathlib import Path
 
 from models import AnalysisConfig
+from map_utils import embed_zone_geometry
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +22,9 @@ def export_map_as_png(map_object: folium.Map, filename: str = "exported_map.png"
                      high_quality: bool = True) -> str:
     """Export a Folium map as a PNG image using Selenium with proper map extent and legend."""
     try:
-        # Always use the original map object to preserve all layers and styling
-        export_map = map_object
+        # Copy of the map with all layers and styling; zone geometry served by the app
+        # is embedded so the file works standalone
+        export_map = embed_zone_geometry(map_object)
         
         # Save map to a temporary HTML file
         with tempfile.NamedTemporaryFile(suffix=".html", delete=False) as tmpfile:
@@ -226,7 +228,7 @@ def export_map_as_png(map_object: folium.Map, filename: str = "exported_map.png"
 
 def create_html_export_fallback(map_object: folium.Map, filename: str) -> str:
     """Create HTML export as fallback when PNG export fails."""
-    map_html = map_object._repr_html_()
+    map_html = embed_zone_geometry(map_object)._repr_html_()
     complete_html = f"""
     <!DOCTYPE html>
     <html>
@@ -298,7 +300,8 @@ def create_data_export(zones: gpd.GeoDataFrame, analysis_config: AnalysisConfig)
     return export_df
 
 def display_export_section(map_object: folium.Map, zones: gpd.GeoDataFrame, 
-                         analysis_config: AnalysisConfig, map_data: Optional[Dict[str, Any]] = None):
+                         analysis_config: AnalysisConfig, map_data: Optional[Dict[str, Any]] = None,
+                         isochrones: Optional[gpd.GeoDataFrame] = None):
     """Display export section in sidebar."""
     st.sidebar.markdown("---")
     st.sidebar.markdown("""
@@ -383,6 +386,15 @@ def display_export_section(map_object: folium.Map, zones: gpd.GeoDataFrame,
                 except Exception as e:
                     st.sidebar.error(f"❌ Failed to export data: {str(e)}")
 
+    # Isochrones are only a handful of polygons, so offer them directly
+    if isochrones is not None and not isochrones.empty:
+        st.sidebar.download_button(
+            label="🧭 Download Isochrones (GeoJSON)",
+            data=isochrones.drop(columns=["color"], errors="ignore").to_json(),
+            file_name=f"lagos_isochrones_zone_{analysis_config.clicked_zone_id}_{analysis_config.time_band}min.geojson",
+            mime="application/geo+json"
+        )
+
 
 
 def add_keyboard_shortcuts():
@@ -0,0 +1,227 @@
+"""
+Compact geometry encodings for map layers in Lagos Accessibility Dashboard
+
+Layers can be sent to the browser as plain GeoJSON, as GeoJSON with
+coordinates rounded to ~1 m, or as TopoJSON: coordinates quantized to the
+same ~1 m grid and delta-encoded, with boundaries shared by neighbouring
+polygons stored once as arcs. TOPOJSON_DECODER_JS turns a topology back
+into GeoJSON in the browser. Layers can also be simplified on the way;
+TopoJSON simplifies each shared arc once, so neighbours stay aligned.
+"""
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+ENCODINGS = ["geojson", "quantized", "topojson"]
+DEFAULT_ENCODING = "topojson"
+
+QUANTUM = 1e-5  # Degrees; ~1.1 m at Lagos latitudes
+
+Point = Tuple[int, int]
+
+def quantize_coordinates(gdf: gpd.GeoDataFrame, quantum: float = QUANTUM) -> gpd.GeoDataFrame:
+    """Copy of gdf with every coordinate rounded to a multiple of quantum."""
+    decimals = int(round(-np.log10(quantum)))
+    geometry = shapely.transform(gdf.geometry.values, lambda coords: np.round(coords, decimals))
+    return gdf.set_geometry(gpd.GeoSeries(geometry, index=gdf.index, crs=gdf.crs))
+
+def _polygons(geom) -> Optional[List[shapely.Polygon]]:
+    """Polygons of a (Multi)Polygon, [] for empty geometries and None for other types."""
+    if geom is None or geom.is_empty:
+        return []
+    if geom.geom_type == "Polygon":
+        return [geom]
+    if geom.geom_type == "MultiPolygon":
+        return list(geom.geoms)
+    return None
+
+def _quantized_ring(coords: np.ndarray, translate: np.ndarray, quantum: float) -> List[Point]:
+    """Open ring (no closing point) of grid points without consecutive repeats."""
+    grid = np.round((coords[:, :2] - translate) / quantum).astype(np.int64)
+    keep = np.ones(len(grid), dtype=bool)
+    keep[1:] = np.any(grid[1:] != grid[:-1], axis=1)
+    ring = [tuple(p) for p in grid[keep].tolist()]
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring.pop()
+    return ring
+
+def _junctions(rings: Iterable[List[Point]]) -> set:
+    """Points where neighbouring rings stop sharing a boundary."""
+    neighbours: Dict[Point, set] = {}
+    for ring in rings:
+        n = len(ring)
+        for i, point in enumerate(ring):
+            pair = frozenset((ring[i - 1], ring[(i + 1) % n]))
+            neighbours.setdefault(point, set()).add(pair)
+    return {point for point, pairs in neighbours.items() if len(pairs) > 1}
+
+class _ArcIndex:
+    """Deduplicated arcs; an arc used in the opposite direction is referenced as ~index."""
+
+    def __init__(self):
+        self.arcs: List[List[Point]] = []
+        self._index: Dict[Tuple[Point, ...], int] = {}
+
+    def add(self, arc: List[Point], reversed_arc: Optional[List[Point]] = None) -> int:
+        key = tuple(arc)
+        if key in self._index:
+            return self._index[key]
+        reverse_key = tuple(reversed_arc if reversed_arc is not None else arc[::-1])
+        if reverse_key in self._index:
+            return ~self._index[reverse_key]
+        self._index[key] = len(self.arcs)
+        self.arcs.append(arc)
+        return len(self.arcs) - 1
+
+    def add_ring(self, ring: List[Point], junctions: set) -> List[int]:
+        cuts = [i for i, point in enumerate(ring) if point in junctions]
+        if not cuts:
+            # Unshared ring (or one shared whole, like a hole filled by another zone): start at its smallest point
+            start = min(range(len(ring)), key=ring.__getitem__)
+            ring = ring[start:] + ring[:start]
+            reverse = [ring[0]] + ring[:0:-1]
+            return [self.add(ring + [ring[0]], reverse + [reverse[0]])]
+        ring = ring[cuts[0]:] + ring[:cuts[0]]
+        cuts = [i - cuts[0] for i in cuts] + [len(ring)]
+        closed = ring + [ring[0]]
+        return [self.add(closed[a:b + 1]) for a, b in zip(cuts[:-1], cuts[1:])]
+
+def _simplify_arc(arc: List[Point], tolerance: float) -> List[Point]:
+    """Douglas-Peucker simplification (tolerance in grid units) keeping the arc's end points."""
+    if len(arc) <= 2:
+        return arc
+    simplified = shapely.simplify(shapely.LineString(arc), tolerance, preserve_topology=True)
+    points = [tuple(p) for p in np.rint(shapely.get_coordinates(simplified)).astype(np.int64).tolist()]
+    if arc[0] == arc[-1] and len(points) < 4:
+        return arc  # A ring on its own would collapse
+    return points
+
+def _delta_encode(arc: List[Point]) -> List[List[int]]:
+    points = np.asarray(arc, dtype=np.int64)
+    points[1:] = np.diff(points, axis=0)
+    return points.tolist()
+
+def to_topojson(gdf: gpd.GeoDataFrame, fields: List[str], object_name: str = "layer",
+                quantum: float = QUANTUM, simplify: float = 0.0) -> Optional[str]:
+    """TopoJSON text of a polygon layer with the given property fields.
+
+    simplify is a Douglas-Peucker tolerance in degrees applied to every arc.
+    Returns None when the layer holds non-polygonal geometries.
+    """
+    translate = gdf.total_bounds[:2] if len(gdf) else np.zeros(2)
+    features = []
+    for geom in gdf.geometry.values:
+        polygons = _polygons(geom)
+        if polygons is None:
+            return None
+        rings = []
+        for polygon in polygons:
+            exterior = _quantized_ring(np.asarray(polygon.exterior.coords), translate, quantum)
+            if len(exterior) < 3:
+                continue  # Collapsed below the grid resolution
+            interiors = [_quantized_ring(np.asarray(hole.coords), translate, quantum) for hole in polygon.interiors]
+            rings.append([exterior] + [hole for hole in interiors if len(hole) >= 3])
+        features.append(rings)
+
+    junctions = _junctions(ring for polygons in features for polygon in polygons for ring in polygon)
+    index = _ArcIndex()
+    properties = gdf[fields].to_dict("records") if fields else [{}] * len(gdf)
+    geometries = []
+    for polygons, props in zip(features, properties):
+        arcs = [[index.add_ring(ring, junctions) for ring in polygon] for polygon in polygons]
+        if not arcs:
+            geometry = {"type": None}
+        elif len(arcs) == 1:
+            geometry = {"type": "Polygon", "arcs": arcs[0]}
+        else:
+            geometry = {"type": "MultiPolygon", "arcs": arcs}
+        geometry["properties"] = props
+        geometries.append(geometry)
+
+    topology = {
+        "type": "Topology",
+        "transform": {"scale": [quantum, quantum], "translate": [float(translate[0]), float(translate[1])]},
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": [_delta_encode(_simplify_arc(arc, simplify / quantum) if simplify else arc) for arc in index.arcs],
+    }
+    return json.dumps(topology, separators=(",", ":"), default=str)
+
+def encode_layer(gdf: gpd.GeoDataFrame, fields: List[str], encoding: str = DEFAULT_ENCODING,
+                 object_name: str = "layer", simplify: float = 0.0) -> str:
+    """Layer text in the requested encoding (GeoJSON or TopoJSON), optionally simplified by simplify degrees."""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown geometry encoding '{encoding}', expected one of {ENCODINGS}")
+    if encoding == "topojson":
+        topology = to_topojson(gdf, fields, object_name, simplify=simplify)
+        if topology is not None:
+            return topology
+    if simplify:
+        gdf = gdf.set_geometry(gdf.geometry.simplify(simplify, preserve_topology=True))
+    if encoding != "geojson":
+        gdf = quantize_coordinates(gdf)
+    return gdf[fields + [gdf.geometry.name]].to_json(drop_id=True)
+
+def decode_topology(topology: dict) -> dict:
+    """GeoJSON FeatureCollection of the first object of a topology (Python twin of the browser decoder)."""
+    scale, translate = topology["transform"]["scale"], topology["transform"]["translate"]
+    arcs = []
+    for arc in topology["arcs"]:
+        points = np.cumsum(np.asarray(arc, dtype=np.int64), axis=0) * scale + translate
+        arcs.append(points.tolist())
+
+    def ring(indexes):
+        coords = []
+        for i in indexes:
+            arc = arcs[i] if i >= 0 else arcs[~i][::-1]
+            coords.extend(arc[1:] if coords else arc)
+        return coords
+
+    features = []
+    collection = next(iter(topology["objects"].values()))
+    for geometry in collection["geometries"]:
+        if geometry["type"] == "Polygon":
+            geo = {"type": "Polygon", "coordinates": [ring(r) for r in geometry["arcs"]]}
+        elif geometry["type"] == "MultiPolygon":
+            geo = {"type": "MultiPolygon", "coordinates": [[ring(r) for r in p] for p in geometry["arcs"]]}
+        else:
+            geo = None
+        features.append({"type": "Feature", "properties": geometry.get("properties", {}), "geometry": geo})
+    return {"type": "FeatureCollection", "features": features}
+
+# Defines window.decodeTopology(data): GeoJSON passes through, a topology becomes a FeatureCollection
+TOPOJSON_DECODER_JS = """
+if (!window.decodeTopology) {
+    window.decodeTopology = function(data) {
+        if (data.type !== "Topology") { return data; }
+        var scale = data.transform.scale, translate = data.transform.translate;
+        var arcs = data.arcs.map(function(arc) {
+            var x = 0, y = 0;
+            return arc.map(function(d) {
+                x += d[0]; y += d[1];
+                return [x * scale[0] + translate[0], y * scale[1] + translate[1]];
+            });
+        });
+        function ring(indexes) {
+            var coords = [];
+            indexes.forEach(function(i) {
+                var arc = i >= 0 ? arcs[i] : arcs[~i].slice().reverse();
+                coords.push.apply(coords, coords.length ? arc.slice(1) : arc);
+            });
+            return coords;
+        }
+        var collection = data.objects[Object.keys(data.objects)[0]];
+        return {type: "FeatureCollection", features: collection.geometries.map(function(g) {
+            var geometry = null;
+            if (g.type === "Polygon") {
+                geometry = {type: "Polygon", coordinates: g.arcs.map(ring)};
+            } else if (g.type === "MultiPolygon") {
+                geometry = {type: "MultiPolygon", coordinates: g.arcs.map(function(p) { return p.map(ring); })};
+            }
+            return {type: "Feature", properties: g.properties || {}, geometry: geometry};
+        })};
+    };
+}
+"""
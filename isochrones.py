@@ -0,0 +1,61 @@
+"""
+Isochrone polygons for Lagos Accessibility Dashboard
+
+An isochrone band is the dissolved union of all zones whose travel time
+from (or to) one zone falls in (lower, upper]. Bands follow the same
+classes as the Time Mapping zone coloring: ceil(t / time_band) - 1, with
+the last band left open-ended.
+"""
+import logging
+from typing import Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+logger = logging.getLogger(__name__)
+
+# Simplification tolerance in degrees (~10 m at Lagos' latitude)
+ISOCHRONE_SIMPLIFY_TOLERANCE = 0.0001
+
+def travel_time_bands(times: np.ndarray, time_band: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Mask of usable travel times and the band index of each usable time.
+
+    NaN, inf (unreachable) and negative times are not usable; a usable time
+    t falls in band max(ceil(t / time_band) - 1, 0).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    valid = np.isfinite(times) & (times >= 0)
+    band = np.maximum(np.ceil(times[valid] / time_band).astype(np.int64) - 1, 0)
+    return valid, band
+
+def build_isochrones(zones_gdf: gpd.GeoDataFrame, travel_times: pd.DataFrame, time_band: int,
+                     simplify_tolerance: Optional[float] = ISOCHRONE_SIMPLIFY_TOLERANCE) -> gpd.GeoDataFrame:
+    """Dissolve zones into one polygon per travel time band.
+
+    travel_times holds ZONE_ID (the other end of each pair) and
+    travel_time. Returns one row per non-empty band with band index,
+    lower/upper bounds in minutes, a display label, the number of zones and
+    the dissolved geometry. Zones without a usable travel time (missing or
+    unreachable) are left out.
+    """
+    columns = ["band", "lower", "upper", "label", "zones", "geometry"]
+    times = zones_gdf[["ZONE_ID"]].merge(travel_times, on="ZONE_ID", how="left")
+    valid, band = travel_time_bands(times["travel_time"].to_numpy(dtype=np.float64), time_band)
+    if not valid.any():
+        return gpd.GeoDataFrame(columns=columns, geometry="geometry", crs=zones_gdf.crs)
+
+    geometries = zones_gdf.geometry.to_numpy()[valid]
+    n_bands = int(band.max()) + 1
+
+    rows = []
+    for b in np.unique(band):
+        geometry = shapely.union_all(geometries[band == b])
+        if simplify_tolerance:
+            geometry = shapely.simplify(geometry, simplify_tolerance, preserve_topology=True)
+        lower, upper = int(b) * time_band, (int(b) + 1) * time_band
+        label = f"{lower}+ min" if b == n_bands - 1 else f"{lower}-{upper} min"
+        rows.append((int(b), lower, upper, label, int((band == b).sum()), geometry))
+
+    return gpd.GeoDataFrame(pd.DataFrame(rows, columns=columns), geometry="geometry", crs=zones_gdf.crs)
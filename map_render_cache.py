@@ -0,0 +1,263 @@
+"""
+Rendered map cache for Lagos Accessibility Dashboard
+
+Building the folium map and rendering it for st_folium are repeated on
+every rerun, although most reruns come from widgets that leave the map
+unchanged (export options, tables, checkboxes). Rendered maps are kept in
+a small process-wide LRU keyed by a canonical hash of everything the map
+is drawn from: analysis state, map settings, app configuration and skim
+fingerprints. A rerun with a known key skips data processing and map
+building and sends the stored component arguments to the st_folium
+frontend as they are.
+
+Rendering relies on private streamlit-folium helpers and on the argument
+list of its 0.27 frontend. If they fail at runtime, RenderCacheError is
+raised, the cache is switched off for the process and callers fall back
+to st_folium.
+"""
+import dataclasses
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import branca
+import folium
+import folium.elements
+import geopandas as gpd
+import streamlit as st
+
+from cache_stats import get_stats, record_call, record_miss, record_eviction
+
+try:
+    # Rendering helpers behind st_folium (streamlit-folium 0.27, pinned in requirements.txt);
+    # without them every run calls st_folium
+    from streamlit_folium import (
+        _component_func, _get_feature_group_string, _get_header, _get_html, _get_map_string,
+        generate_js_hash, get_full_id
+    )
+    RENDER_CACHE_AVAILABLE = True
+except ImportError:
+    RENDER_CACHE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAP_RENDER_CACHE_ENTRIES = 16
+
+# What a changed helper signature or component argument list raises
+_RENDER_ERRORS = (TypeError, AttributeError)
+
+class RenderCacheError(RuntimeError):
+    """The streamlit-folium internals behind the cache did not work as expected."""
+
+# Values st_folium reports before the first interaction, besides bounds and zoom
+_EMPTY_MAP_STATE = [
+    "last_clicked", "last_object_clicked", "last_object_clicked_count", "last_object_clicked_tooltip",
+    "last_object_clicked_popup", "all_drawings", "last_active_drawing", "last_circle_radius",
+    "last_circle_polygon", "selected_layers", "selected_tags", "last_geocoder_result",
+]
+
+def _plain(value: Any) -> Any:
+    """JSON-ready copy of value with string dict keys, so dicts with mixed key types sort."""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        value = dataclasses.asdict(value)
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+def canonical_key(*parts: Any) -> str:
+    """Digest of dataclasses, dicts, lists and scalars that does not depend on dict order."""
+    text = json.dumps(_plain(parts), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+@dataclass
+class RenderedMap:
+    """A drawn map with the data it was drawn from and its st_folium component arguments."""
+    map: folium.Map
+    zones: gpd.GeoDataFrame
+    isochrones: Optional[gpd.GeoDataFrame]
+    style_only: bool
+    key: str
+    component_args: Dict[str, Any]
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the rendered strings sent to the browser."""
+        return sum(len(value) for value in self.component_args.values() if isinstance(value, str))
+
+def _walk(element):
+    yield element
+    for child in getattr(element, "_children", {}).values():
+        yield from _walk(child)
+
+def render_component_args(m: folium.Map, key: str, height: int,
+                          feature_group: Optional[folium.FeatureGroup] = None,
+                          returned_objects: Optional[List[str]] = None) -> Dict[str, Any]:
+    """The arguments st_folium(m, key=key, ...) sends to its frontend, with use_container_width.
+
+    Like st_folium, this renders m and adds feature_group to it. Raises
+    RenderCacheError when the streamlit-folium helpers fail.
+    """
+    try:
+        return _render_component_args(m, key, height, feature_group, returned_objects)
+    except _RENDER_ERRORS as e:
+        raise RenderCacheError(f"Rendering the map for st_folium failed: {e}") from e
+
+def _render_component_args(m: folium.Map, key: str, height: int, feature_group: Optional[folium.FeatureGroup],
+                           returned_objects: Optional[List[str]]) -> Dict[str, Any]:
+    m.get_root().render()
+    m.render()
+    html = _get_html(m)
+    header = _get_header(m)
+    leaflet = _get_map_string(m)
+    m_id = get_full_id(m)
+
+    southwest, northeast = m.get_bounds()
+    state = {name: None for name in _EMPTY_MAP_STATE}
+    state["bounds"] = {
+        "_southWest": {"lat": southwest[0], "lng": southwest[1]},
+        "_northEast": {"lat": northeast[0], "lng": northeast[1]},
+    }
+    state["zoom"] = m.options.get("zoom")
+    defaults = {name: value for name, value in state.items() if returned_objects is None or name in returned_objects}
+
+    feature_group_string = None
+    if feature_group is not None:
+        feature_group_string = _get_feature_group_string(feature_group, map=m, idx=0)
+
+    css_links, js_links = [], []
+    for element in _walk(m):
+        if isinstance(element, branca.colormap.ColorMap):
+            js_links[:0] = ["https://d3js.org/d3.v4.min.js", "https://cdnjs.cloudflare.com/ajax/libs/d3/3.5.5/d3.min.js"]
+        if isinstance(element, folium.elements.JSCSSMixin):
+            css_links.extend(href for _, href in getattr(element, "default_css", []))
+            js_links.extend(src for _, src in getattr(element, "default_js", []))
+
+    return {
+        "script": leaflet,
+        "header": header,
+        "html": html,
+        "id": m_id,
+        "key": generate_js_hash(leaflet, key, False),
+        "height": height,
+        "width": None,
+        "returned_objects": returned_objects,
+        "default": defaults,
+        "zoom": None,
+        "center": None,
+        "feature_group": feature_group_string,
+        "return_on_hover": False,
+        "layer_control": None,
+        "pixelated": False,
+        "css_links": list(dict.fromkeys(css_links)),
+        "js_links": list(dict.fromkeys(js_links)),
+        "wrap_longitude": False,
+    }
+
+def show_rendered_map(rendered: RenderedMap) -> Optional[Dict[str, Any]]:
+    """Display a rendered map and return the map state, as st_folium does.
+
+    Raises RenderCacheError when the component rejects the arguments.
+    """
+    args = rendered.component_args
+    hash_key, key = args["key"], rendered.key
+
+    def _on_change():
+        st.session_state[key] = st.session_state.get(hash_key, {})
+
+    try:
+        return _component_func(**args, on_change=_on_change)
+    except _RENDER_ERRORS as e:
+        raise RenderCacheError(f"The st_folium component rejected the rendered map: {e}") from e
+
+class MapRenderCache:
+    """Thread-safe LRU of rendered maps, bounded by entry count."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAP_RENDER_CACHE_ENTRIES):
+        self.max_entries = int(max_entries)
+        self._entries: "OrderedDict[str, RenderedMap]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = get_stats("map_render", "map_render_cache", track_evictions=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            record_eviction(self.stats)
+
+    def get(self, key: str) -> Optional[RenderedMap]:
+        """Return the rendered map for key (marking it recently used), or None."""
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+                record_call(self.stats)
+            return rendered
+
+    def put(self, key: str, rendered: RenderedMap, compute_seconds: float = 0.0) -> RenderedMap:
+        """Store a rendered map under key and return it."""
+        with self._lock:
+            record_call(self.stats)
+            record_miss(self.stats, compute_seconds, rendered.nbytes)
+            self._entries.pop(key, None)
+            if self.max_entries > 0:
+                self._entries[key] = rendered
+                self._evict()
+        return rendered
+
+    def get_or_render(self, key: str, render: Callable[[], RenderedMap]) -> RenderedMap:
+        """Return the rendered map for key, rendering and storing it on a miss."""
+        rendered = self.get(key)
+        if rendered is None:
+            start = time.perf_counter()
+            rendered = render()
+            rendered = self.put(key, rendered, time.perf_counter() - start)
+        return rendered
+
+    def resize(self, max_entries: int):
+        """Change the entry limit, evicting least recently used maps if needed."""
+        with self._lock:
+            self.max_entries = int(max_entries)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Process-wide cache shared by all sessions
+_MAP_RENDER_CACHE = MapRenderCache()
+_disabled_reason: Optional[str] = None
+
+def get_map_render_cache() -> MapRenderCache:
+    """Return the process-wide rendered map cache."""
+    return _MAP_RENDER_CACHE
+
+def map_render_cache_enabled(max_entries: int) -> bool:
+    """Whether maps go through the render cache: helpers importable and working, and a non-zero limit."""
+    return RENDER_CACHE_AVAILABLE and _disabled_reason is None and int(max_entries) > 0
+
+def disable_map_render_cache(error: Exception):
+    """Switch the render cache off for the rest of the process after a RenderCacheError."""
+    global _disabled_reason
+    if _disabled_reason is None:
+        logger.warning(f"Rendered map cache disabled, maps are drawn with st_folium: {error}")
+    _disabled_reason = str(error)
+    _MAP_RENDER_CACHE.clear()
+
+def configure_map_render_cache(max_entries: int) -> MapRenderCache:
+    """Apply the configured entry limit to the process-wide cache."""
+    if int(max_entries) != _MAP_RENDER_CACHE.max_entries:
+        _MAP_RENDER_CACHE.resize(max_entries)
+        logger.info(f"Rendered map cache limit set to {max_entries} maps")
+    return _MAP_RENDER_CACHE
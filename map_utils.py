@@ -4,14 +4,29 @@ Map creation and styling utilities for Lagos Accessibility Dashboard
 import folium
 from folium.plugins import Fullscreen
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import base64
+import copy
+import hashlib
+import json
 import math
-from typing import List, Tuple, Optional, Dict, Any
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import logging
 from branca.element import Template, MacroElement
 import streamlit as st
 
 from models import AppConfig, AnalysisConfig, MapConfig, ATTRIBUTE_METADATA
+from cache_stats import tracked_cache_resource
+from result_cache import array_digest, get_result_cache
+from classification import (
+    DEFAULT_SCHEME, Classification, Legend, LegendItem, class_breaks, classify, make_increasing, range_labels
+)
+from geometry_encoding import DEFAULT_ENCODING, TOPOJSON_DECODER_JS, encode_layer, quantize_coordinates
 
 logger = logging.getLogger(__name__)
 
@@ -88,7 +103,7 @@ def get_time_color(minutes: float, time_band: int, color_scheme: Dict[str, str])
     """Get color for time mapping based on minutes and time band.
     
     Note: This function is kept for backward compatibility but the new dynamic
-    coloring system in color_zones_by_origin_travel_time is preferred.
+    coloring system in color_zones_by_travel_time is preferred.
     """
     if pd.isnull(minutes):
         return "#808080"  # Gray for no data
@@ -105,9 +120,10 @@ def get_time_color(minutes: float, time_band: int, color_scheme: Dict[str, str])
     else:
         return scheme["0_15"]
 
-def assign_colors_to_zones(zones: gpd.GeoDataFrame, col: str, attribute_name: str) -> Tuple[gpd.GeoDataFrame, List[float], List[str]]:
-    """Assign colors to zones based on data distribution."""
-    values = zones[col].dropna().sort_values()
+def assign_colors_to_zones(zones: gpd.GeoDataFrame, col: str, attribute_name: str,
+                           scheme: str = DEFAULT_SCHEME) -> Tuple[gpd.GeoDataFrame, Legend]:
+    """Assign colors to zones based on data distribution; returns the zones and their legend."""
+    values = zones[col].dropna()
     # Use Sturges' formula for bin count, min 4, max 7
     n_bins = min(max(4, int(math.ceil(math.log2(len(values) + 1)))), 7) if len(values) > 0 else 5
     
@@ -115,212 +131,134 @@ def assign_colors_to_zones(zones: gpd.GeoDataFrame, col: str, attribute_name: st
     if len(values) == 0:
         bins = [0, 500_000, 2_000_000, 4_500_000, 6_000_000, 10_000_000][:n_bins+1]
     else:
-        quantiles = [i / n_bins for i in range(n_bins + 1)]
-        bins = list(values.quantile(quantiles))
-        # Round bins to nice numbers
-        bins = [nice_number(b, 3) for b in bins]
-        # Ensure strictly increasing bins
-        for i in range(1, len(bins)):
-            if bins[i] <= bins[i-1]:
-                bins[i] = bins[i-1] + 1
+        # Round bins to nice numbers and ensure they are strictly increasing
+        bins = make_increasing([nice_number(b, 3) for b in class_breaks(values, n_bins, scheme)])
+    n_bins = len(bins) - 1
     
     # Generate color scale
     color_list = get_color_scale(n_bins)
     
-    # Assign color to each zone for map rendering
-    bin_edges = bins
-    def assign_color(val):
-        # Special handling for zero/no access values
-        if pd.isna(val) or val == 0:
-            return "#f0f0f0"  # Light gray for no access
-        
-        for i in range(n_bins):
-            if i == n_bins - 1:
-                if val >= bin_edges[i]:
-                    return color_list[i]
-            elif bin_edges[i] <= val < bin_edges[i+1]:
-                return color_list[i]
-        return color_list[-1]
-    
-    # Assign colors and labels to zones
-    zones["color"] = zones[col].apply(assign_color)
-    
-    # Create labels with value ranges for tooltips and legend
-    def assign_label(val):
-        # Special handling for zero/no access values
-        if pd.isna(val) or val == 0:
-            return "No Access"
-        
-        for i in range(n_bins):
-            if i == n_bins - 1:
-                if val >= bin_edges[i]:
-                    return f"{format_attribute_value(bin_edges[i], attribute_name)}+"
-            elif bin_edges[i] <= val < bin_edges[i+1]:
-                return f"{format_attribute_value(bin_edges[i], attribute_name)} - {format_attribute_value(bin_edges[i+1], attribute_name)}"
-        return f"0 - {format_attribute_value(bin_edges[1], attribute_name)}"
-    
-    zones["label"] = zones[col].apply(assign_label)
+    # Zero/no access values get a light gray and "No Access"; labels show value ranges for tooltips and legend
+    classification = classify(
+        zones[col], bins, color_list,
+        range_labels(bins, lambda b: format_attribute_value(b, attribute_name)),
+        missing=(zones[col] == 0).to_numpy(), missing_color="#f0f0f0", missing_label="No Access"
+    )
+    zones["color"] = classification.color_array()
+    zones["label"] = classification.label_array()
     
-    return zones, bins, color_list
+    return zones, classification.legend(missing_first=True)
 
-def assign_time_mapping_colors(zones_df: gpd.GeoDataFrame, total_col: str, color_scheme: Dict[str, str]) -> Tuple[gpd.GeoDataFrame, List[float], List[str]]:
-    """Assign colors based on total accessibility using time mapping color scheme."""
-    values = zones_df[total_col].dropna().sort_values()
-    bins: List[float] = []
-    colors: List[str] = []
-    scheme = ensure_time_mapping_keys(color_scheme)
+def assign_time_mapping_colors(zones_df: gpd.GeoDataFrame, total_col: str, color_scheme: Dict[str, str],
+                               scheme: str = DEFAULT_SCHEME) -> Tuple[gpd.GeoDataFrame, Legend]:
+    """Assign colors based on total accessibility using time mapping color scheme.
+
+    Returns the zones and their legend (empty when there are no values).
+    """
+    values = zones_df[total_col].dropna()
+    legend = Legend()
+    time_scheme = ensure_time_mapping_keys(color_scheme)
     
     # Create 5 color classes based on accessibility
     if len(values) > 0:
-        # Use quantiles for better distribution
-        quantiles = [0, 0.2, 0.4, 0.6, 0.8, 1.0]
-        bins = list(values.quantile(quantiles))
-        
-        # Ensure unique bins
-        for i in range(1, len(bins)):
-            if bins[i] <= bins[i-1]:
-                bins[i] = bins[i-1] + 1
+        # Quantiles by default for better distribution; ensure unique bins
+        bins = make_increasing(class_breaks(values, 5, scheme))
         
         # Use inverted time mapping color scheme (closer = darker)
         colors = [
-            scheme["60_plus"],   # Darkest for closest
-            scheme["45_60"],
-            scheme["30_45"],
-            scheme["15_30"],
-            scheme["0_15"]      # Lightest for farthest
-        ]
+            time_scheme["60_plus"],   # Darkest for closest
+            time_scheme["45_60"],
+            time_scheme["30_45"],
+            time_scheme["15_30"],
+            time_scheme["0_15"]      # Lightest for farthest
+        ][:len(bins) - 1]
         
-        def assign_color(val):
-            # Special handling for zero/no access values
-            if pd.isna(val) or val == 0:
-                return "#f0f0f0"  # Light gray for no access
-                
-            for i in range(5):
-                if i == 4:  # Last bin
-                    if val >= bins[i]:
-                        return colors[i]
-                elif bins[i] <= val < bins[i+1]:
-                    return colors[i]
-            return colors[0]  # Default to first color
-        
-        def assign_label(val):
-            # Special handling for zero/no access values
-            if pd.isna(val) or val == 0:
-                return "No Access"
-                
-            for i in range(5):
-                if i == 4:  # Last bin
-                    if val >= bins[i]:
-                        return f"Class {i+1}"
-                elif bins[i] <= val < bins[i+1]:
-                    return f"Class {i+1}"
-            return "Class 1"
-        
-        zones_df["color"] = zones_df[total_col].apply(assign_color)
-        zones_df["label"] = zones_df[total_col].apply(assign_label)
+        # Zero/no access values get a light gray and "No Access"
+        classification = classify(
+            zones_df[total_col], bins, colors, [f"Class {i+1}" for i in range(len(colors))],
+            missing=(zones_df[total_col] == 0).to_numpy(), missing_color="#f0f0f0", missing_label="No Access"
+        )
+        zones_df["color"] = classification.color_array()
+        zones_df["label"] = classification.label_array()
+        legend = classification.legend(missing_first=True)
         
-    return zones_df, bins, colors
+    return zones_df, legend
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes to speed up zone clicks
-def color_zones_by_origin_travel_time(
-    _zones_df: gpd.GeoDataFrame,
-    skim_df: pd.DataFrame,
-    origin_zone: int,
+def time_band_boundaries(max_time: float, time_band: int) -> List[float]:
+    """Multiples of time_band from 0 up to the first one covering max_time."""
+    n_classes = max(int(math.ceil(max_time / time_band)), 1)
+    return [float(i * time_band) for i in range(n_classes + 1)]
+
+def color_zones_by_travel_time(
+    zones_df: gpd.GeoDataFrame,
+    travel_times: pd.DataFrame,
+    zone_id: int,
     time_band: int,
     color_scheme: Dict[str, str]
-) -> gpd.GeoDataFrame:
-    """Color zones by dynamic travel time classes from a specific origin zone.
+) -> Tuple[gpd.GeoDataFrame, Legend]:
+    """Color zones by dynamic travel time classes from (or to) a specific zone.
     
-    Creates dynamic color classes based on actual maximum travel time from origin.
+    travel_times holds ZONE_ID and travel_time for the other end of each pair.
+    Creates dynamic color classes based on actual maximum travel time;
+    missing and unreachable (inf) times fall in the "No data" class.
+    Classes live in the result cache keyed on the zones' travel times
+    themselves, so changed zones or skims never reuse old classes.
+    Returns the zones and the legend of the classes, shortest first.
     """
     try:
         scheme = ensure_time_mapping_keys(color_scheme)
-        origin_zone = int(origin_zone)
-        times = skim_df[skim_df["origin_zone"] == origin_zone][["destination_zone", "travel_time"]]
-        merged = _zones_df.merge(
-            times, left_on="ZONE_ID", right_on="destination_zone", how="left"
-        )
+        zone_id = int(zone_id)
+        merged = zones_df.merge(travel_times, on="ZONE_ID", how="left")
+        times = merged["travel_time"].to_numpy(dtype=np.float64)
+        usable = np.isfinite(times)
         
-        # Find actual min and max travel times (excluding nulls)
-        valid_times = merged["travel_time"].dropna()
-        if valid_times.empty:
-            logger.warning(f"No valid travel times found for origin zone {origin_zone}")
+        # Find actual min and max travel times (excluding missing and unreachable pairs)
+        if not usable.any():
+            logger.warning(f"No valid travel times found for zone {zone_id}")
             merged["color"] = "#808080"
             merged["label"] = "No data"
-            return merged
+            return merged, Legend([LegendItem("#808080", "No data", count=len(merged))])
         
-        min_time = valid_times.min()
-        max_time = valid_times.max()
+        min_time = times[usable].min()
+        max_time = times[usable].max()
         
         # Create dynamic classes - aim for 6-8 classes based on time range
         time_range = max_time - min_time
         if time_range <= 0:
             # All destinations have same travel time
-            merged["color"] = scheme["60_plus"]  # Darkest color
-            merged["label"] = f"{min_time:.0f} min"
-            return merged
-        
-        # Create classes based on time_band intervals (e.g., 5-minute intervals)
-        # Calculate how many time_band intervals we need to cover the range
-        max_intervals = int(max_time / time_band) + 1
-        
-        # Create time band boundaries
-        time_boundaries = []
-        for i in range(max_intervals + 1):
-            boundary = i * time_band
-            time_boundaries.append(boundary)
-            if boundary >= max_time:
-                break
-        
-        # Ensure we have the final boundary
-        if time_boundaries[-1] < max_time:
-            time_boundaries.append(time_boundaries[-1] + time_band)
+            label = f"{min_time:.0f} min"
+            merged["color"] = np.where(usable, scheme["60_plus"], "#808080")  # Darkest color
+            merged["label"] = np.where(usable, label, "No data")
+            items = [LegendItem(scheme["60_plus"], label, float(min_time), float(max_time), int(usable.sum()))]
+            if not usable.all():
+                items.append(LegendItem("#808080", "No data", count=int((~usable).sum())))
+            return merged, Legend(items)
         
+        # Classes are time_band intervals (e.g., 5-minute intervals) covering the range,
+        # closed on the right: a 15 minute trip falls in "0-15 min"
+        time_boundaries = time_band_boundaries(max_time, time_band)
         num_classes = len(time_boundaries) - 1
         
         # Generate color palette (inverted: short=dark, long=light)
         colors = generate_dynamic_color_palette(scheme, num_classes)
+        labels = range_labels(time_boundaries, "{:.0f}".format, separator="-", suffix=" min")
         
-        def get_time_band_color_and_label(t: float) -> tuple:
-            if pd.isnull(t):
-                return "#808080", "No data"
-            
-            # Find which time band this falls into
-            class_idx = 0
-            for i in range(len(time_boundaries) - 1):
-                if t <= time_boundaries[i + 1]:
-                    class_idx = i
-                    break
-            else:
-                class_idx = len(time_boundaries) - 2  # Last class
-            
-            # Create proper time band label
-            start_time = time_boundaries[class_idx]
-            end_time = time_boundaries[class_idx + 1]
-            
-            if class_idx == len(time_boundaries) - 2:  # Last class
-                label = f"{start_time:.0f}+ min"
-            else:
-                label = f"{start_time:.0f}-{end_time:.0f} min"
-            
-            return colors[class_idx], label
+        def compute():
+            classes = classify(times, time_boundaries, colors, labels, missing=~usable, right=True).classes
+            logger.info(f"Created {num_classes} time band classes for zone {zone_id} "
+                       f"(range: {min_time:.0f}-{max_time:.0f} min, intervals: {time_band}min)")
+            return {"classes": classes}
         
-        # Apply time band coloring
-        color_label_pairs = merged["travel_time"].apply(get_time_band_color_and_label)
-        merged["color"] = [pair[0] for pair in color_label_pairs]
-        merged["label"] = [pair[1] for pair in color_label_pairs]
+        key = ("travel_time_classes", array_digest(merged["ZONE_ID"].to_numpy(), times), float(time_band))
+        classification = Classification(time_boundaries, colors, labels,
+                                         get_result_cache().get_or_compute(key, compute)["classes"])
+        merged["color"] = classification.color_array()
+        merged["label"] = classification.label_array()
         
-        # Debug: Log color assignments for verification
-        color_counts = merged.groupby(['color', 'label']).size().reset_index(name='count')
-        logger.info(f"Created {num_classes} time band classes for origin {origin_zone} "
-                   f"(range: {min_time:.0f}-{max_time:.0f} min, intervals: {time_band}min)")
-        for _, row in color_counts.iterrows():
-            logger.info(f"  {row['label']}: {row['count']} zones, color: {row['color']}")
-        
-        return merged
+        return merged, classification.legend()
     except Exception as e:
-        logger.error(f"Failed to color zones by origin travel time: {e}")
-        return _zones_df
+        logger.error(f"Failed to color zones by travel time: {e}")
+        return zones_df, Legend()
 
 def generate_dynamic_color_palette(base_scheme: Dict[str, str], num_classes: int) -> List[str]:
     """Generate a smooth color palette with the specified number of classes.
@@ -395,7 +333,8 @@ def create_base_map(config: MapConfig) -> folium.Map:
         wheel_debounce_time=40,  # Reduce wheel sensitivity (default is 40ms)
         zoom_animation_threshold=4,  # Smoother zoom animations
         zoom_control=True,  # Explicitly enable zoom controls
-        scroll_wheel_zoom=True  # Explicitly enable scroll wheel zoom
+        scroll_wheel_zoom=True,  # Explicitly enable scroll wheel zoom
+        prefer_canvas=config.prefer_canvas  # One canvas for all vector layers instead of an SVG path per zone
     )
     
     # Add map controls
@@ -405,214 +344,670 @@ def create_base_map(config: MapConfig) -> folium.Map:
     
     return m
 
-def create_accessibility_layer(zones: gpd.GeoDataFrame, view: str, config: MapConfig, 
-                             clicked_zone_id: Optional[int] = None) -> folium.GeoJson:
-    """Create accessibility zones layer."""
-    zones_layer = folium.GeoJson(
-        zones,
-        name="Jobs Accessibility",
-        style_function=lambda f: {
-            "fillColor": "#FF9933" if str(f["properties"]["ZONE_ID"]) == str(clicked_zone_id) 
-                        else f["properties"].get("color", "#808080"),
-            "color": "red" if str(f["properties"]["ZONE_ID"]) == str(clicked_zone_id) 
-                    else "black",
-            "weight": 3 if str(f["properties"]["ZONE_ID"]) == str(clicked_zone_id) 
-                    else config.line_weight,
-            "fillOpacity": 0.9 if str(f["properties"]["ZONE_ID"]) == str(clicked_zone_id) 
-                        else config.fill_opacity
-        },
+SELECTED_ZONE_STYLE = {"fillColor": "#FF9933", "color": "red", "weight": 3, "fillOpacity": 0.9}
+NO_DATA_COLOR = "#808080"
+
+ZONE_TOOLTIP_STYLE = """
+    background-color: #F0EFEF;
+    border: 2px solid black;
+    border-radius: 3px;
+    box-shadow: 3px;
+    padding: 5px;
+"""
+
+def format_minutes(minutes: pd.Series) -> pd.Series:
+    """Travel times as "12 min" strings, "No data" where missing."""
+    return (minutes.round().astype("Int64").astype("string") + " min").fillna("No data").astype(object)
+
+def zone_style_properties(zones: gpd.GeoDataFrame, config: MapConfig, clicked_zone_id: Optional[int] = None,
+                          border_color: str = "black") -> pd.Series:
+    """Leaflet style dict per zone, computed column-wise from the zone colors.
+
+    The selected zone gets SELECTED_ZONE_STYLE; zones without a color are gray.
+    """
+    selected = (zones["ZONE_ID"].astype(str) == str(clicked_zone_id)).to_numpy()
+    fill = zones["color"].fillna(NO_DATA_COLOR) if "color" in zones.columns else NO_DATA_COLOR
+    styles = pd.DataFrame({
+        "fillColor": np.where(selected, SELECTED_ZONE_STYLE["fillColor"], fill),
+        "color": np.where(selected, SELECTED_ZONE_STYLE["color"], border_color),
+        "weight": np.where(selected, SELECTED_ZONE_STYLE["weight"], config.line_weight),
+        "fillOpacity": np.where(selected, SELECTED_ZONE_STYLE["fillOpacity"], config.fill_opacity),
+    })
+    return pd.Series(styles.to_dict("records"), index=zones.index)
+
+def create_zones_layer(zones: gpd.GeoDataFrame, name: str, tooltip_fields: List[str], tooltip_aliases: List[str],
+                       config: MapConfig, clicked_zone_id: Optional[int] = None,
+                       border_color: str = "black") -> folium.GeoJson:
+    """Zones layer styled from a precomputed "style" property (no per-feature Python callback).
+
+    Only the tooltip fields and the styles are serialized with the geometry.
+    """
+    columns = list(dict.fromkeys(["ZONE_ID"] + tooltip_fields))
+    layer_data = zones[columns + ["geometry"]]
+    if config.geometry_encoding != "geojson":
+        # folium.GeoJson needs GeoJSON, so this per-rerun layer gets the ~1 m rounding but not TopoJSON
+        layer_data = quantize_coordinates(layer_data)
+    layer_data = layer_data.assign(
+        style=zone_style_properties(zones, config, clicked_zone_id, border_color)
+    )
+    # Without a style_function folium styles each feature from feature.properties.style
+    return folium.GeoJson(
+        layer_data,
+        name=name,
         tooltip=folium.GeoJsonTooltip(
-            fields=["ZONE_ID", "POP_2024_fmt", "Emp_2024_fmt"],
-            aliases=["Zone", "Population", "Employment"],
+            fields=tooltip_fields,
+            aliases=tooltip_aliases,
             localize=True,
             sticky=True,
             labels=True,
-            style="""
-                background-color: #F0EFEF;
-                border: 2px solid black;
-                border-radius: 3px;
-                box-shadow: 3px;
-                padding: 5px;
-            """
+            style=ZONE_TOOLTIP_STYLE
         )
     )
-    return zones_layer
+
+def create_accessibility_layer(zones: gpd.GeoDataFrame, view: str, config: MapConfig, 
+                             clicked_zone_id: Optional[int] = None) -> folium.GeoJson:
+    """Create accessibility zones layer."""
+    return create_zones_layer(zones, "Jobs Accessibility", ["ZONE_ID", "POP_2024_fmt", "Emp_2024_fmt"],
+                              ["Zone", "Population", "Employment"], config, clicked_zone_id, "black")
 
 def create_time_mapping_layer(zones: gpd.GeoDataFrame, config: MapConfig, 
-                            clicked_zone_id: Optional[int] = None) -> folium.GeoJson:
+                            clicked_zone_id: Optional[int] = None,
+                            direction: str = "origin") -> folium.GeoJson:
     """Create time mapping zones layer."""
     # Create tooltip fields and aliases
     tooltip_fields = ["ZONE_ID", "POP_2024_fmt", "Emp_2024_fmt"]
     tooltip_aliases = ["Zone", "Population", "Employment"]
     
-    # If we have travel time data from a selected origin, show that instead of time bands
+    # If we have travel time data from (or to) a selected zone, show that instead of time bands
     if clicked_zone_id and "travel_time" in zones.columns:
         # Format travel time for display
         if "travel_time_fmt" not in zones.columns:
-            import pandas as pd
-            zones["travel_time_fmt"] = zones["travel_time"].apply(
-                lambda x: f"{x:.0f} min" if pd.notnull(x) else "No data"
-            )
+            zones["travel_time_fmt"] = format_minutes(zones["travel_time"])
         tooltip_fields.append("travel_time_fmt")
-        tooltip_aliases.append(f"Travel Time from Zone {clicked_zone_id}")
+        tooltip_aliases.append(f"Travel Time {'from' if direction == 'origin' else 'to'} Zone {clicked_zone_id}")
     elif "total_accessible" in zones.columns:
         tooltip_fields.append("total_accessible")
         tooltip_aliases.append("Total Accessible")
     
-    zones_layer = folium.GeoJson(
-        zones,
-        name="Transportation Zones",
+    # Darker border for better contrast
+    return create_zones_layer(zones, "Transportation Zones", tooltip_fields, tooltip_aliases,
+                              config, clicked_zone_id, "#333333")
+
+# ---------- Geometry-once rendering ----------
+# The zone polygons go to the browser in a map script that does not change
+# between reruns, so streamlit-folium keeps the same map and layer alive.
+# Each rerun only sends a ZoneStyleUpdate (via feature_group_to_add) with a
+# compact ZONE_ID -> color payload, the legend and per-zone tooltip details.
+
+ZONE_GEOMETRY_FIELDS = ["ZONE_ID", "POP_2024_fmt", "Emp_2024_fmt"]
+
+def zone_geometry_key(zones_gdf: gpd.GeoDataFrame) -> str:
+    """Cheap identity of the zone polygons (zone ids and per-zone bounds)."""
+    return array_digest(zones_gdf["ZONE_ID"].to_numpy(), zones_gdf.geometry.bounds.to_numpy())
+
+@tracked_cache_resource(show_spinner=False, max_entries=4)  # Serialized once per process, shared by all sessions
+def get_zone_geometry(geometry_key: str, _zones_gdf: gpd.GeoDataFrame,
+                      encoding: str = DEFAULT_ENCODING) -> Tuple[str, str]:
+    """GeoJSON or TopoJSON text of the zone polygons with the static tooltip fields, and its content digest."""
+    fields = [col for col in ZONE_GEOMETRY_FIELDS if col in _zones_gdf.columns]
+    geometry_json = encode_layer(_zones_gdf, fields, encoding, "zones")
+    digest = hashlib.blake2b(geometry_json.encode(), digest_size=12).hexdigest()
+    logger.info(f"Serialized zone geometry once ({encoding}): {len(geometry_json) / 1e6:.2f} MB ({digest})")
+    return geometry_json, digest
+
+def publish_static_file(data: bytes, filename: str, static_dir: str) -> Optional[str]:
+    """Write data to the app's static folder (once) and return its URL.
+
+    Files are named by content digest, so the browser can keep them cached.
+    Returns None (the data is then embedded in the map script) when
+    Streamlit static file serving is disabled.
+    """
+    if not st.get_option("server.enableStaticServing"):
+        return None
+    path = Path(static_dir) / "map" / filename
+    if not path.exists():
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not publish {path}, embedding it instead: {e}")
+            return None
+    # Relative to the streamlit-folium iframe at <base>/component/<name>/index.html
+    return f"../../app/static/map/{path.name}"
+
+def publish_zone_geometry(geometry_json: str, digest: str, static_dir: str) -> Optional[str]:
+    """Write the zone geometry to the app's static folder and return its URL (see publish_static_file)."""
+    return publish_static_file(geometry_json.encode(), f"zones_{digest}.json", static_dir)
+
+class ZoneGeometryLayer(MacroElement):
+    """Zone polygons whose styles and tooltip details are set from the browser.
+
+    The geometry (GeoJSON or TopoJSON) is either embedded or loaded from url.
+    The script defines applyZoneStyles(payload), which ZoneStyleUpdate calls
+    on every rerun.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this.decoder }}
+        var {{ this.get_name() }} = L.geoJson(null, {
+            style: {fillColor: {{ this.no_data_color|tojson }}, color: "#333333", weight: 0.5, fillOpacity: 0.7},
+            onEachFeature: function(feature, layer) {
+                layer.bindTooltip(function(l) {
+                    var p = l.feature.properties;
+                    var rows = [["Zone", p.ZONE_ID], ["Population", p.POP_2024_fmt], ["Employment", p.Emp_2024_fmt]];
+                    if (window.zoneDetailAlias && p.detail !== undefined && p.detail !== null) {
+                        rows.push([window.zoneDetailAlias, p.detail]);
+                    }
+                    return "<table>" + rows.map(function(r) {
+                        return "<tr><th style='text-align:left;padding-right:6px'>" + r[0] + "</th><td>" + (r[1] === undefined ? "" : r[1]) + "</td></tr>";
+                    }).join("") + "</table>";
+                }, {sticky: true, className: "zone-tooltip"});
+            }
+        }).addTo({{ this._parent.get_name() }});
+        {%- if this.embed or not this.url %}
+        {{ this.get_name() }}.addData(window.decodeTopology({{ this.geometry_json }}));
+        {%- else %}
+        (function() {
+            // Synchronous so the layer is complete before streamlit-folium binds its click handlers;
+            // the file is content-addressed and served from the browser cache after the first load
+            var request = new XMLHttpRequest();
+            request.open("GET", {{ this.url|tojson }}, false);
+            request.send(null);
+            {{ this.get_name() }}.addData(window.decodeTopology(JSON.parse(request.responseText)));
+        })();
+        {%- endif %}
+        window.zoneGeometryLayer = {{ this.get_name() }};
+        window.applyZoneStyles = function(payload) {
+            var selected = payload.selected === null ? null : String(payload.selected);
+            var details = payload.details || {};
+            window.zoneDetailAlias = payload.detail_alias;
+            window.zoneGeometryLayer.eachLayer(function(layer) {
+                var id = String(layer.feature.properties.ZONE_ID);
+                layer.feature.properties.detail = details[id];
+                if (id === selected) {
+                    layer.setStyle(payload.selected_style);
+                    return;
+                }
+                var idx = payload.zones[id];
+                layer.setStyle(Object.assign({}, payload.style, {
+                    fillColor: idx === undefined || idx < 0 ? {{ this.no_data_color|tojson }} : payload.colors[idx]
+                }));
+            });
+            var container = window.zoneGeometryLayer._map.getContainer();
+            var old = container.querySelector(".zone-style-legend");
+            if (old) { old.remove(); }
+            if (payload.legend) {
+                var legend = document.createElement("div");
+                legend.className = "zone-style-legend";
+                legend.innerHTML = payload.legend;
+                L.DomEvent.disableClickPropagation(legend);
+                container.appendChild(legend);
+            }
+        };
+        {% endmacro %}
+    """)
+
+    def __init__(self, geometry_json: str, url: Optional[str] = None):
+        super().__init__()
+        self._name = "ZoneGeometryLayer"
+        self.geometry_json = geometry_json
+        self.url = url
+        self.embed = url is None
+        self.no_data_color = NO_DATA_COLOR
+        self.decoder = TOPOJSON_DECODER_JS
+
+class ZoneStyleUpdate(MacroElement):
+    """Per-rerun zone styles; rendered into the streamlit-folium feature group.
+
+    A payload with a travel_time entry hands Time Mapping coloring to the
+    browser (see TravelTimeColoring).
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function(payload) {
+            if (!window.applyZoneStyles) { return; }
+            var travelTime = payload.travel_time || null;
+            if (travelTime) { travelTime.base = payload; }
+            window.travelTimeConfig = travelTime;
+            if (travelTime && travelTime.selected !== null && window.colorByTravelTime) {
+                window.colorByTravelTime(travelTime.selected);
+            } else {
+                window.applyZoneStyles(payload);
+            }
+        })({{ this.payload|tojson }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, payload: Dict[str, Any]):
+        super().__init__()
+        self._name = "ZoneStyleUpdate"
+        self.payload = payload
+
+def zone_style_payload(zones: gpd.GeoDataFrame, config: MapConfig, clicked_zone_id: Optional[int] = None,
+                       border_color: str = "#333333", detail_col: Optional[str] = None,
+                       detail_alias: Optional[str] = None, legend: Optional[str] = None) -> Dict[str, Any]:
+    """Compact style payload: a color palette plus one palette index per ZONE_ID.
+
+    Zones without a color get index -1 (drawn gray). detail_col adds one
+    formatted value per zone to the tooltip under detail_alias.
+    """
+    zone_ids = zones["ZONE_ID"].astype(str)
+    if "color" in zones.columns:
+        codes, colors = pd.factorize(zones["color"])
+    else:
+        codes, colors = [-1] * len(zones), []
+    payload = {
+        "colors": list(colors),
+        "zones": dict(zip(zone_ids, (int(code) for code in codes))),
+        "style": {"color": border_color, "weight": config.line_weight, "fillOpacity": config.fill_opacity},
+        "selected": None if clicked_zone_id is None else str(clicked_zone_id),
+        "selected_style": SELECTED_ZONE_STYLE,
+        "legend": legend,
+        "details": None,
+        "detail_alias": None,
+    }
+    if detail_col and detail_col in zones.columns:
+        payload["details"] = dict(zip(zone_ids, zones[detail_col].astype(str)))
+        payload["detail_alias"] = detail_alias or detail_col
+    return payload
+
+# ---------- Browser-side Time Mapping ----------
+# The zone-to-zone travel times go to the browser once (static file or map
+# script). A zone click then recolors the zones locally; the rerun the click
+# triggers only refreshes the side panels and resends a small payload.
+
+TRAVEL_TIME_MISSING = {1: 0xFF, 2: 0xFFFF}  # Missing pair marker per value width
+
+@tracked_cache_resource(show_spinner=False, max_entries=4)  # Encoded once per skim, shared by all sessions
+def get_travel_time_matrix(skim_id: str, zone_key: str, _zone_ids: np.ndarray,
+                           _skim_df: pd.DataFrame) -> Tuple[bytes, str, int]:
+    """Deflated zone-by-zone travel time matrix, its digest and the longest time in minutes.
+
+    Layout (little-endian uint32 zone count and value width, int32 zone
+    ids, then the origin-major matrix): times are rounded up to whole
+    minutes as uint8, or uint16 beyond 254 minutes, and the largest value
+    of the type marks missing pairs. Rounding up keeps every zone in the
+    time band of its exact time, as band edges are whole minutes.
+    """
+    zone_ids = np.asarray(_zone_ids, dtype=np.int64)
+    n = len(zone_ids)
+    index = pd.Index(zone_ids)
+    origins = index.get_indexer(_skim_df["origin_zone"].to_numpy())
+    destinations = index.get_indexer(_skim_df["destination_zone"].to_numpy())
+    times = _skim_df["travel_time"].to_numpy(dtype=float)
+    valid = (origins >= 0) & (destinations >= 0) & np.isfinite(times)  # inf marks unreachable pairs
+    minutes = np.ceil(np.maximum(times[valid], 0) - 1e-9)
+    max_minutes = int(minutes.max()) if len(minutes) else 0
+
+    width = 1 if max_minutes < TRAVEL_TIME_MISSING[1] else 2
+    missing = TRAVEL_TIME_MISSING[width]
+    dtype = np.dtype(np.uint8 if width == 1 else "<u2")
+    matrix = np.full(n * n, missing, dtype=dtype)
+    matrix[origins[valid] * n + destinations[valid]] = np.minimum(minutes, missing - 1).astype(dtype)
+    raw = (np.array([n, width], dtype="<u4").tobytes() + zone_ids.astype("<i4").tobytes() + matrix.tobytes())
+    blob = zlib.compress(raw, 6)
+    digest = hashlib.blake2b(blob, digest_size=12).hexdigest()
+    logger.info(f"Encoded {n}x{n} travel time matrix for the browser: {len(blob) / 1e6:.2f} MB ({digest})")
+    return blob, digest, max_minutes
+
+class TravelTimeColoring(MacroElement):
+    """Browser-side Time Mapping coloring from a travel time matrix.
+
+    Defines colorByTravelTime(zoneId) and recolors on zone clicks while a
+    Time Mapping payload is active. Matrices are loaded once per digest,
+    from their URL or from data embedded here.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        window.travelTimeSources = window.travelTimeSources || {};
+        {%- for digest, data in this.embedded_data().items() %}
+        window.travelTimeSources[{{ digest|tojson }}] = {base64: {{ data|tojson }}};
+        {%- endfor %}
+        window.loadTravelTimes = function(source, url) {
+            var entry = window.travelTimeSources[source] || (window.travelTimeSources[source] = {url: url});
+            if (!entry.promise) {
+                var bytes = entry.base64
+                    ? Promise.resolve(Uint8Array.from(atob(entry.base64), function(c) { return c.charCodeAt(0); }))
+                    : fetch(entry.url).then(function(r) {
+                        if (!r.ok) { throw new Error("Travel times unavailable: " + r.status); }
+                        return r.arrayBuffer();
+                    });
+                entry.promise = bytes.then(function(buf) {
+                    var stream = new Blob([buf]).stream().pipeThrough(new DecompressionStream("deflate"));
+                    return new Response(stream).arrayBuffer();
+                }).then(function(buf) {
+                    var view = new DataView(buf), n = view.getUint32(0, true), width = view.getUint32(4, true);
+                    var ids = new Int32Array(buf, 8, n), index = {};
+                    for (var i = 0; i < n; i++) { index[String(ids[i])] = i; }
+                    var values = width === 1 ? new Uint8Array(buf, 8 + 4 * n, n * n) : new Uint16Array(buf, 8 + 4 * n, n * n);
+                    return {n: n, ids: ids, index: index, values: values, missing: width === 1 ? 0xFF : 0xFFFF};
+                });
+            }
+            return entry.promise;
+        };
+        window.colorByTravelTime = function(zoneId) {
+            var cfg = window.travelTimeConfig;
+            if (!cfg) { return; }
+            var selected = String(zoneId);
+            cfg.selected = selected;
+            window.loadTravelTimes(cfg.source, cfg.url).then(function(tt) {
+                if (window.travelTimeConfig !== cfg || cfg.selected !== selected) { return; }  // Superseded
+                var k = tt.index[selected], times = {}, min = Infinity, max = -Infinity;
+                for (var j = 0; k !== undefined && j < tt.n; j++) {
+                    var v = cfg.direction === "origin" ? tt.values[k * tt.n + j] : tt.values[j * tt.n + k];
+                    if (v === tt.missing) { continue; }
+                    times[tt.ids[j]] = v;
+                    min = Math.min(min, v);
+                    max = Math.max(max, v);
+                }
+                var nClasses = Math.max(Math.ceil(max / cfg.time_band), 1);
+                var colors = max > min ? cfg.palettes[nClasses] : [cfg.single_color];
+                var zones = {}, details = {}, used = {}, missing = false;
+                window.zoneGeometryLayer.eachLayer(function(layer) {
+                    var id = String(layer.feature.properties.ZONE_ID), v = times[id], c;
+                    if (max < min) { c = -1; }
+                    else if (max === min) { c = 0; }
+                    else if (v === undefined) { c = -1; }
+                    else { c = Math.max(Math.ceil(v / cfg.time_band) - 1, 0); }
+                    zones[id] = c;
+                    details[id] = v === undefined ? "No data" : v + " min";
+                    if (c < 0) { missing = true; } else { used[c] = true; }
+                });
+                var rgba = function(hex) {
+                    var h = hex.replace("#", "");
+                    return "rgba(" + parseInt(h.substr(0, 2), 16) + ", " + parseInt(h.substr(2, 2), 16) + ", " +
+                        parseInt(h.substr(4, 2), 16) + ", " + cfg.opacity + ")";
+                };
+                var item = function(color, label) {
+                    return cfg.legend_item.replace("__COLOR__", rgba(color)).replace("__LABEL__", label);
+                };
+                var items = colors.map(function(color, c) {
+                    if (!used[c]) { return ""; }
+                    if (max === min) { return item(color, min + " min"); }
+                    var lo = c * cfg.time_band, hi = (c + 1) * cfg.time_band;
+                    return item(color, c < colors.length - 1 ? lo + "-" + hi + " min" : lo + "+ min");
+                }).join("") + (missing ? item(cfg.no_data_color, "No data") : "");
+                var title = cfg.title + " " + selected;
+                window.applyZoneStyles(Object.assign({}, cfg.base, {
+                    colors: colors,
+                    zones: zones,
+                    selected: selected,
+                    details: details,
+                    detail_alias: title,
+                    legend: cfg.legend_box.replace("__TITLE__", title).replace("__ITEMS__", items)
+                }));
+            }).catch(function(e) { console.warn("Travel time coloring failed", e); });
+        };
+        window.zoneGeometryLayer.on("click", function(e) {
+            if (window.travelTimeConfig && e.layer && e.layer.feature) {
+                window.colorByTravelTime(e.layer.feature.properties.ZONE_ID);
+            }
+        });
+        {% endmacro %}
+    """)
+
+    def __init__(self, blob: Optional[bytes] = None, digest: Optional[str] = None):
+        super().__init__()
+        self._name = "TravelTimeColoring"
+        self.blob = blob
+        self.digest = digest
+        self.embed = False
+
+    def embedded_data(self) -> Dict[str, str]:
+        if self.blob is None or not self.embed:
+            return {}
+        return {self.digest: base64.b64encode(self.blob).decode("ascii")}
+
+def travel_time_payload(digest: str, url: Optional[str], max_minutes: int, clicked_zone_id: Optional[int],
+                        time_band: int, direction: str, color_scheme: Dict[str, str],
+                        opacity: float) -> Dict[str, Any]:
+    """Settings for colorByTravelTime: band width, palettes per class count and legend templates.
+
+    Mirrors color_zones_by_travel_time, which colors the same classes on the server.
+    """
+    scheme = ensure_time_mapping_keys(color_scheme)
+    max_classes = max(int(math.ceil(max_minutes / time_band)), 1)
+    return {
+        "source": digest,
+        "url": url,
+        "selected": None if clicked_zone_id is None else str(clicked_zone_id),
+        "direction": direction,
+        "time_band": int(time_band),
+        "palettes": {n: generate_dynamic_color_palette(scheme, n) for n in range(1, max_classes + 1)},
+        "single_color": scheme["60_plus"],
+        "no_data_color": NO_DATA_COLOR,
+        "title": "Travel Time from Zone" if direction == "origin" else "Travel Time to Zone",
+        "opacity": opacity,
+        "legend_box": legend_box_html("__TITLE__", "__ITEMS__", "zone-legend"),
+        "legend_item": legend_item_html("__COLOR__", "__LABEL__"),
+    }
+
+def embed_zone_geometry(m: folium.Map) -> folium.Map:
+    """Copy of m with URL-loaded zone geometry and travel times embedded, so the map HTML works outside the app.
+
+    m itself is left untouched: it may be a rendered map shared by all sessions through the map render cache.
+    """
+    m = copy.deepcopy(m)
+    for child in m._children.values():
+        if isinstance(child, (ZoneGeometryLayer, TravelTimeColoring)):
+            child.embed = True
+    return m
+
+def assign_isochrone_colors(isochrones: gpd.GeoDataFrame, color_scheme: Dict[str, str]) -> gpd.GeoDataFrame:
+    """Color isochrone bands with the same palette as the per-zone travel time classes."""
+    isochrones = isochrones.copy()
+    if isochrones.empty:
+        isochrones["color"] = pd.Series(dtype=str)
+        return isochrones
+    colors = generate_dynamic_color_palette(ensure_time_mapping_keys(color_scheme), int(isochrones["band"].max()) + 1)
+    isochrones["color"] = [colors[band] for band in isochrones["band"]]
+    return isochrones
+
+def isochrone_legend(isochrones: gpd.GeoDataFrame) -> Legend:
+    """Legend of colored isochrone bands, which come one row per band in band order."""
+    return Legend([
+        LegendItem(color, label, float(lower), float(upper), int(count))
+        for color, label, lower, upper, count in zip(isochrones["color"], isochrones["label"], isochrones["lower"],
+                                                     isochrones["upper"], isochrones["zones"])
+    ])
+
+def create_isochrone_layer(isochrones: gpd.GeoDataFrame, config: MapConfig) -> folium.GeoJson:
+    """Create a layer with one dissolved polygon per travel time band."""
+    return folium.GeoJson(
+        isochrones[["label", "zones", "color", "geometry"]],
+        name="Isochrones",
         style_function=lambda f: {
-            "fillColor": "#FF9933" if str(f["properties"]["ZONE_ID"]) == str(clicked_zone_id) 
-                        else f["properties"].get("color", "#808080"),
-            "color": "red" if str(f["properties"]["ZONE_ID"]) == str(clicked_zone_id) 
-                    else "#333333",  # Darker border for better contrast
-            "weight": 3 if str(f["properties"]["ZONE_ID"]) == str(clicked_zone_id) 
-                    else config.line_weight,
-            "fillOpacity": 0.9 if str(f["properties"]["ZONE_ID"]) == str(clicked_zone_id) 
-                        else config.fill_opacity
+            "fillColor": f["properties"]["color"],
+            "color": f["properties"]["color"],
+            "weight": 1,
+            "fillOpacity": config.fill_opacity
         },
         tooltip=folium.GeoJsonTooltip(
-            fields=tooltip_fields,
-            aliases=tooltip_aliases,
+            fields=["label", "zones"],
+            aliases=["Travel Time", "Zones"],
             localize=True,
             sticky=True,
-            labels=True,
-            style="""
-                background-color: #F0EFEF;
-                border: 2px solid black;
-                border-radius: 3px;
-                box-shadow: 3px;
-                padding: 5px;
-            """
+            labels=True
         )
     )
-    return zones_layer
+
+class EncodedGeoJson(MacroElement):
+    """Static, non-interactive GeoJSON or TopoJSON layer decoded in the browser."""
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this.decoder }}
+        var {{ this.get_name() }} = L.geoJson(window.decodeTopology({{ this.data_json }}), {
+            style: {{ this.style|tojson }},
+            interactive: false
+        }).addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, data_json: str, style: Dict[str, Any]):
+        super().__init__()
+        self._name = "EncodedGeoJson"
+        self.data_json = data_json
+        self.style = style
+        self.decoder = TOPOJSON_DECODER_JS
+
+LGA_SIMPLIFY_TOLERANCE = 2e-4  # Degrees (~20 m); LGAs are only drawn as borders
+LGA_NAME_COLUMNS = ['LGA_NAME', 'NAME', 'name', 'LGA', 'lga_name', 'LGANAME']
+
+def lga_names(lga_gdf: gpd.GeoDataFrame) -> List[str]:
+    """Label text of every LGA from the first name column that has a value."""
+    names = pd.Series(None, index=lga_gdf.index, dtype=object)
+    for col in LGA_NAME_COLUMNS:
+        if col in lga_gdf.columns:
+            names = names.where(names.notna(), lga_gdf[col])
+    return [str(name) if pd.notnull(name) else f"LGA {idx}" for idx, name in names.items()]
+
+@tracked_cache_resource(show_spinner=False, max_entries=8)  # Built once per LGA geometry and encoding, shared by all sessions
+def get_lga_overlay(geometry_key: str, _lga_gdf: gpd.GeoDataFrame, encoding: str = DEFAULT_ENCODING,
+                    tolerance: float = LGA_SIMPLIFY_TOLERANCE) -> Tuple[str, str]:
+    """Simplified LGA boundaries (GeoJSON or TopoJSON text) and their [lat, lon, name] label anchors."""
+    geometry_json = encode_layer(_lga_gdf, [], encoding, "lgas", simplify=tolerance)
+    points_json = label_points_json(_lga_gdf.geometry.representative_point(), lga_names(_lga_gdf))
+    logger.info(f"Built LGA overlay for {len(_lga_gdf)} LGAs ({len(geometry_json) / 1e3:.0f} KB, {encoding})")
+    return geometry_json, points_json
 
 def add_lga_layer(m: folium.Map, lga_gdf: gpd.GeoDataFrame, config: MapConfig):
-    """Add LGA boundaries layer to map."""
-    # Debug: Print available columns
-    logger.info(f"LGA GeoDataFrame columns: {list(lga_gdf.columns)}")
-    logger.info(f"LGA GeoDataFrame sample data: {lga_gdf.head(2).to_dict('records') if len(lga_gdf) > 0 else 'No data'}")
-    
-    def lga_style_fn(feature):
-        return {
-            "fillOpacity": 0,
-            "color": config.lga_border_color,
-            "weight": config.lga_border_weight,
-        }
-    
-    # Add LGA boundaries
-    lga_layer = folium.GeoJson(
-        lga_gdf,
-        name="LGA Boundaries",
-        style_function=lga_style_fn,
-        control=False,
-        show=True,
-        overlay=False,
-        interactive=False
-    )
-    
-    # Add LGA labels if enabled
+    """Add LGA boundaries (and labels, if enabled) to the map from the cached overlay."""
+    geometry_key = array_digest(lga_gdf.geometry.bounds.to_numpy(), lga_gdf.geometry.count_coordinates().to_numpy())
+    geometry_json, points_json = get_lga_overlay(geometry_key, lga_gdf, config.geometry_encoding)
     if config.show_lga_labels:
-        for idx, row in lga_gdf.iterrows():
-            centroid = row.geometry.centroid
-            # Create circular marker for label placement
-            circle = folium.CircleMarker(
-                location=[centroid.y, centroid.x],
-                radius=0,
-                fill=False,
-                opacity=0
-            )
-            # Add label to marker - try multiple possible name columns
-            lga_name = None
-            for name_col in ['LGA_NAME', 'NAME', 'name', 'LGA', 'lga_name', 'LGANAME']:
-                if name_col in lga_gdf.columns and pd.notnull(row.get(name_col)):
-                    lga_name = str(row[name_col])
-                    break
-            
-            if not lga_name:
-                lga_name = f"LGA {idx}"
-            circle.add_child(folium.Tooltip(
-                lga_name,
-                permanent=True,
-                direction='center',
-                sticky=False,
-                opacity=0.9,
-                className='lga-label'
-            ))
-            circle.add_to(m)  # Add directly to map instead of lga_layer
-    
-    lga_layer.add_to(m)
+        CanvasLabelLayer(points_json, font="bold 12px sans-serif", color=config.lga_border_color,
+                         boxed=False).add_to(m)
+    EncodedGeoJson(
+        geometry_json, {"fillOpacity": 0, "color": config.lga_border_color, "weight": config.lga_border_weight}
+    ).add_to(m)
+
+ZONE_LABEL_DECIMALS = 5  # ~1 m at Lagos latitudes
+
+def label_points_json(points: gpd.GeoSeries, texts: Iterable[str]) -> str:
+    """JSON array of [lat, lon, text] label anchors."""
+    coords = np.round(np.column_stack([points.y.to_numpy(), points.x.to_numpy()]), ZONE_LABEL_DECIMALS)
+    return json.dumps([[lat, lon, text] for (lat, lon), text in zip(coords.tolist(), texts)], separators=(",", ":"))
+
+@tracked_cache_resource(show_spinner=False, max_entries=4)  # Computed once per zone geometry, shared by all sessions
+def get_zone_label_points(geometry_key: str, _zones_gdf: gpd.GeoDataFrame) -> str:
+    """JSON array of [lat, lon, zone id] label anchors (representative points inside each zone)."""
+    ids = _zones_gdf["ZONE_ID"].astype(str).to_numpy() if "ZONE_ID" in _zones_gdf.columns \
+        else _zones_gdf.index.astype(str).to_numpy()
+    points_json = label_points_json(_zones_gdf.geometry.representative_point(), ids)
+    logger.info(f"Computed {len(ids)} zone label points ({len(points_json) / 1e3:.0f} KB)")
+    return points_json
+
+class CanvasLabelLayer(MacroElement):
+    """Map labels drawn as text on one canvas.
+
+    Replaces one marker plus permanent tooltip per label: the browser keeps a
+    single layer and canvas, redrawn on pan and zoom, and labels that would
+    overlap an already drawn one are skipped. points_json holds [lat, lon,
+    text] rows; labels are drawn on a white box, or with a white halo when
+    boxed is False.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function() {
+            var points = {{ this.points_json }};
+            var Labels = L.Layer.extend({
+                onAdd: function(map) {
+                    this._map = map;
+                    this._canvas = L.DomUtil.create("canvas", "label-canvas leaflet-zoom-hide");
+                    this._canvas.style.pointerEvents = "none";
+                    map.getPanes().overlayPane.appendChild(this._canvas);
+                    map.on("moveend zoomend resize", this._redraw, this);
+                    this._redraw();
+                },
+                onRemove: function(map) {
+                    map.off("moveend zoomend resize", this._redraw, this);
+                    L.DomUtil.remove(this._canvas);
+                },
+                _redraw: function() {
+                    var map = this._map, canvas = this._canvas, size = map.getSize();
+                    var ratio = window.devicePixelRatio || 1;
+                    canvas.width = size.x * ratio;
+                    canvas.height = size.y * ratio;
+                    canvas.style.width = size.x + "px";
+                    canvas.style.height = size.y + "px";
+                    L.DomUtil.setPosition(canvas, map.containerPointToLayerPoint([0, 0]));
+                    var ctx = canvas.getContext("2d");
+                    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+                    ctx.font = {{ this.font|tojson }};
+                    ctx.textAlign = "center";
+                    ctx.textBaseline = "middle";
+                    var bounds = map.getBounds().pad(0.05), taken = {}, cell = 12;
+                    for (var i = 0; i < points.length; i++) {
+                        var p = points[i];
+                        if (!bounds.contains([p[0], p[1]])) { continue; }
+                        var pt = map.latLngToContainerPoint([p[0], p[1]]);
+                        var text = {{ this.prefix|tojson }} + p[2], w = ctx.measureText(text).width + 12, h = 18;
+                        var x0 = Math.floor((pt.x - w / 2) / cell), x1 = Math.floor((pt.x + w / 2) / cell);
+                        var y0 = Math.floor((pt.y - h / 2) / cell), y1 = Math.floor((pt.y + h / 2) / cell);
+                        var free = true;
+                        for (var cx = x0; cx <= x1 && free; cx++) {
+                            for (var cy = y0; cy <= y1; cy++) {
+                                if (taken[cx + ":" + cy]) { free = false; break; }
+                            }
+                        }
+                        if (!free) { continue; }
+                        for (var cx = x0; cx <= x1; cx++) {
+                            for (var cy = y0; cy <= y1; cy++) { taken[cx + ":" + cy] = true; }
+                        }
+                        {%- if this.boxed %}
+                        ctx.fillStyle = "rgba(255, 255, 255, 0.9)";
+                        ctx.strokeStyle = {{ this.color|tojson }};
+                        ctx.lineWidth = 1;
+                        ctx.fillRect(pt.x - w / 2, pt.y - h / 2, w, h);
+                        ctx.strokeRect(pt.x - w / 2, pt.y - h / 2, w, h);
+                        {%- else %}
+                        ctx.strokeStyle = "#ffffff";
+                        ctx.lineWidth = 3;
+                        ctx.strokeText(text, pt.x, pt.y);
+                        {%- endif %}
+                        ctx.fillStyle = {{ this.color|tojson }};
+                        ctx.fillText(text, pt.x, pt.y);
+                    }
+                }
+            });
+            return new Labels();
+        })().addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, points_json: str, prefix: str = "", font: str = "bold 11px sans-serif",
+                 color: str = "#333", boxed: bool = True):
+        super().__init__()
+        self._name = "CanvasLabelLayer"
+        self.points_json = points_json
+        self.prefix = prefix
+        self.font = font
+        self.color = color
+        self.boxed = boxed
+
+class ZoneLabelLayer(CanvasLabelLayer):
+    """All zone labels ("Zone <id>") drawn as boxed text on one canvas."""
+
+    def __init__(self, points_json: str):
+        super().__init__(points_json, prefix="Zone ")
+        self._name = "ZoneLabelLayer"
 
 def add_zone_labels(m: folium.Map, zones_gdf: gpd.GeoDataFrame, config: MapConfig):
-    """Add zone ID labels to the map."""
+    """Add zone ID labels to the map as a single canvas label layer."""
     if not config.show_labels:
         return
         
     try:
-        logger.info(f"Adding zone labels for {len(zones_gdf)} zones")
-        
-        for idx, row in zones_gdf.iterrows():
-            try:
-                # Get zone centroid for label placement
-                centroid = row.geometry.centroid
-                zone_id = row.get('ZONE_ID', idx)
-                
-                # Create invisible marker for label placement
-                circle = folium.CircleMarker(
-                    location=[centroid.y, centroid.x],
-                    radius=0,
-                    fill=False,
-                    opacity=0
-                )
-                
-                # Add permanent label showing zone ID
-                circle.add_child(folium.Tooltip(
-                    f"Zone {zone_id}",
-                    permanent=True,
-                    direction='center',
-                    sticky=False,
-                    opacity=0.8,
-                    className='zone-label'
-                ))
-                
-                circle.add_to(m)
-                
-            except Exception as e:
-                logger.warning(f"Failed to add label for zone {idx}: {e}")
-                
-        logger.info("Successfully added zone labels to map")
+        points_json = get_zone_label_points(zone_geometry_key(zones_gdf), zones_gdf)
+        ZoneLabelLayer(points_json).add_to(m)
+        logger.info(f"Added zone label layer for {len(zones_gdf)} zones")
         
     except Exception as e:
         logger.error(f"Failed to add zone labels: {e}")
 
-    # Add CSS for zone and LGA labels styling
-    m.get_root().html.add_child(folium.Element("""
-        <style>
-        .zone-label {
-            background-color: rgba(255, 255, 255, 0.9) !important;
-            border: 1px solid #333 !important;
-            border-radius: 3px !important;
-            padding: 2px 6px !important;
-            font-size: 11px !important;
-            font-weight: bold !important;
-            color: #333 !important;
-            box-shadow: 1px 1px 3px rgba(0,0,0,0.3) !important;
-        }
-        .lga-label {
-            background-color: rgba(255, 255, 255, 0.8) !important;
-            border: 1px solid #666 !important;
-            border-radius: 3px !important;
-            padding: 2px 6px !important;
-            font-size: 10px !important;
-            font-weight: normal !important;
-            color: #666 !important;
-            box-shadow: 1px 1px 2px rgba(0,0,0,0.2) !important;
-        }
-        </style>
-    """))
-
 # ---------- Legend Utilities ----------
 # HTML legend helper removed - ready for custom implementation
 
@@ -793,77 +1188,84 @@ def add_map_bounds(m: folium.Map, sw: List[float], ne: List[float], viscosity: f
     m.get_root().add_child(el)
     logger.info(f"Added enhanced map bounds: SW({sw_lat}, {sw_lng}) to NE({ne_lat}, {ne_lng})")
 
-def add_streamlit_safe_legend(m: folium.Map, legend_data: dict, opacity: float = 1.0):
+def legend_item_html(color: str, label: str, opacity: float = 1.0) -> str:
+    """HTML of one legend row: a color swatch (hex colors get the layer opacity) and its label."""
+    hex_color = color.lstrip('#')
+    if len(hex_color) == 6:
+        r = int(hex_color[0:2], 16)
+        g = int(hex_color[2:4], 16) 
+        b = int(hex_color[4:6], 16)
+        rgba_color = f"rgba({r}, {g}, {b}, {opacity})"
+    else:
+        rgba_color = color  # Fallback for non-hex colors
+        
+    return f"""
+            <div style='display: flex; align-items: center; margin-bottom: 4px;'>
+                <span style='
+                    display: inline-block;
+                    width: 16px;
+                    height: 16px;
+                    background: {rgba_color};
+                    border: 1px solid #333;
+                    margin-right: 8px;
+                    border-radius: 2px;
+                    flex-shrink: 0;
+                '></span>
+                <span style='color: #222; font-size: 12px;'>{label}</span>
+            </div>
+        """
+
+def legend_html(legend: Legend, opacity: float = 1.0, element_id: str = "map-legend") -> str:
+    """HTML of the map legend box for a legend's title and items."""
+    legend_items_html = ''.join(legend_item_html(item.color, item.label, opacity) for item in legend.items)
+    return legend_box_html(legend.title, legend_items_html, element_id)
+
+def legend_box_html(title: str, legend_items_html: str, element_id: str = "map-legend") -> str:
+    """HTML of the legend box around already rendered legend rows."""
+    return f"""
+                    <div id='{element_id}' style='
+                position: fixed;
+                bottom: 40px;
+                left: 20px;
+        min-width: 180px;
+        max-width: 250px;
+        background: rgba(255,255,255,0.95);
+        border: 2px solid #666;
+        border-radius: 8px;
+        padding: 12px;
+        font-family: Arial, sans-serif;
+        z-index: 9999;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.3);
+        backdrop-filter: blur(2px);
+    '>
+        <div style='
+            font-weight: bold; 
+            margin-bottom: 8px; 
+            text-align: center;
+            font-size: 13px;
+            color: #333;
+            border-bottom: 1px solid #ddd;
+            padding-bottom: 6px;
+        '>
+            {title}
+        </div>
+        <div>
+            {legend_items_html}
+        </div>
+    </div>
+    """
+
+def add_streamlit_safe_legend(m: folium.Map, legend: Legend, opacity: float = 1.0):
     """Add a legend that works reliably in streamlit-folium."""
     try:
-        legend_items = legend_data.get('items', [])
-        if not legend_items:
+        if not legend.items:
             logger.warning("No legend items provided")
             return
         
         # Create legend HTML with enhanced positioning and opacity matching
-        legend_html_parts = []
-        for item in legend_items:
-            # Convert hex color to rgba with the specified opacity
-            hex_color = item['color'].lstrip('#')
-            if len(hex_color) == 6:
-                r = int(hex_color[0:2], 16)
-                g = int(hex_color[2:4], 16) 
-                b = int(hex_color[4:6], 16)
-                rgba_color = f"rgba({r}, {g}, {b}, {opacity})"
-            else:
-                rgba_color = item['color']  # Fallback for non-hex colors
-                
-            legend_html_parts.append(f"""
-                <div style='display: flex; align-items: center; margin-bottom: 4px;'>
-                    <span style='
-                        display: inline-block;
-                        width: 16px;
-                        height: 16px;
-                        background: {rgba_color};
-                        border: 1px solid #333;
-                        margin-right: 8px;
-                        border-radius: 2px;
-                        flex-shrink: 0;
-                    '></span>
-                    <span style='color: #222; font-size: 12px;'>{item['label']}</span>
-                </div>
-            """)
-        
-        legend_items_html = ''.join(legend_html_parts)
-        
         template_str = f"""
         {{% macro html(this, kwargs) %}}
-                        <div id='map-legend-{m._id}' style='
-                    position: fixed;
-                    bottom: 40px;
-                    left: 20px;
-            min-width: 180px;
-            max-width: 250px;
-            background: rgba(255,255,255,0.95);
-            border: 2px solid #666;
-            border-radius: 8px;
-            padding: 12px;
-            font-family: Arial, sans-serif;
-            z-index: 9999;
-            box-shadow: 0 4px 12px rgba(0,0,0,0.3);
-            backdrop-filter: blur(2px);
-        '>
-            <div style='
-                font-weight: bold; 
-                margin-bottom: 8px; 
-                text-align: center;
-                font-size: 13px;
-                color: #333;
-                border-bottom: 1px solid #ddd;
-                padding-bottom: 6px;
-            '>
-                {legend_data.get('title', 'Legend')}
-            </div>
-            <div>
-                {legend_items_html}
-            </div>
-        </div>
+        {legend_html(legend, opacity, f"map-legend-{m._id}")}
         
         <script>
             setTimeout(function() {{
@@ -892,7 +1294,7 @@ def add_streamlit_safe_legend(m: folium.Map, legend_data: dict, opacity: float =
         legend_element = MacroElement()
         legend_element._template = Template(template_str)
         m.get_root().add_child(legend_element)
-        logger.info(f"Added streamlit-safe legend with {len(legend_items)} items")
+        logger.info(f"Added streamlit-safe legend with {len(legend)} items")
         
     except Exception as e:
         logger.error(f"Failed to add streamlit-safe legend: {e}")
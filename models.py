@@ -19,6 +19,10 @@ class AnalysisConfig:
     view: str = "Base Scenario"
     scenario_name: Optional[str] = None
     clicked_zone_id: Optional[int] = None
+    time_mapping_direction: str = "origin"  # "origin": travel from the zone, "destination": catchment
+    period: Optional[str] = None  # Time-of-day period when period skims are configured
+    combined_modes: List[str] = field(default_factory=list)  # Mode skims combined into the base skim (empty: off)
+    combine_method: str = "min"  # "min": fastest mode per OD pair, "blend": mode-share-weighted mean
 
 @dataclass
 class MapConfig:
@@ -33,6 +37,10 @@ class MapConfig:
     lga_border_color: str = "#333399"
     lga_border_weight: float = 2.0
     show_lga_labels: bool = False
+    show_isochrones: bool = False
+    classification_scheme: str = "quantile"  # quantile, equal_interval or jenks
+    geometry_encoding: str = "topojson"  # geojson, quantized (~1 m) or topojson
+    prefer_canvas: bool = False  # Draw zones on one canvas instead of one SVG path each
 
 @dataclass
 class DataPaths:
@@ -49,11 +57,36 @@ class AppConfig:
     map_config: MapConfig = field(default_factory=MapConfig)
     analysis_config: AnalysisConfig = field(default_factory=AnalysisConfig)
     
+    # Analysis settings
+    time_thresholds: List[int] = field(default_factory=lambda: [15, 30, 45, 60, 90, 120])
+    default_time_threshold: int = 45
+    time_band_count: int = 5  # Number of bands in time mapping analysis
+    equity_thresholds_pct: List[float] = field(default_factory=lambda: [10, 25, 50])  # % of city total reachable
+    period_skims: Dict[str, str] = field(default_factory=dict)  # Time-of-day period name -> skim file
+    period_weights: Dict[str, float] = field(default_factory=dict)  # Share of daily demand per period
+    mode_skims: Dict[str, str] = field(default_factory=dict)  # Mode name -> skim file
+    mode_shares: Dict[str, float] = field(default_factory=dict)  # Mode shares for the blended skim
+    combined_skim_cache_dir: str = "cache/combined_skims"
+    
     # Performance settings
     cache_ttl_hours: int = 1
     max_file_size_mb: int = 50
     batch_size: int = 10000
     geometry_simplification: float = 0.0001
+    chunk_size: int = 5000  # Origin zones per accessibility block
+    accessibility_memory_limit_mb: int = 512  # Ceiling for blocked accessibility working memory
+    accessibility_workers: int = 4
+    incremental_accessibility: bool = True  # Update results by threshold band instead of recomputing
+    result_cache_mb: int = 256  # Byte budget of the shared in-process result cache
+    result_store_dir: str = "cache/results"  # On-disk result store shared across restarts ("" disables)
+    result_store_mb: int = 2048
+    scenario_memory_mb: int = 512  # Total budget for processed uploaded scenarios across sessions
+    scenario_spill_dir: str = "cache/scenarios"  # Least recently used scenarios are spilled here
+    scenario_spill_mb: int = 4096
+    warmup_on_start: bool = True  # Precompute configured thresholds in the background at startup
+    map_style_updates: bool = True  # Send zone geometry to the browser once; reruns only restyle the zones
+    client_time_mapping: bool = True  # Recolor Time Mapping clicks in the browser (needs map_style_updates)
+    map_render_cache_entries: int = 16  # Rendered maps kept for reruns with unchanged inputs (0 disables)
     
     # Color schemes
     color_schemes: Dict[str, Dict[str, str]] = field(default_factory=lambda: {
@@ -111,12 +144,64 @@ class AppConfig:
                 config.map_config.zoom = yaml_config['default_zoom']
             if 'map_height' in yaml_config:
                 config.map_config.height = yaml_config['map_height']
+            if 'map_geometry_encoding' in yaml_config:
+                config.map_config.geometry_encoding = str(yaml_config['map_geometry_encoding'])
+            if 'map_prefer_canvas' in yaml_config:
+                config.map_config.prefer_canvas = bool(yaml_config['map_prefer_canvas'])
+            
+            # Update analysis settings
+            if 'time_thresholds' in yaml_config:
+                config.time_thresholds = [int(t) for t in yaml_config['time_thresholds']]
+            if 'default_time_threshold' in yaml_config:
+                config.default_time_threshold = int(yaml_config['default_time_threshold'])
+            if 'time_band_count' in yaml_config:
+                config.time_band_count = int(yaml_config['time_band_count'])
+            if 'equity_thresholds_pct' in yaml_config:
+                config.equity_thresholds_pct = [float(t) for t in yaml_config['equity_thresholds_pct']]
+            if yaml_config.get('period_skims'):
+                config.period_skims = {str(k): str(v) for k, v in yaml_config['period_skims'].items()}
+            if yaml_config.get('period_weights'):
+                config.period_weights = {str(k): float(v) for k, v in yaml_config['period_weights'].items()}
+            if yaml_config.get('mode_skims'):
+                config.mode_skims = {str(k): str(v) for k, v in yaml_config['mode_skims'].items()}
+            if yaml_config.get('mode_shares'):
+                config.mode_shares = {str(k): float(v) for k, v in yaml_config['mode_shares'].items()}
+            if 'combined_skim_cache_dir' in yaml_config:
+                config.combined_skim_cache_dir = str(yaml_config['combined_skim_cache_dir'])
             
             # Update other settings
             if 'cache_ttl_hours' in yaml_config:
                 config.cache_ttl_hours = yaml_config['cache_ttl_hours']
             if 'max_file_size_mb' in yaml_config:
                 config.max_file_size_mb = yaml_config['max_file_size_mb']
+            if 'chunk_size' in yaml_config:
+                config.chunk_size = int(yaml_config['chunk_size'])
+            if 'accessibility_memory_limit_mb' in yaml_config:
+                config.accessibility_memory_limit_mb = int(yaml_config['accessibility_memory_limit_mb'])
+            if 'accessibility_workers' in yaml_config:
+                config.accessibility_workers = int(yaml_config['accessibility_workers'])
+            if 'incremental_accessibility' in yaml_config:
+                config.incremental_accessibility = bool(yaml_config['incremental_accessibility'])
+            if 'result_cache_mb' in yaml_config:
+                config.result_cache_mb = int(yaml_config['result_cache_mb'])
+            if 'result_store_dir' in yaml_config:
+                config.result_store_dir = str(yaml_config['result_store_dir'] or "")
+            if 'result_store_mb' in yaml_config:
+                config.result_store_mb = int(yaml_config['result_store_mb'])
+            if 'scenario_memory_mb' in yaml_config:
+                config.scenario_memory_mb = int(yaml_config['scenario_memory_mb'])
+            if 'scenario_spill_dir' in yaml_config:
+                config.scenario_spill_dir = str(yaml_config['scenario_spill_dir'])
+            if 'scenario_spill_mb' in yaml_config:
+                config.scenario_spill_mb = int(yaml_config['scenario_spill_mb'])
+            if 'warmup_on_start' in yaml_config:
+                config.warmup_on_start = bool(yaml_config['warmup_on_start'])
+            if 'map_style_updates' in yaml_config:
+                config.map_style_updates = bool(yaml_config['map_style_updates'])
+            if 'client_time_mapping' in yaml_config:
+                config.client_time_mapping = bool(yaml_config['client_time_mapping'])
+            if 'map_render_cache_entries' in yaml_config:
+                config.map_render_cache_entries = int(yaml_config['map_render_cache_entries'])
             
             # Update color schemes if provided
             if 'colors' in yaml_config:
@@ -134,10 +219,35 @@ class AppConfig:
             'default_center': self.map_config.center,
             'default_zoom': self.map_config.zoom,
             'map_height': self.map_config.height,
+            'map_geometry_encoding': self.map_config.geometry_encoding,
+            'map_prefer_canvas': self.map_config.prefer_canvas,
+            'time_thresholds': self.time_thresholds,
+            'default_time_threshold': self.default_time_threshold,
+            'time_band_count': self.time_band_count,
+            'equity_thresholds_pct': self.equity_thresholds_pct,
+            'period_skims': self.period_skims,
+            'period_weights': self.period_weights,
+            'mode_skims': self.mode_skims,
+            'mode_shares': self.mode_shares,
+            'combined_skim_cache_dir': self.combined_skim_cache_dir,
             'cache_ttl_hours': self.cache_ttl_hours,
             'max_file_size_mb': self.max_file_size_mb,
             'batch_size': self.batch_size,
             'geometry_simplification': self.geometry_simplification,
+            'chunk_size': self.chunk_size,
+            'accessibility_memory_limit_mb': self.accessibility_memory_limit_mb,
+            'accessibility_workers': self.accessibility_workers,
+            'incremental_accessibility': self.incremental_accessibility,
+            'result_cache_mb': self.result_cache_mb,
+            'result_store_dir': self.result_store_dir,
+            'result_store_mb': self.result_store_mb,
+            'scenario_memory_mb': self.scenario_memory_mb,
+            'scenario_spill_dir': self.scenario_spill_dir,
+            'scenario_spill_mb': self.scenario_spill_mb,
+            'warmup_on_start': self.warmup_on_start,
+            'map_style_updates': self.map_style_updates,
+            'client_time_mapping': self.client_time_mapping,
+            'map_render_cache_entries': self.map_render_cache_entries,
             'export_formats': self.export_formats,
             'colors': self.color_schemes,
             'data_files': {
@@ -155,6 +265,9 @@ class AppConfig:
         except Exception as e:
             logger.error(f"Error saving config to {config_path}: {e}")
 
+# Period selector entry for the demand-weighted average over all time-of-day periods
+DAILY_PERIOD = "Daily average"
+
 # Attribute metadata for display and formatting
 ATTRIBUTE_METADATA = {
     "demographic": {
@@ -0,0 +1,193 @@
+"""
+Shared in-process analysis result cache for Lagos Accessibility Dashboard
+
+Results are stored as read-only NumPy arrays and handed out without
+copying, so every session in the process shares one copy. Keys carry the
+content fingerprint of the inputs (e.g. skim_fingerprint) plus the
+analysis parameters, so a changed skim can never return a stale result.
+An optional ResultStore backs the cache on disk, so results survive
+restarts and are shared with other processes using the same directory.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from cache_stats import CacheStats, get_stats, record_call, record_miss, record_eviction
+from result_store import ResultStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULT_CACHE_MB = 256
+
+Arrays = Dict[str, np.ndarray]
+
+def array_digest(*arrays: np.ndarray) -> str:
+    """Short content digest of a few small arrays (e.g. one zone attribute)."""
+    digest = hashlib.blake2b(digest_size=12)
+    for array in arrays:
+        array = np.asarray(array)
+        if array.dtype == object:
+            array = pd.util.hash_array(array)
+        digest.update(str(array.dtype).encode())
+        digest.update(np.ascontiguousarray(array))
+    return digest.hexdigest()
+
+def _kind_stats(key: Hashable) -> CacheStats:
+    """Stats record for the result kind, i.e. the first element of a tuple key."""
+    kind = key[0] if isinstance(key, tuple) and key else "result"
+    return get_stats(f"result:{kind}", "result_cache", track_evictions=True)
+
+def frame_to_arrays(df: pd.DataFrame) -> Arrays:
+    """Column arrays of a result DataFrame, ready to be cached."""
+    return {col: df[col].to_numpy() for col in df.columns}
+
+def arrays_to_frame(arrays: Arrays) -> pd.DataFrame:
+    """DataFrame view over cached arrays (columns are not copied)."""
+    return pd.DataFrame(arrays, copy=False)
+
+class ResultCache:
+    """Thread-safe LRU cache of read-only array results with a byte budget."""
+
+    def __init__(self, max_bytes: int = DEFAULT_RESULT_CACHE_MB * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[Hashable, Arrays]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.store: Optional[ResultStore] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._entries:
+            key, _ = self._entries.popitem(last=False)
+            self.nbytes -= self._sizes.pop(key)
+            self.evictions += 1
+            record_eviction(_kind_stats(key))
+
+    def get(self, key: Hashable) -> Optional[Arrays]:
+        """Return the cached arrays for key (marking them recently used), or None.
+
+        Misses in memory fall back to the disk store when one is attached.
+        """
+        with self._lock:
+            arrays = self._entries.get(key)
+            if arrays is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                record_call(_kind_stats(key))
+                return arrays
+
+        arrays = self.store.get(key) if self.store is not None else None
+        with self._lock:
+            if arrays is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        record_call(_kind_stats(key), disk_hit=True)
+        return self._remember(key, arrays)
+
+    def put(self, key: Hashable, arrays: Arrays, compute_seconds: float = 0.0) -> Arrays:
+        """Store arrays under key as read-only (and on disk) and return them.
+
+        compute_seconds is the time it took to produce the result, used for
+        the time-saved estimate in the cache statistics.
+        """
+        stats = _kind_stats(key)
+        record_call(stats)
+        frozen = self._remember(key, arrays)
+        record_miss(stats, compute_seconds, sum(array.nbytes for array in frozen.values()))
+        if self.store is not None:
+            self.store.put(key, frozen)
+        return frozen
+
+    def _remember(self, key: Hashable, arrays: Arrays) -> Arrays:
+        """Keep arrays in memory as read-only, evicting to fit the budget."""
+        frozen = {}
+        for name, array in arrays.items():
+            array = np.asarray(array)
+            array.flags.writeable = False
+            frozen[name] = array
+        size = sum(array.nbytes for array in frozen.values())
+
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._sizes.pop(key)
+                del self._entries[key]
+            if size <= self.max_bytes:
+                self._entries[key] = frozen
+                self._sizes[key] = size
+                self.nbytes += size
+                self._evict()
+            else:
+                logger.debug(f"Result {key!r} ({size:,} bytes) exceeds the cache budget, not cached")
+        return frozen
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Arrays]) -> Arrays:
+        """Return the cached arrays for key, computing and storing them on a miss."""
+        arrays = self.get(key)
+        if arrays is None:
+            start = time.perf_counter()
+            computed = compute()
+            arrays = self.put(key, computed, time.perf_counter() - start)
+        return arrays
+
+    def resize(self, max_bytes: int):
+        """Change the byte budget, evicting least recently used results if needed."""
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+# Process-wide cache shared by all sessions
+_RESULT_CACHE = ResultCache()
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache."""
+    return _RESULT_CACHE
+
+def configure_result_cache(max_mb: float, store_dir: Optional[str] = None,
+                           store_mb: Optional[float] = None) -> ResultCache:
+    """Apply the configured byte budget and disk store to the process-wide cache.
+
+    An empty store_dir detaches the disk store.
+    """
+    max_bytes = int(max_mb * 1024 * 1024)
+    if max_bytes != _RESULT_CACHE.max_bytes:
+        _RESULT_CACHE.resize(max_bytes)
+        logger.info(f"Result cache budget set to {max_mb} MB")
+
+    store = _RESULT_CACHE.store
+    if not store_dir:
+        _RESULT_CACHE.store = None
+    elif store is None or store.directory != Path(store_dir):
+        try:
+            _RESULT_CACHE.store = ResultStore(store_dir) if store_mb is None else \
+                ResultStore(store_dir, int(store_mb * 1024 * 1024))
+            logger.info(f"Result store attached at {store_dir}")
+        except Exception as e:
+            logger.warning(f"Result store unavailable at {store_dir}: {e}")
+            _RESULT_CACHE.store = None
+    elif store_mb is not None:
+        store.max_bytes = int(store_mb * 1024 * 1024)
+    return _RESULT_CACHE
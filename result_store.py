@@ -0,0 +1,131 @@
+"""
+Persistent on-disk analysis result store for Lagos Accessibility Dashboard
+
+Results live as one uncompressed .npz blob per key next to a SQLite index
+holding sizes and last access times. Blobs are written to a temporary file
+and moved into place with os.replace, so readers in other Streamlit
+processes or batch workers never see a partial file. Once the store grows
+beyond its byte budget the least recently used blobs are removed.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Hashable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULT_STORE_MB = 2048
+
+INDEX_FILE = "index.sqlite"
+
+def key_digest(key: Hashable) -> str:
+    """Stable file-safe digest of a result cache key."""
+    return hashlib.blake2b(repr(key).encode(), digest_size=20).hexdigest()
+
+class ResultStore:
+    """SQLite-indexed directory of .npz result blobs with a byte budget."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_RESULT_STORE_MB * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self.evictions = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, nbytes INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.directory / INDEX_FILE, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.npz"
+
+    def get(self, key: Hashable) -> Optional[Dict[str, np.ndarray]]:
+        """Load the arrays stored under key, or None if absent or unreadable."""
+        digest = key_digest(key)
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute("SELECT nbytes FROM results WHERE key = ?", (digest,)).fetchone()
+                if row is None:
+                    return None
+                try:
+                    with np.load(self._blob_path(digest), allow_pickle=False) as blob:
+                        arrays = {name: blob[name] for name in blob.files}
+                except FileNotFoundError:
+                    # Evicted by another process between the lookup and the read
+                    conn.execute("DELETE FROM results WHERE key = ?", (digest,))
+                    return None
+                conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), digest))
+            return arrays
+        except Exception as e:
+            logger.warning(f"Result store read failed for {digest}: {e}")
+            return None
+
+    def put(self, key: Hashable, arrays: Dict[str, np.ndarray]) -> bool:
+        """Atomically write arrays under key; returns False if they were not stored."""
+        if any(np.asarray(array).dtype == object for array in arrays.values()):
+            logger.debug(f"Result {key!r} has object columns, not stored on disk")
+            return False
+
+        digest = key_digest(key)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npz.tmp")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    np.savez(fh, **arrays)
+                nbytes = os.path.getsize(tmp_path)
+                os.replace(tmp_path, self._blob_path(digest))
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, nbytes, last_access) VALUES (?, ?, ?)",
+                    (digest, nbytes, time.time())
+                )
+                self._evict(conn)
+            return True
+        except Exception as e:
+            logger.warning(f"Result store write failed for {digest}: {e}")
+            return False
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Remove least recently used blobs until the store fits its budget."""
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, nbytes in conn.execute(
+            "SELECT key, nbytes FROM results ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM results WHERE key = ?", (digest,))
+            self._blob_path(digest).unlink(missing_ok=True)
+            total -= nbytes
+            self.evictions += 1
+            logger.debug(f"Evicted stored result {digest} ({nbytes:,} bytes)")
+
+    def stats(self) -> Dict[str, int]:
+        """Number of stored results and their total size on disk."""
+        with closing(self._connect()) as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results").fetchone()
+        return {"results": count, "nbytes": total}
+
+    def clear(self):
+        """Remove every stored result."""
+        with closing(self._connect()) as conn, conn:
+            for (digest,) in conn.execute("SELECT key FROM results").fetchall():
+                self._blob_path(digest).unlink(missing_ok=True)
+            conn.execute("DELETE FROM results")
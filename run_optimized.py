@@ -18,6 +18,7 @@ def setup_environment():
     os.environ["STREAMLIT_SERVER_MAX_MESSAGE_SIZE"] = "200"  # MB
     os.environ["STREAMLIT_BROWSER_GATHER_USAGE_STATS"] = "false"
     os.environ["STREAMLIT_CLIENT_TOOLBAR_MODE"] = "minimal"
+    os.environ["STREAMLIT_SERVER_ENABLE_STATIC_SERVING"] = "true"  # Zone geometry is fetched once and cached by the browser
     
     # Python optimizations
     os.environ["PYTHONUNBUFFERED"] = "1"
@@ -48,6 +49,29 @@ def check_data_files():
     print("✅ All required data files found")
     return True
 
+def warm_caches(config_path="config.yaml"):
+    """Precompute configured thresholds into the on-disk result store before serving."""
+    from streamlit.logger import set_log_level
+    from models import AppConfig
+    from result_cache import configure_result_cache
+    from warmup import warm_up, warmup_thresholds
+
+    set_log_level("error")  # Streamlit caches warn about the missing runtime when used headless
+    config = AppConfig.load_from_yaml(config_path)
+    if not config.result_store_dir:
+        print("⏭️  Skipping warm-up: no result_store_dir configured (the dashboard warms itself in the background)")
+        return
+
+    configure_result_cache(config.result_cache_mb, config.result_store_dir, config.result_store_mb)
+    print(f"🔥 Warming caches for thresholds {warmup_thresholds(config)}...")
+    try:
+        summary = warm_up(config)
+    except Exception as e:
+        print(f"⚠️  Warm-up failed, continuing without it: {e}")
+        return
+    print(f"✅ Warm-up done in {summary['seconds']:.1f}s "
+          f"({summary['computed']} computed, {summary['cached']} already stored)")
+
 def run_dashboard(port=8501, debug=False):
     """Run the dashboard with optimized settings."""
     
@@ -83,6 +107,7 @@ def main():
     parser.add_argument("--port", type=int, default=8501, help="Port to run the dashboard on (default: 8501)")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
     parser.add_argument("--check-only", action="store_true", help="Only check requirements, don't start dashboard")
+    parser.add_argument("--no-warmup", action="store_true", help="Start serving without precomputing results")
     
     args = parser.parse_args()
     
@@ -100,6 +125,9 @@ def main():
         print("✅ All checks passed! You can now run the dashboard.")
         return
     
+    if not args.no_warmup:
+        warm_caches()
+    
     # Run the dashboard
     run_dashboard(port=args.port, debug=args.debug)
 
@@ -0,0 +1,222 @@
+"""
+Process-wide registry of processed scenario skims for Lagos Accessibility Dashboard
+
+Uploaded scenarios are processed once per process and shared by every
+session, within a total memory budget. When the budget is exceeded the
+least recently used scenarios are spilled to Parquet files and read back
+transparently the next time a session asks for them. Spill files are
+themselves bounded; the oldest are removed beyond their budget, after
+which a scenario is simply reprocessed from the upload. Structures built
+from a resident skim (travel time and zone slice indexes) are kept with
+it, count towards the budget and are dropped when it is spilled.
+"""
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+
+from accessibility_engine import skim_fingerprint
+from cache_stats import get_stats, record_call, record_miss, record_eviction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCENARIO_MEMORY_MB = 512
+DEFAULT_SCENARIO_SPILL_MB = 4096
+
+class ScenarioRegistry:
+    """LRU registry of scenario skims with a memory budget and Parquet spill files."""
+
+    def __init__(self, max_bytes: int = DEFAULT_SCENARIO_MEMORY_MB * 1024 * 1024,
+                 spill_dir: str = "cache/scenarios",
+                 max_spill_bytes: int = DEFAULT_SCENARIO_SPILL_MB * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        self.spill_dir = Path(spill_dir)
+        self.max_spill_bytes = int(max_spill_bytes)
+        self._resident: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._spilled: "OrderedDict[str, int]" = OrderedDict()  # scenario id -> file size, oldest first
+        self._derived: Dict[str, Dict[Hashable, Any]] = {}  # scenario id -> structures built from its skim
+        self._skim_ids: Dict[str, str] = {}  # skim fingerprint -> id of the resident scenario
+        self._lock = threading.RLock()
+        self._scanned = False
+        self.nbytes = 0
+        self.stats = get_stats("scenario_registry", "scenario_registry", track_evictions=True)
+
+    def __contains__(self, scenario_id: str) -> bool:
+        return scenario_id in self._resident or scenario_id in self._spilled
+
+    def _spill_path(self, scenario_id: str) -> Path:
+        return self.spill_dir / f"{scenario_id}.parquet"
+
+    def get(self, scenario_id: str) -> Optional[pd.DataFrame]:
+        """Return a registered scenario skim, reloading it from its spill file if needed."""
+        with self._lock:
+            skim = self._resident.get(scenario_id)
+            if skim is not None:
+                self._resident.move_to_end(scenario_id)
+                record_call(self.stats)
+                return skim
+            if scenario_id not in self._spilled:
+                return None
+            try:
+                skim = pd.read_parquet(self._spill_path(scenario_id))
+            except Exception as e:
+                logger.warning(f"Could not reload spilled scenario {scenario_id}: {e}")
+                self._spilled.pop(scenario_id, None)
+                return None
+            record_call(self.stats, disk_hit=True)
+            logger.info(f"Reloaded spilled scenario {scenario_id} ({len(skim):,} OD pairs)")
+            return self._admit(scenario_id, skim)
+
+    def add(self, scenario_id: str, skim: pd.DataFrame, compute_seconds: float = 0.0) -> pd.DataFrame:
+        """Register a newly processed scenario skim and return it."""
+        with self._lock:
+            record_call(self.stats)
+            record_miss(self.stats, compute_seconds, int(skim.memory_usage(index=True).sum()))
+            return self._admit(scenario_id, skim)
+
+    def derived(self, skim_id: str, name: Hashable, build: Callable[[], Any]) -> Optional[Any]:
+        """Structure built from a resident scenario skim, kept with it and counted by its nbytes.
+
+        skim_id is the skim's fingerprint. Returns None when no resident
+        scenario has that skim, so callers can cache it elsewhere.
+        """
+        with self._lock:
+            scenario_id = self._skim_ids.get(skim_id)
+            if scenario_id is None:
+                return None
+            value = self._derived[scenario_id].get(name)
+            if value is not None:
+                return value
+
+        value = build()
+        with self._lock:
+            # The scenario may have been spilled or replaced while building; the caller still gets the value
+            if self._skim_ids.get(skim_id) != scenario_id:
+                return value
+            structures = self._derived[scenario_id]
+            if name not in structures:
+                structures[name] = value
+                size = int(getattr(value, "nbytes", 0))
+                self._sizes[scenario_id] += size
+                self.nbytes += size
+                self._resident.move_to_end(scenario_id)
+                self._fit_budget()
+            return value
+
+    def _admit(self, scenario_id: str, skim: pd.DataFrame) -> pd.DataFrame:
+        if scenario_id in self._resident:
+            self._drop_resident(scenario_id)
+        size = int(skim.memory_usage(index=True).sum())
+        self._resident[scenario_id] = skim
+        self._sizes[scenario_id] = size
+        self._derived[scenario_id] = {}
+        self._skim_ids[skim_fingerprint(skim)] = scenario_id
+        self.nbytes += size
+        self._fit_budget()
+        return skim
+
+    def _fit_budget(self):
+        # Spill least recently used scenarios; one over the budget on its own is spilled right away
+        while self.nbytes > self.max_bytes and self._resident:
+            self._spill(next(iter(self._resident)))
+
+    def _drop_resident(self, scenario_id: str) -> pd.DataFrame:
+        """Remove a scenario and its derived structures from memory and return its skim."""
+        skim = self._resident.pop(scenario_id)
+        self.nbytes -= self._sizes.pop(scenario_id)
+        self._derived.pop(scenario_id, None)
+        self._skim_ids = {skim_id: sid for skim_id, sid in self._skim_ids.items() if sid != scenario_id}
+        return skim
+
+    def _spill(self, scenario_id: str):
+        skim = self._drop_resident(scenario_id)
+        record_eviction(self.stats)
+        if scenario_id in self._spilled:
+            self._spilled.move_to_end(scenario_id)
+            return
+
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix=".parquet.tmp")
+            os.close(fd)
+            try:
+                skim.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, self._spill_path(scenario_id))
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+        except Exception as e:
+            logger.warning(f"Could not spill scenario {scenario_id}, dropping it: {e}")
+            return
+
+        self._spilled[scenario_id] = self._spill_path(scenario_id).stat().st_size
+        logger.info(f"Spilled scenario {scenario_id} to disk ({len(skim):,} OD pairs)")
+        while sum(self._spilled.values()) > self.max_spill_bytes and len(self._spilled) > 1:
+            oldest, _ = self._spilled.popitem(last=False)
+            self._spill_path(oldest).unlink(missing_ok=True)
+
+    def use_spill_dir(self, spill_dir: str):
+        """Point the registry at a spill directory, adopting spill files left by earlier runs."""
+        with self._lock:
+            spill_dir = Path(spill_dir)
+            if spill_dir == self.spill_dir and self._scanned:
+                return
+            self._spilled.clear()
+            self.spill_dir = spill_dir
+            self._scanned = True
+            if spill_dir.is_dir():
+                for path in sorted(spill_dir.glob("*.parquet"), key=lambda p: p.stat().st_mtime):
+                    self._spilled[path.stem] = path.stat().st_size
+
+    def resize(self, max_bytes: int):
+        """Change the memory budget, spilling scenarios if needed."""
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._fit_budget()
+
+    def clear(self):
+        """Drop all scenarios from memory and remove their spill files."""
+        with self._lock:
+            for scenario_id in self._spilled:
+                self._spill_path(scenario_id).unlink(missing_ok=True)
+            self._resident.clear()
+            self._sizes.clear()
+            self._spilled.clear()
+            self._derived.clear()
+            self._skim_ids.clear()
+            self.nbytes = 0
+
+    def summary(self) -> Dict[str, int]:
+        """Resident and spilled scenario counts and sizes."""
+        with self._lock:
+            return {
+                "resident": len(self._resident),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "spilled": len(self._spilled),
+                "spilled_bytes": sum(self._spilled.values()),
+            }
+
+# Process-wide registry shared by all sessions
+_SCENARIO_REGISTRY = ScenarioRegistry()
+
+def get_scenario_registry() -> ScenarioRegistry:
+    """Return the process-wide scenario registry."""
+    return _SCENARIO_REGISTRY
+
+def configure_scenario_registry(max_mb: float, spill_dir: str, spill_mb: float) -> ScenarioRegistry:
+    """Apply the configured memory budget and spill settings to the process-wide registry."""
+    registry = _SCENARIO_REGISTRY
+    registry.use_spill_dir(spill_dir)
+    registry.max_spill_bytes = int(spill_mb * 1024 * 1024)
+    max_bytes = int(max_mb * 1024 * 1024)
+    if max_bytes != registry.max_bytes:
+        registry.resize(max_bytes)
+        logger.info(f"Scenario memory budget set to {max_mb} MB")
+    return registry
@@ -3,13 +3,17 @@ UI components and styling utilities for Lagos Accessibility Dashboard
 """
 import streamlit as st
 import pandas as pd
+import numpy as np
 import geopandas as gpd
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import logging
 from pathlib import Path
 
-from models import AnalysisConfig, ATTRIBUTE_METADATA
+from models import AnalysisConfig, ATTRIBUTE_METADATA, DAILY_PERIOD
 from map_utils import format_attribute_value
+from classification import SCHEMES, DEFAULT_SCHEME
+from result_cache import get_result_cache
+from isochrones import travel_time_bands
 
 logger = logging.getLogger(__name__)
 
@@ -190,15 +194,6 @@ def load_custom_css():
             background: rgba(255,255,255,0.12);
             border-color: rgba(255,255,255,0.2);
         }
-        .lga-label {
-            background-color: transparent !important;
-            border: none !important;
-            box-shadow: none !important;
-            font-size: 12px !important;
-            font-weight: bold !important;
-            color: #333399 !important;
-            text-shadow: 1px 1px 1px #ffffff !important;
-        }
         </style>
     """, unsafe_allow_html=True)
 
@@ -217,6 +212,7 @@ def display_main_header():
     with col2:
         if st.button("🔄 Refresh Data", type="secondary", help="Reload all data files"):
             st.cache_data.clear()
+            get_result_cache().clear()
             st.rerun()
 
 def display_combined_header(analysis_config: AnalysisConfig):
@@ -225,6 +221,8 @@ def display_combined_header(analysis_config: AnalysisConfig):
         "Set a time threshold and see how many jobs are accessible within that time."
         if analysis_config.analysis_type == "Accessibility"
         else f"Time Mapping Mode — Using {analysis_config.time_band}-minute time bands. Click zones to color by travel time from the selected origin."
+        if analysis_config.time_mapping_direction == "origin"
+        else f"Catchment Mode — Using {analysis_config.time_band}-minute time bands. Click a zone to see which origins reach it and who lives in its catchment."
     )
     instructions_text = (
         "Interact with the map to explore accessibility and travel times across Lagos. Use the sidebar to adjust settings and compare scenarios."
@@ -339,9 +337,57 @@ def display_sidebar_settings(analysis_config: AnalysisConfig, available_attribut
             options=[5, 10, 15],
             index=[5, 10, 15].index(analysis_config.time_band) if analysis_config.time_band in [5, 10, 15] else 2
         )
+        analysis_config.time_mapping_direction = st.sidebar.radio(
+            "Travel direction",
+            ["origin", "destination"],
+            index=0 if analysis_config.time_mapping_direction == "origin" else 1,
+            format_func=lambda d: "From selected zone" if d == "origin" else "To selected zone (catchment)",
+            help="Catchment mode shows which origins reach the selected zone, e.g. for retail or hospital siting"
+        )
     
     return analysis_config
 
+def display_period_selector(periods: List[str], current: Optional[str]) -> str:
+    """Display the time-of-day period selector and return the selected period."""
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🕒 Time of Day")
+    options = [DAILY_PERIOD] + list(periods)
+    return st.sidebar.radio(
+        "Period",
+        options,
+        index=options.index(current) if current in options else 0,
+        key="period_radio",
+        help="Daily average weights each period by its share of daily demand"
+    )
+
+def display_multimodal_settings(modes: List[str], analysis_config: AnalysisConfig) -> AnalysisConfig:
+    """Display the multimodal network controls and update the configuration."""
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🚌 Multimodal Network")
+    use_modes = st.sidebar.checkbox(
+        "Combine mode skims",
+        value=bool(analysis_config.combined_modes),
+        help="Analyze a network built from the configured mode skims instead of the base scenario"
+    )
+    if not use_modes:
+        analysis_config.combined_modes = []
+        return analysis_config
+    
+    selected = st.sidebar.multiselect(
+        "Modes",
+        modes,
+        default=[m for m in analysis_config.combined_modes if m in modes] or list(modes)
+    )
+    analysis_config.combine_method = st.sidebar.radio(
+        "Combination",
+        ["min", "blend"],
+        index=0 if analysis_config.combine_method == "min" else 1,
+        format_func=lambda m: "Fastest mode per trip" if m == "min" else "Mode-share weighted blend",
+        horizontal=True
+    )
+    analysis_config.combined_modes = selected
+    return analysis_config
+
 def display_file_upload_section():
     """Display file upload section and return uploaded file info."""
     st.sidebar.markdown("---")
@@ -387,7 +433,16 @@ def display_map_settings():
     st.sidebar.markdown("**Zone Styling**")
     fill_opacity = st.sidebar.slider("Fill opacity", 0.0, 1.0, 0.7, step=0.05)
     line_weight = st.sidebar.slider("Border weight", 0.0, 3.0, 0.5, step=0.1)
+    classification_scheme = st.sidebar.selectbox(
+        "Classification", list(SCHEMES), index=list(SCHEMES).index(DEFAULT_SCHEME),
+        format_func=SCHEMES.get,
+        help="How zone values are grouped into color classes"
+    )
     show_labels = st.sidebar.checkbox("Show zone IDs", value=False)
+    show_isochrones = st.sidebar.checkbox(
+        "Draw isochrones", value=False,
+        help="Time Mapping: show dissolved travel time bands from the selected zone instead of coloring every zone"
+    )
 
     # LGA Layer Controls
     st.sidebar.markdown("**Administrative Boundaries**")
@@ -412,7 +467,9 @@ def display_map_settings():
         'show_lga_layer': show_lga_layer,
         'lga_border_color': lga_border_color,
         'lga_border_weight': lga_border_weight,
-        'show_lga_labels': show_lga_labels
+        'show_lga_labels': show_lga_labels,
+        'show_isochrones': show_isochrones,
+        'classification_scheme': classification_scheme
     }
 
 def get_access_level_from_value(value: float, zones_df: gpd.GeoDataFrame, col: str) -> str:
@@ -575,37 +632,60 @@ def display_analysis_info(analysis_config: AnalysisConfig):
     if analysis_config.analysis_type == "Time Mapping":
         st.info(f"🕐 **Time Mapping Mode** - Using {analysis_config.time_band}-minute time bands. Click zones to see which zones you can reach within each time interval.")
 
-def display_time_mapping_analysis(clicked_zone_id: int, base_skim: pd.DataFrame, 
-                                zones: gpd.GeoDataFrame, time_band: int):
-    """Display detailed zone-to-zone analysis for Time Mapping mode."""
-    st.markdown("---")
-    st.subheader(f"🚗 **Zone {clicked_zone_id} Travel Analysis**")
-    
-    # Get travel times from the clicked zone to all other zones
-    zone_travel_times = base_skim[base_skim["origin_zone"] == int(clicked_zone_id)].copy()
+def display_time_mapping_analysis(clicked_zone_id: int, travel_times: pd.DataFrame, 
+                                zones: gpd.GeoDataFrame, time_band: int, direction: str = "origin"):
+    """Display detailed zone-to-zone analysis for Time Mapping mode.
     
-    if not zone_travel_times.empty:
-        # Add destination zone information
-        zone_travel_times = zone_travel_times.merge(
-            zones[["ZONE_ID", "POP_2024_fmt", "Emp 2024"]], 
-            left_on="destination_zone", 
-            right_on="ZONE_ID", 
+    travel_times holds ZONE_ID and travel_time for every zone reached from
+    (direction='origin') or reaching (direction='destination') the clicked zone.
+    """
+    st.markdown("---")
+    if direction == "origin":
+        st.subheader(f"🚗 **Zone {clicked_zone_id} Travel Analysis**")
+    else:
+        st.subheader(f"📍 **Zone {clicked_zone_id} Catchment Analysis**")
+    
+    # Unreachable (inf) or missing pairs are neither counted nor banded
+    valid, band = travel_time_bands(travel_times["travel_time"].to_numpy(dtype=np.float64), time_band)
+    travel_times = travel_times[valid]
+    if not travel_times.empty:
+        # Add zone information for the other end of each trip
+        zone_travel_times = travel_times.merge(
+            zones[["ZONE_ID", "POP_2024", "Emp 2024"]], 
+            on="ZONE_ID", 
             how="left"
         )
-        # Tables removed per request – keep compact summary only
         
         # Summary statistics
         total_accessible = len(zone_travel_times)
-        total_population = zone_travel_times["POP_2024_fmt"].str.replace(",", "").astype(float).sum()
+        total_population = zone_travel_times["POP_2024"].sum()
         total_employment = zone_travel_times["Emp 2024"].sum()
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Zones Accessible", f"{total_accessible:,}")
+            st.metric("Total Zones Accessible" if direction == "origin" else "Origin Zones Reaching",
+                      f"{total_accessible:,}")
         with col2:
-            st.metric("Total Population Reachable", f"{total_population:,.0f}")
+            st.metric("Total Population Reachable" if direction == "origin" else "Catchment Population",
+                      f"{total_population:,.0f}")
         with col3:
-            st.metric("Total Employment Reachable", f"{total_employment:,.0f}")
+            st.metric("Total Employment Reachable" if direction == "origin" else "Catchment Employment",
+                      f"{total_employment:,.0f}")
+        
+        # Zones and population per time band (same classes as the map and the isochrones)
+        by_band = zone_travel_times.groupby(band).agg(
+            zones=("ZONE_ID", "size"), population=("POP_2024", "sum"), employment=("Emp 2024", "sum")
+        )
+        by_band.index = [f"{b * time_band}-{(b + 1) * time_band} min" for b in by_band.index]
+        by_band["cumulative_population"] = by_band["population"].cumsum()
+        with st.expander("📊 By time band", expanded=direction == "destination"):
+            st.dataframe(
+                by_band.rename(columns={
+                    "zones": "Zones", "population": "Population", "employment": "Employment",
+                    "cumulative_population": "Cumulative Population"
+                }).style.format("{:,.0f}"),
+                use_container_width=True
+            )
             
     else:
         st.warning(f"No travel time data found for Zone {clicked_zone_id}")
@@ -746,3 +826,40 @@ def display_accessibility_table(zones: gpd.GeoDataFrame, analysis_config: Analys
         st.download_button("Download CSV", df.to_csv(index=False), file_name="accessibility_results.csv")
     else:
         st.info("No data available for the selected view.")
+
+def display_equity_metrics(metrics: Dict[str, pd.DataFrame], analysis_config: AnalysisConfig):
+    """Display population-weighted equity metrics and Lorenz curves for Accessibility mode."""
+    if analysis_config.analysis_type != "Accessibility" or not metrics:
+        return
+    
+    summary = metrics["summary"]
+    st.subheader(f"⚖️ Accessibility Equity — {analysis_config.selected_attribute} within {analysis_config.time_threshold} min")
+    
+    # Headline metrics for each scenario side by side
+    columns = st.columns(len(summary))
+    for col, (scenario, row) in zip(columns, summary.iterrows()):
+        with col:
+            st.markdown(f"**{scenario}**")
+            st.metric("Gini (population-weighted)", f"{row['gini']:.3f}")
+            st.metric("Palma ratio", f"{row['palma']:.2f}" if pd.notnull(row['palma']) else "N/A")
+    
+    # Full table with percentiles and population shares below thresholds
+    display_df = summary.copy()
+    rename = {"gini": "Gini", "palma": "Palma"}
+    for col in display_df.columns:
+        if col.startswith("p") and col[1:].isdigit():
+            display_df[col] = display_df[col].apply(lambda x: format_attribute_value(x, analysis_config.selected_attribute))
+            rename[col] = f"{col[1:]}th pct (pop-weighted)"
+        elif col.startswith("share_below_"):
+            pct = col.replace("share_below_", "").replace("pct", "")
+            display_df[col] = (display_df[col] * 100).round(1).astype(str) + "%"
+            rename[col] = f"Pop. reaching < {pct}% of total"
+    st.dataframe(display_df.rename(columns=rename))
+    
+    # Lorenz curves on a common population-share grid
+    with st.expander("📈 Lorenz curves"):
+        lorenz = metrics["lorenz"].copy()
+        lorenz["Equality"] = lorenz.index
+        st.line_chart(lorenz)
+        st.caption("Cumulative share of accessibility held by the cumulative share of population, "
+                   "ordered from least to most accessible zone.")
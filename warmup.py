@@ -0,0 +1,94 @@
+"""
+Cache warm-up for Lagos Accessibility Dashboard
+
+Loads the data, builds the shared skim structures and precomputes base
+scenario accessibility for the configured time thresholds and main
+attributes, so the first user's first interaction hits warm caches.
+Runs either in the background of the Streamlit process or ahead of it in
+run_optimized.py, where results reach the dashboard through the on-disk
+result store.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from models import AppConfig, AnalysisConfig
+
+logger = logging.getLogger(__name__)
+
+_warmup_thread: Optional[threading.Thread] = None
+_warmup_lock = threading.Lock()
+
+def warmup_thresholds(config: AppConfig) -> List[int]:
+    """Configured time thresholds plus the default threshold, ascending."""
+    return sorted(set(config.time_thresholds) | {config.default_time_threshold})
+
+def warm_up(config: AppConfig, attributes: Optional[List[str]] = None,
+            thresholds: Optional[List[int]] = None) -> Dict[str, float]:
+    """Precompute base data, skim indexes and accessibility results.
+
+    Returns counts of computed and already cached results and the elapsed
+    time in seconds.
+    """
+    from accessibility_engine import IncrementalAccessibility, skim_fingerprint
+    from batch_runner import default_attributes
+    from data_processing import (
+        load_shared_base_data, get_travel_time_index, get_zone_slice_index,
+        calculate_time_band_accessibility, accessibility_cache_key
+    )
+    from result_cache import get_result_cache, frame_to_arrays
+
+    start_time = time.time()
+    zones, base_skim, _ = load_shared_base_data(config)
+    skim_id = skim_fingerprint(base_skim)
+    index = get_travel_time_index(skim_id, base_skim)
+    get_zone_slice_index(skim_id, "origin_zone", base_skim)
+    calculate_time_band_accessibility(base_skim, AnalysisConfig().time_band, config.time_band_count)
+
+    cache = get_result_cache()
+    attributes = attributes or default_attributes(zones)
+    thresholds = thresholds or warmup_thresholds(config)
+    computed = cached = 0
+    for attribute in attributes:
+        engine = None
+        for threshold in sorted(thresholds):
+            key = accessibility_cache_key(skim_id, zones, threshold, attribute)
+            if cache.get(key) is not None:
+                cached += 1
+                continue
+            start = time.perf_counter()
+            if engine is None:
+                engine = IncrementalAccessibility(index, zones, attribute)
+            engine.update(threshold)
+            cache.put(key, frame_to_arrays(engine.to_frame()), time.perf_counter() - start)
+            computed += 1
+
+    elapsed = time.time() - start_time
+    logger.info(f"Warm-up finished in {elapsed:.1f}s: {computed} results computed, {cached} already cached")
+    return {"computed": computed, "cached": cached, "seconds": elapsed}
+
+def _run_warmup(config: AppConfig):
+    try:
+        warm_up(config)
+    except Exception as e:
+        logger.warning(f"Background warm-up failed: {e}")
+
+def start_background_warmup(config: AppConfig) -> bool:
+    """Start the warm-up once per process in a daemon thread; returns True if started."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is not None or not config.warmup_on_start:
+            return False
+        _warmup_thread = threading.Thread(target=_run_warmup, args=(config,), name="cache-warmup", daemon=True)
+        try:
+            # Attach the current script context so Streamlit caches accept calls from the thread
+            from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+            ctx = get_script_run_ctx(suppress_warning=True)
+            if ctx is not None:
+                add_script_run_ctx(_warmup_thread, ctx)
+        except ImportError:
+            pass
+        _warmup_thread.start()
+        logger.info("Background cache warm-up started")
+        return True